@@ -0,0 +1,127 @@
+"""Status queries and on-demand logins through the control endpoint.
+
+Usage: python benchmarks/bench_control.py [--rounds 10] [--queries 200] [--check-interval 30]
+
+Runs the wifi_service engine against benchmarks/portal_standin.py with its
+wifi_control.ControlServer on a free port, and talks to it the way
+`python wifi_control.py` does:
+
+  status        GET /status round trip (before: tail the log)
+  re-probe      the stand-in drops our session, then POST /probe: time
+                until the portal sees the login
+  re-login      POST /login while online: time until the portal sees it
+
+For re-probe, "next tick" is how long the engine would still have slept
+before its next scheduled cycle, i.e. the wait without the endpoint (before
+it, a re-login while online needed a restart). Learned state and logs go to
+a scratch directory.
+"""
+import argparse
+import logging
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_config
+import wifi_control
+import wifi_log
+import wifi_portal
+import wifi_service
+
+COLLEGE_SSID = "PCU_Student"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_login(portal, before, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if len(portal.login_times) > before:
+            return portal.login_times[before]
+        time.sleep(0.005)
+    return None
+
+def command(port, portal, path, rounds, rng, expire):
+    took, next_tick = [], []
+    for _ in range(rounds):
+        time.sleep(rng.uniform(1, 3))  # Somewhere in the engine's sleep
+        if expire:
+            portal.expire_all()
+        before = len(portal.login_times)
+        asked = time.time()
+        _, body = wifi_control.request("POST", path, port)
+        next_tick.append(body["engines"][0]["next_cycle_in"] or 0.0)
+        seen = wait_for_login(portal, before)
+        if seen is not None:
+            took.append(seen - asked)
+        time.sleep(6)  # Let the verify probe finish
+    return took, next_tick
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10, help="re-probes and re-logins each")
+    parser.add_argument("--queries", type=int, default=200, help="status queries")
+    parser.add_argument("--check-interval", type=int, default=30, help="[WIFI_SETTINGS] CHECK_INTERVAL (s)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="wifi-control-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    wifi_log.close()
+    wifi_log._writer = wifi_log.LogWriter(path=os.path.join(scratch, "wifi_monitor.log"))
+    logging.getLogger().setLevel(logging.WARNING)
+
+    portal = PortalStandIn(seed=1).start()
+    username, password = next(iter(portal.users.items()))
+    wifi_config.override(college_wifi_name=COLLEGE_SSID, portal_url=portal.portal_url, login_url=portal.login_url,
+                         probe_urls=portal.probe_urls, tcp_target="", alternative_urls=[], username=username,
+                         password=password, check_interval=args.check_interval)
+    wifi_service.get_connected_wifi_name = lambda: COLLEGE_SSID
+    engine = wifi_service.create_engine()
+    engine.log = lambda message: None
+    port = free_port()
+    control = wifi_control.ControlServer(lambda: [engine], port=port, log=lambda message: None).start()
+    threading.Thread(target=engine.run_forever, daemon=True).start()
+    rng = random.Random(1)
+    try:
+        if wait_for_login(portal, 0) is None:
+            sys.exit("engine never logged in to the stand-in")
+        time.sleep(6)
+        times = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            wifi_control.request("GET", "/status", port)
+            times.append(time.perf_counter() - started)
+        times.sort()
+        print(f"status      median {statistics.median(times) * 1000:6.2f} ms   "
+              f"p99 {times[int(len(times) * 0.99) - 1] * 1000:6.2f} ms   ({args.queries} queries)")
+        for name, path, expire in (("re-probe", "/probe", True), ("re-login", "/login", False)):
+            took, next_tick = command(port, portal, path, args.rounds, rng, expire)
+            if not took:
+                print(f"{name:<11} no logins seen")
+                continue
+            line = f"{name:<11} median {statistics.median(took) * 1000:6.0f} ms   worst {max(took) * 1000:6.0f} ms   "
+            if expire:
+                line += f"next tick median {statistics.median(next_tick):5.1f} s, worst {max(next_tick):5.1f} s   "
+            print(line + f"({len(took)}/{args.rounds} logins)")
+    finally:
+        engine.stop()
+        control.stop()
+        portal.stop()
+
+if __name__ == "__main__":
+    main()
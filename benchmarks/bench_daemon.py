@@ -0,0 +1,96 @@
+"""Per-interface overhead of wifi_daemon watching N adapters at once.
+
+Usage: python benchmarks/bench_daemon.py [--counts 1,8,32,64] [--duration 20]
+           [--check-interval 5]
+
+A synthetic wifi_iface backend reports N connected adapters on the college
+SSID, each "bound" to its own 127.0.0.x address so the portal stand-in
+(benchmarks/portal_standin.py) sees N separate clients that each need a
+login. Reported per N:
+
+  all online   seconds from start until every adapter has logged in
+  cpu ms/if/min  process CPU time per adapter per minute of monitoring
+  threads      peak client thread count (flat: engines are coroutines on one
+               loop; the stand-in's handler threads are not counted)
+  rss          resident memory growth over the run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_daemon
+import wifi_iface
+
+COLLEGE_SSID = "PCU_Student"
+
+def fake_interfaces(count):
+    names = [f"wlbench{i}" for i in range(count)]
+    addresses = {name: f"127.0.0.{i + 2}" for i, name in enumerate(names)}
+    states = [wifi_iface.InterfaceState(name, COLLEGE_SSID, state="connected") for name in names]
+    wifi_iface.BACKENDS[wifi_iface.default_backend()] = lambda: states
+    wifi_iface.ipv4_address = addresses.get
+    wifi_iface.invalidate()
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return 0
+
+def run(count, args):
+    fake_interfaces(count)
+    portal = PortalStandIn(lifetime=3600).start()
+    username, password = next(iter(portal.users.items()))
+    profile = wifi_daemon.Profile("bench", COLLEGE_SSID, portal.portal_url, portal.login_url, username, password)
+    daemon = wifi_daemon.Daemon([profile], portal.probe_urls, check_interval=args.check_interval,
+                                keepalive=False, log=lambda message: None)
+
+    def client_threads():
+        # The stand-in runs in this process too; leave its per-connection handlers out
+        return sum(1 for t in threading.enumerate() if "process_request" not in t.name)
+
+    peak_threads = [client_threads()]
+
+    def sample():
+        while not stopped.wait(0.2):
+            peak_threads[0] = max(peak_threads[0], client_threads())
+
+    stopped = threading.Event()
+    threading.Thread(target=sample, daemon=True).start()
+    threading.Timer(args.duration, daemon.stop).start()
+    rss_before, cpu_before = rss_kb(), time.process_time()
+    started = time.time()
+    asyncio.run(daemon.run())
+    elapsed = time.time() - started
+    cpu = time.process_time() - cpu_before
+    stopped.set()
+    portal.stop()
+
+    online = len(portal.sessions)
+    all_online = f"{portal.login_times[-1] - started:5.2f}s" if online == count and portal.login_times else "  n/a "
+    print(f"{count:4d} interfaces  all online {all_online} ({online}/{count})  "
+          f"cpu ms/if/min {cpu * 1000 / count / (elapsed / 60):7.1f}  "
+          f"threads {peak_threads[0]:3d}  rss +{(rss_kb() - rss_before) / 1024:5.1f} MB  "
+          f"probes {portal.counters['probes']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", default="1,8,32,64")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--check-interval", type=int, default=5)
+    args = parser.parse_args()
+    for count in (int(c) for c in args.counts.split(",")):
+        run(count, args)
+
+if __name__ == "__main__":
+    main()
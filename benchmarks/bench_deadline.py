@@ -0,0 +1,86 @@
+"""Worst-case login cycle time with and without the cycle budget.
+
+Usage: python benchmarks/bench_deadline.py [--timeout 3] [--budget 20] [--attempts 3]
+
+Runs wifi_auto_login.smart_wifi_handler in-process (the SSID lookup is
+stubbed) against benchmarks/portal_standin.py:
+
+  healthy   logged out, the portal answers at once
+  hung      the portal accepts connections but never answers, so every
+            probe, page fetch and login POST runs into its timeout
+
+"no budget" sets CYCLE_BUDGET out of reach, as before the deadline
+existed; "budget" uses --budget. Reported: wall time of the cycle, its
+result and why it stopped. The monitor kills a worker cycle after 60 s.
+Learned state and logs go to a scratch directory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_auto_login
+import wifi_config
+import wifi_log
+import wifi_portal
+
+COLLEGE_SSID = "PCU_Student"
+HANG = 3600  # Stand-in latency for "never answers"
+
+def run_cycle(budget):
+    stops = []
+    out_of_time = wifi_auto_login._out_of_time
+
+    def record(deadline, step, reason):
+        stops.append(f"{step}: {reason}")
+        return out_of_time(deadline, step, reason)
+
+    wifi_auto_login._out_of_time = record
+    wifi_config.override(cycle_budget=budget)
+    started = time.perf_counter()
+    try:
+        result = wifi_auto_login.smart_wifi_handler()
+    finally:
+        wifi_auto_login._out_of_time = out_of_time
+    return time.perf_counter() - started, result, stops[0] if stops else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=int, default=3, help="[MONITORING] TIMEOUT for the run (s)")
+    parser.add_argument("--budget", type=int, default=20, help="[MONITORING] CYCLE_BUDGET for the run (s)")
+    parser.add_argument("--attempts", type=int, default=3, help="[MONITORING] MAX_LOGIN_ATTEMPTS")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="wifi-deadline-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    wifi_log.close()
+    wifi_log._writer = wifi_log.LogWriter(path=os.path.join(scratch, "wifi_monitor.log"))
+    wifi_auto_login.get_connected_wifi_name = lambda: COLLEGE_SSID
+
+    portal = PortalStandIn().start()
+    wifi_config.override(college_wifi_name=COLLEGE_SSID, portal_url=portal.portal_url, login_url=portal.login_url,
+                         probe_urls=portal.probe_urls, alternative_urls=[], timeout=args.timeout,
+                         max_login_attempts=args.attempts)
+    print(f"TIMEOUT {args.timeout}s, MAX_LOGIN_ATTEMPTS {args.attempts}, budget {args.budget}s")
+    try:
+        for scenario, delay in (("healthy", 0), ("hung", HANG)):
+            for policy, budget in (("no budget", 10 ** 6), ("budget", args.budget)):
+                portal.expire_all()
+                portal.delay = delay
+                elapsed, result, stop = run_cycle(budget)
+                print(f"{scenario:<8} {policy:<10} {elapsed:6.1f}s  result {str(result):<5}  stopped at {stop}")
+    finally:
+        portal.delay = 0
+        portal.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Captive-state probe latency with and without the probe host cache.
+
+Usage: python benchmarks/bench_dns.py [--cycles 10] [--dns-delay 1.0]
+
+The probe URLs use made-up host names (probe-a.test, probe-b.test) that a
+fake resolver answers after --dns-delay seconds, as a slow resolver behind
+the portal does. The portal stand-in has no session for us, so every probe
+is redirected. Rows, each a wifi_probe.classify() call:
+
+  no cache      every probe resolves its host first (the old behaviour)
+  warm cache    addresses learned while online, probes go straight to them
+  hijacked DNS  cold cache, resolver answers 10.11.200.1 for every name
+
+Reported: median time to the verdict and round trips (DNS + HTTP + TCP).
+The cache file lives in a scratch directory.
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_dns
+import wifi_probe
+
+class FakeResolver:
+    """Answers *.test names after `delay` seconds with `address`; other names go to the real resolver"""
+
+    def __init__(self, delay, address="127.0.0.1"):
+        self.delay = delay
+        self.address = address
+        self.queries = 0
+        self._getaddrinfo = socket.getaddrinfo
+
+    def install(self):
+        socket.getaddrinfo = self.getaddrinfo
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        if isinstance(host, str) and host.endswith(".test"):
+            self.queries += 1
+            time.sleep(self.delay)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (self.address, port or 80))]
+        return self._getaddrinfo(host, port, family, type, proto, flags)
+
+def portal_url(portal):
+    # By name, so the probe hosts' loopback answers are not mistaken for the portal's address
+    return portal.portal_url.replace("127.0.0.1", "localhost")
+
+def measure(urls, portal, cycles, before=None):
+    times, trips, verdicts = [], [], set()
+    for _ in range(cycles):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        result = wifi_probe.classify(urls, portal_url(portal), timeout=5)
+        times.append(time.perf_counter() - started)
+        trips.append(result.requests)
+        verdicts.add(result.verdict)
+    return statistics.median(times), statistics.mean(trips), "/".join(sorted(verdicts))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--dns-delay", type=float, default=1.0, help="resolver latency behind the portal (s)")
+    args = parser.parse_args()
+
+    wifi_dns.CACHE_FILE = os.path.join(tempfile.mkdtemp(prefix="wifi-dns-"), ".dns_cache.json")
+    resolver = FakeResolver(args.dns_delay)
+    resolver.install()
+    portal = PortalStandIn().start()
+    port = portal.base_url.rsplit(":", 1)[1]
+    urls = [f"http://probe-a.test:{port}/generate_204", f"http://probe-b.test:{port}/connecttest.txt"]
+    rows = []
+    try:
+        portal.expire_all()
+        rows.append(("no cache",) + measure(urls, portal, args.cycles, before=wifi_dns.forget))
+
+        portal._login("127.0.0.1", *next(iter(portal.users.items())))
+        wifi_probe.classify(urls, portal_url(portal), timeout=5)  # Online: learn the addresses
+        portal.expire_all()
+        rows.append(("warm cache",) + measure(urls, portal, args.cycles))
+
+        resolver.address, resolver.delay = "10.11.200.1", 0.05
+        rows.append(("hijacked DNS",) + measure(urls, portal, args.cycles, before=wifi_dns.forget))
+    finally:
+        portal.stop()
+
+    print(f"Captive portal, resolver delay {args.dns_delay:g}s")
+    for name, elapsed, trips, verdict in rows:
+        print(f"{name:<14} {elapsed * 1000:8.1f} ms  {trips:4.1f} round trips  verdict {verdict}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Login latency with and without hedging across LOGIN_URL and an alternative endpoint.
+
+Usage: python benchmarks/bench_hedge.py [--logins 40] [--timeout 2] [--slow-delay 1.5] [--slow-rate 0.03]
+
+Two portal stand-ins: LOGIN_URL (the primary) and one ALTERNATIVE_URLS
+entry. Policies, each through wifi_portal.login():
+
+  no hedge     HEDGE_DELAY = TIMEOUT: the alternative only runs once
+               LOGIN_URL has failed (the behaviour before hedging)
+  p95 hedge    HEDGE_DELAY = auto, after warm-up logins taught it the
+               primary's answer times
+
+Primary faults:
+
+  tail latency  --slow-rate of its answers take --slow-delay seconds
+  black hole    accepts the connection, never answers within the timeout
+  refusing      connection refused
+
+Reported per policy: median, p95 and worst login time, and login requests
+sent per login. Learned state lives in a scratch directory.
+"""
+import argparse
+import math
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_http
+import wifi_portal
+
+WARMUP = 20
+
+class Counter:
+    """Counts login POSTs made through wifi_http"""
+
+    def __init__(self):
+        self.count = 0
+        self._get_session = wifi_http.get_session
+
+    def install(self):
+        counter = self
+
+        class CountingSession:
+            def __init__(self, session):
+                self._session = session
+
+            def get(self, *args, **kwargs):
+                return self._session.get(*args, **kwargs)
+
+            def post(self, *args, **kwargs):
+                counter.count += 1
+                return self._session.post(*args, **kwargs)
+
+        wifi_http.get_session = lambda interface=None: CountingSession(self._get_session(interface))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def reset_state(scratch):
+    for name in (".login_method.json", ".login_latency.json"):
+        try:
+            os.remove(os.path.join(scratch, name))
+        except OSError:
+            pass
+    wifi_portal._latencies = None
+
+def run(primary, alternative, login_url, hedge_delay, counter, logins, timeout):
+    username, password = next(iter(primary.users.items()))
+    times, sent, ok = [], [], 0
+    for _ in range(logins):
+        before = counter.count
+        started = time.perf_counter()
+        result = wifi_portal.login(username, password, login_url, timeout=timeout,
+                                   alternative_urls=[alternative.login_url], hedge_delay=hedge_delay)
+        wifi_portal.report_verification(result, bool(result))  # A stand-in "success" is a real session
+        ok += bool(result)
+        times.append(time.perf_counter() - started)
+        sent.append(counter.count - before)
+    return statistics.median(times), percentile(times, 95), max(times), statistics.mean(sent), ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--slow-delay", type=float, default=1.5, help="latency of the primary's slow answers (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="fraction of the primary's answers that are slow")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="wifi-hedge-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    counter = Counter()
+    counter.install()
+    primary = PortalStandIn(seed=1).start()
+    alternative = PortalStandIn().start()
+    refused_url = f"http://127.0.0.1:{closed_port()}/login.xml"
+    faults = {
+        "tail latency": (primary.login_url, args.slow_delay, args.slow_rate, args.logins),
+        "black hole": (primary.login_url, args.timeout * 2, 1.0, max(3, args.logins // 8)),
+        "refusing": (refused_url, 0, 1.0, max(3, args.logins // 8)),
+    }
+    try:
+        print(f"{'primary':<14}{'policy':<11}{'median':>9}{'p95':>9}{'worst':>9}{'requests':>10}  ok   hedge delay")
+        for fault, (login_url, delay, slow_rate, logins) in faults.items():
+            for policy, hedge_delay in (("no hedge", args.timeout), ("p95 hedge", None)):
+                reset_state(scratch)
+                primary.delay = 0
+                run(primary, alternative, primary.login_url, hedge_delay, counter, WARMUP, args.timeout)
+                primary.delay, primary.slow_rate = delay, slow_rate
+                median, p95, worst, sent, ok = run(primary, alternative, login_url, hedge_delay, counter,
+                                                   logins, args.timeout)
+                used = wifi_portal.hedge_delay(primary.login_url, args.timeout, hedge_delay)
+                print(f"{fault:<14}{policy:<11}{median * 1000:7.0f}ms{p95 * 1000:7.0f}ms{worst * 1000:7.0f}ms"
+                      f"{sent:10.1f}  {ok:2d}/{logins:<2d} {used * 1000:6.0f} ms")
+    finally:
+        primary.stop()
+        alternative.stop()
+
+if __name__ == "__main__":
+    main()
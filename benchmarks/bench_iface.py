@@ -0,0 +1,49 @@
+"""Per-poll cost of each interface-state backend vs the legacy netsh spawn.
+
+Usage: python benchmarks/bench_iface.py [polls]
+
+On hosts without netsh the legacy row still pays for the shell spawn (the
+command just fails), which is the dominant part of its cost.
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import wifi_iface
+
+def legacy_netsh():
+    # The old get_connected_wifi_name: shell=True spawn + split on every poll
+    try:
+        result = subprocess.check_output("netsh wlan show interfaces", shell=True,
+                                         stderr=subprocess.DEVNULL).decode()
+        for line in result.split('\n'):
+            if "SSID" in line and "BSSID" not in line:
+                return line.split(":")[1].strip()
+    except Exception:
+        return None
+
+def measure(fn, polls):
+    started = time.perf_counter()
+    for _ in range(polls):
+        fn()
+    return (time.perf_counter() - started) / polls
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = [("legacy netsh (shell spawn)", legacy_netsh)]
+    if sys.platform == "win32":
+        rows.append(("netsh backend", wifi_iface.query_netsh))
+    else:
+        rows.append(("sysfs/ioctl backend", wifi_iface.query_sysfs))
+    rows.append(("cached provider", wifi_iface.get_interface_states))
+    print(f"Per-poll cost over {polls} polls")
+    for name, fn in rows:
+        runs = min(polls, 50) if fn is legacy_netsh else polls
+        print(f"{name:<28} {measure(fn, runs) * 1e6:10.1f} us")
+
+if __name__ == "__main__":
+    main()
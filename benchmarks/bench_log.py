@@ -0,0 +1,60 @@
+"""Per-line cost of the old log_message file handling vs the shared wifi_log writer.
+
+Usage: python benchmarks/bench_log.py [lines]
+
+Runs against a scratch directory, never the real wifi_monitor.log. The
+writer row includes the final flush, so it is the full cost of getting
+every line onto disk, not just of queueing it.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import wifi_log
+
+def legacy_logger(log_file, date_file):
+    # The old wifi_monitor.check_and_rotate_log + append, once per line
+    def log(line):
+        today = datetime.now().strftime("%Y-%m-%d")
+        last_date = ""
+        if os.path.exists(date_file):
+            with open(date_file, "r") as f:
+                last_date = f.read().strip()
+        log_too_large = os.path.exists(log_file) and os.path.getsize(log_file) > 5 * 1024 * 1024
+        if last_date != today or log_too_large:
+            with open(log_file, "w", encoding="utf-8") as f:
+                f.write(f"=== WiFi Monitor Log Started: {today} ===\n")
+            with open(date_file, "w") as f:
+                f.write(today)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    return log
+
+def measure(write, lines, finish=None):
+    line = "[2025-08-05 10:00:01] 📶 WiFi changed: 'Home_WiFi' → 'PCU_Student'"
+    started = time.perf_counter()
+    for _ in range(lines):
+        write(line)
+    if finish is not None:
+        finish()
+    return (time.perf_counter() - started) / lines
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as scratch:
+        legacy = measure(legacy_logger(os.path.join(scratch, "legacy.log"),
+                                       os.path.join(scratch, ".last_log_date")), lines)
+        writer = wifi_log.LogWriter(path=os.path.join(scratch, "shared.log"))
+        shared = measure(writer.write, lines, finish=writer.close)
+    print(f"Per-line cost over {lines} lines")
+    print(f"{'legacy (stat + reopen per line)':<34} {legacy * 1e6:8.1f} us")
+    print(f"{'wifi_log writer (batched)':<34} {shared * 1e6:8.1f} us")
+    print(f"speed-up: {legacy / shared:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Requests per login: fetching the portal page every time vs the cached login form.
+
+Usage: python benchmarks/bench_login_form.py [--logins 20]
+
+The old wifi_login.login_to_wifi fetched PORTAL_URL in full before every
+login and then posted the learned method; now the page's login form is read
+once, cached in .portal_form.json, and re-read (conditionally, so an
+unchanged page is a 304) only when a login is not understood. Rows, against
+benchmarks/portal_standin.py, each login after the stand-in dropped our
+session:
+
+  steady       same portal, method already learned
+  form moved   the portal renames its fields and moves the login endpoint
+               (one login after the change, then steady again)
+
+Counted per login: HTTP requests (GET and POST), and whether it succeeded.
+The cache files live in a scratch directory.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import DEFAULT_FORM, PortalStandIn
+
+import wifi_http
+import wifi_portal
+
+MOVED_FORM = {"action": "auth/login", "username": "user", "password": "pwd"}
+
+class Counter:
+    """Counts HTTP requests made through wifi_http"""
+
+    def __init__(self):
+        self.count = 0
+        self._get_session = wifi_http.get_session
+
+    def install(self):
+        counter = self
+
+        class CountingSession:
+            def __init__(self, session):
+                self._session = session
+
+            def get(self, *args, **kwargs):
+                counter.count += 1
+                return self._session.get(*args, **kwargs)
+
+            def post(self, *args, **kwargs):
+                counter.count += 1
+                return self._session.post(*args, **kwargs)
+
+        wifi_http.get_session = lambda interface=None: CountingSession(self._get_session(interface))
+
+def legacy_login(portal, username, password):
+    # The old login_to_wifi: full page fetch, then the method cache alone
+    try:
+        with wifi_http.get_session().get(portal.portal_url, timeout=5) as response:
+            response.text
+    except Exception:
+        pass
+    return wifi_portal.login(username, password, portal.login_url, timeout=5)
+
+def cached_login(portal, username, password):
+    return wifi_portal.login(username, password, portal.login_url, referer=portal.portal_url, timeout=5)
+
+def reset_caches(scratch):
+    for name in (".login_method.json", ".portal_form.json"):
+        try:
+            os.remove(os.path.join(scratch, name))
+        except OSError:
+            pass
+
+def measure(login, portal, counter, logins):
+    counts, times, ok = [], [], 0
+    username, password = next(iter(portal.users.items()))
+    for _ in range(logins):
+        portal.expire_all()
+        before = counter.count
+        started = time.perf_counter()
+        result = login(portal, username, password)
+        wifi_portal.report_verification(result, bool(result))  # A stand-in "success" is a real session
+        ok += bool(result)
+        times.append(time.perf_counter() - started)
+        counts.append(counter.count - before)
+    return statistics.mean(counts), statistics.median(times), ok
+
+def run(login, portal, counter, scratch, logins):
+    reset_caches(scratch)
+    portal.form = dict(DEFAULT_FORM)
+    measure(login, portal, counter, 1)  # Learn the method (and the form)
+    steady = measure(login, portal, counter, logins)
+    portal.form = dict(MOVED_FORM)
+    moved = measure(login, portal, counter, 1)
+    after = measure(login, portal, counter, logins)
+    return steady, moved, after
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="wifi-form-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    counter = Counter()
+    counter.install()
+    portal = PortalStandIn().start()
+    try:
+        rows = {"page every login": run(legacy_login, portal, counter, scratch, args.logins)}
+        portal.counters["portal_pages"] = 0
+        rows["cached form"] = run(cached_login, portal, counter, scratch, args.logins)
+        pages = portal.counters["portal_pages"]
+    finally:
+        portal.stop()
+
+    print(f"{'':<17} {'steady':>24} {'first login after move':>30} {'after move':>24}")
+    for name, cells in rows.items():
+        line = f"{name:<17}"
+        for (requests, elapsed, ok), logins in zip(cells, (args.logins, 1, args.logins)):
+            line += f"  {requests:4.1f} req {elapsed * 1000:6.1f} ms {ok:3d}/{logins:<3d} ok"
+        print(line)
+    print(f"cached form: {pages} full page reads in {2 * args.logins + 3} logins")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare time-to-login: one subprocess per WiFi join vs the persistent worker.
+
+Usage: python benchmarks/bench_login_worker.py [runs]
+
+Both paths run the same smart_wifi_handler against benchmarks/portal_standin.py,
+logged out before every run, so each one probes, finds the portal and
+logs in for real; the difference is the per-join cost of interpreter
+startup, imports and config parsing. The SSID lookup reports the college
+SSID and the post-login verify wait is skipped in both. Learned state and
+log lines go to a scratch directory. The worker needs the fork start
+method (Linux) to inherit the redirected settings.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_auto_login
+import wifi_config
+import wifi_log
+import wifi_portal
+from wifi_worker import LoginWorker
+
+COLLEGE_SSID = "PCU_Student"
+SCRATCH = tempfile.mkdtemp(prefix="wifi-worker-")
+
+# What wifi_auto_login.py --service does, pointed at the stand-in
+DRIVER = """
+import os
+import sys
+import wifi_auto_login as w
+import wifi_config
+import wifi_log
+sys.argv = ["wifi_auto_login.py", "--service"]
+w.get_connected_wifi_name = lambda: {ssid!r}
+w.VERIFY_DELAY = 0
+for name in ("METHOD_CACHE_FILE", "FORM_CACHE_FILE", "LATENCY_FILE"):
+    setattr(w.wifi_portal, name, os.path.join({scratch!r}, os.path.basename(getattr(w.wifi_portal, name))))
+wifi_log._writer = wifi_log.LogWriter(path=os.path.join({scratch!r}, "wifi_monitor.log"))
+wifi_config.override(**{settings!r})
+w.main()
+"""
+
+def settings(portal):
+    username, password = next(iter(portal.users.items()))
+    return dict(college_wifi_name=COLLEGE_SSID, portal_url=portal.portal_url, login_url=portal.login_url,
+                probe_urls=portal.probe_urls, tcp_target="", alternative_urls=[], username=username,
+                password=password)
+
+def point_at(portal):
+    """This process's settings, inherited by the forked worker"""
+    wifi_config.override(**settings(portal))
+    wifi_auto_login.get_connected_wifi_name = lambda: COLLEGE_SSID
+    wifi_auto_login.VERIFY_DELAY = 0
+    for name in ("METHOD_CACHE_FILE", "FORM_CACHE_FILE", "LATENCY_FILE"):
+        setattr(wifi_portal, name, os.path.join(SCRATCH, os.path.basename(getattr(wifi_portal, name))))
+    wifi_log.close()
+    wifi_log._writer = wifi_log.LogWriter(path=os.path.join(SCRATCH, "wifi_monitor.log"))
+
+def time_subprocess(portal, runs):
+    driver = DRIVER.format(ssid=COLLEGE_SSID, scratch=SCRATCH, settings=settings(portal))
+    timings, before = [], portal.counters["logins"]
+    for _ in range(runs):
+        portal.expire_all()
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", driver], cwd=ROOT, capture_output=True, text=True, timeout=60)
+        timings.append(time.perf_counter() - started)
+    return timings, portal.counters["logins"] - before
+
+def time_worker(portal, runs):
+    worker = LoginWorker(timeout=60)
+    worker.start()
+    portal.expire_all()
+    worker.run_login()  # Warm-up: the first call pays for the imports once
+    timings, before = [], portal.counters["logins"]
+    try:
+        for _ in range(runs):
+            portal.expire_all()
+            started = time.perf_counter()
+            worker.run_login()
+            timings.append(time.perf_counter() - started)
+    finally:
+        worker.stop()
+    return timings, portal.counters["logins"] - before
+
+def report(name, timings, logins):
+    print(f"{name:<12} mean {statistics.mean(timings) * 1000:8.1f} ms   "
+          f"min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms   logins {logins}/{len(timings)}")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    portal = PortalStandIn(seed=1).start()
+    point_at(portal)
+    print(f"Time-to-login over {runs} runs against the portal stand-in")
+    try:
+        report("subprocess", *time_subprocess(portal, runs))
+        report("worker", *time_worker(portal, runs))
+    finally:
+        portal.stop()
+
+if __name__ == "__main__":
+    main()
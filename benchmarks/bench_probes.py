@@ -0,0 +1,138 @@
+"""Round trips per decision: the old probe chain vs the single classifier.
+
+Usage: python benchmarks/bench_probes.py [--cycles 20]
+
+One "cycle" is what wifi_auto_login.smart_wifi_handler does before it
+decides whether to log in. The old chain ran the connectivity probes, then
+detect_captive_portal (the first probe URL again, then PORTAL_URL) and then
+a TCP connect to the portal; the new one runs wifi_probe.classify() once
+and every later check reads the memoized answer. Counted per cycle: HTTP
+requests sent plus TCP connects, and the median time to the decision.
+
+Scenarios, against benchmarks/portal_standin.py (closed local ports stand
+in for hosts that do not answer):
+
+  online          logged in, probes answered
+  captive         logged out, probes redirected to the portal
+  silent-captive  probes get no answer, the portal is up
+  portal-down     probes answered (404), the portal is not
+  offline         nothing answers
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_http
+import wifi_probe
+
+class Counter:
+    """Counts HTTP requests and TCP connects made through wifi_http and socket"""
+
+    def __init__(self):
+        self.count = 0
+        self._get_session = wifi_http.get_session
+        self._create_connection = socket.create_connection
+
+    def install(self):
+        counter = self
+
+        class CountingSession:
+            def __init__(self, session):
+                self._session = session
+
+            def get(self, *args, **kwargs):
+                counter.count += 1
+                return self._session.get(*args, **kwargs)
+
+        def create_connection(*args, **kwargs):
+            counter.count += 1
+            return self._create_connection(*args, **kwargs)
+
+        wifi_http.get_session = lambda interface=None: CountingSession(self._get_session(interface))
+        socket.create_connection = create_connection
+
+def legacy_cycle(urls, portal_url):
+    # The old smart_wifi_handler chain up to the login decision; its race started every probe at once
+    markers = wifi_probe.portal_markers(portal_url)
+    if wifi_probe._race(urls, markers, 2, 1, None, None)[0] == wifi_probe.ONLINE:
+        return "online"
+    try:  # detect_captive_portal (result unused)
+        response = wifi_http.get_session().get(urls[0], timeout=2, allow_redirects=False)
+        if not (response.status_code in [302, 301, 307]
+                and any(marker in response.headers.get('Location', '') for marker in markers)):
+            try:
+                wifi_http.get_session().get(portal_url, timeout=2)
+            except Exception:
+                pass
+    except Exception:
+        pass
+    try:  # is_portal_accessible
+        socket.create_connection(wifi_probe.portal_address(portal_url), timeout=2).close()
+        return "captive"
+    except OSError:
+        return "unreachable"
+
+def classifier_cycle(urls, portal_url):
+    classifier = wifi_probe.Classifier(lambda: (urls, portal_url, 1), timeout=2)
+    if classifier.check_online():
+        return "online"
+    classifier.result().captive
+    return "captive" if classifier.portal_reachable() else classifier.last.verdict
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def scenarios(portal):
+    dead = f"http://127.0.0.1:{closed_port()}"
+    return {
+        "online": (portal.probe_urls, portal.portal_url, True),
+        "captive": (portal.probe_urls, portal.portal_url, False),
+        "silent-captive": ([dead + "/generate_204", dead + "/connecttest.txt"], portal.portal_url, False),
+        "portal-down": ([portal.base_url + "/missing", portal.base_url + "/gone"], dead + "/httpclient.html", False),
+        "offline": ([dead + "/generate_204", dead + "/connecttest.txt"], dead + "/httpclient.html", False),
+    }
+
+def measure(cycle, counter, urls, portal_url, cycles):
+    counts, times = [], []
+    for _ in range(cycles):
+        before = counter.count
+        started = time.perf_counter()
+        verdict = cycle(urls, portal_url)
+        times.append(time.perf_counter() - started)
+        counts.append(counter.count - before)
+    return verdict, statistics.mean(counts), statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=20)
+    args = parser.parse_args()
+
+    counter = Counter()
+    counter.install()
+    portal = PortalStandIn().start()
+    try:
+        print(f"{'scenario':<15} {'old chain':>22} {'classifier':>22}   verdict")
+        for name, (urls, portal_url, logged_in) in scenarios(portal).items():
+            portal.expire_all()
+            if logged_in:
+                portal._login("127.0.0.1", *next(iter(portal.users.items())))
+            _, old_trips, old_time = measure(legacy_cycle, counter, urls, portal_url, args.cycles)
+            verdict, new_trips, new_time = measure(classifier_cycle, counter, urls, portal_url, args.cycles)
+            print(f"{name:<15} {old_trips:5.1f} trips {old_time * 1000:7.1f} ms "
+                  f"{new_trips:5.1f} trips {new_time * 1000:7.1f} ms   {verdict}")
+    finally:
+        portal.stop()
+
+if __name__ == "__main__":
+    main()
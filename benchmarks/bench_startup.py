@@ -0,0 +1,125 @@
+"""Startup cost of the one-shot login, as a regression gate.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--max-import-ratio 1.6]
+           [--max-first-packet-ratio 3]
+
+wifi_auto_login.py is started afresh on every WiFi join, so what matters is
+how soon it gets a packet out. Two numbers, medians over --runs fresh
+interpreters, each against a baseline measured the same way on the same
+machine, so a slow or loaded machine moves both:
+
+  import      `python -X importtime -c "import wifi_auto_login"`, cumulative
+              time of the wifi_auto_login import (must not pull in requests),
+              against `import http.client` (the stdlib HTTP it needs anyway)
+  first packet  process spawn -> first request seen by the portal stand-in,
+              running wifi_auto_login.main() pointed at it, against
+              spawning `python -c pass`
+
+Exits 1 if either ratio is over its budget or requests was imported, so it
+can run in CI next to compileall.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+SCRATCH = tempfile.mkdtemp(prefix="wifi-startup-")
+
+DRIVER = """
+import os
+import wifi_auto_login as w
+import wifi_config
+w.get_connected_wifi_name = lambda: "PCU_Student"
+for name in ("METHOD_CACHE_FILE", "FORM_CACHE_FILE", "LATENCY_FILE"):  # Keep the real learned state out of it
+    setattr(w.wifi_portal, name, os.path.join({scratch!r}, os.path.basename(getattr(w.wifi_portal, name))))
+wifi_config.override(college_wifi_name="PCU_Student", portal_url={portal_url!r}, login_url={login_url!r},
+                     probe_urls={probe_urls!r}, alternative_urls=[])
+w.main()
+"""
+
+def import_time_ms(module="wifi_auto_login"):
+    """Cumulative import time of `module` and the modules it pulled in"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    modules, total = set(), None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        if name.strip() == module and total is None:
+            total = int(cumulative) / 1000
+    return total, modules
+
+def spawn_ms():
+    """A bare interpreter from spawn to exit: the floor under the first packet"""
+    started = time.time()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=ROOT, capture_output=True)
+    return (time.time() - started) * 1000
+
+def first_packet_ms(portal):
+    portal.expire_all()
+    portal.first_request_at = None
+    driver = DRIVER.format(portal_url=portal.portal_url, login_url=portal.login_url, probe_urls=portal.probe_urls,
+                           scratch=SCRATCH)
+    started = time.time()
+    subprocess.run([sys.executable, "-c", driver], cwd=ROOT, capture_output=True)
+    if portal.first_request_at is None:
+        return None
+    return (portal.first_request_at - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-import-ratio", type=float, default=1.6, help="import time / import http.client")
+    parser.add_argument("--max-first-packet-ratio", type=float, default=3, help="first packet / bare interpreter")
+    args = parser.parse_args()
+
+    imports, baseline_imports, spawns, heavy = [], [], [], set()
+    for _ in range(args.runs):
+        # Interleaved, so a burst of load hits both sides of each ratio
+        elapsed, modules = import_time_ms()
+        imports.append(elapsed)
+        heavy |= modules & {"requests", "urllib3", "configparser"}
+        baseline_imports.append(import_time_ms("http.client")[0])
+    portal = PortalStandIn().start()
+    try:
+        packets = []
+        for _ in range(args.runs):
+            packets.append(first_packet_ms(portal))
+            spawns.append(spawn_ms())
+        logins = portal.counters["logins"]
+    finally:
+        portal.stop()
+
+    failures = []
+    import_ms, baseline_ms = statistics.median(imports), statistics.median(baseline_imports)
+    print(f"import wifi_auto_login   median {import_ms:6.1f} ms  = {import_ms / baseline_ms:4.2f} x import http.client "
+          f"({baseline_ms:.1f} ms, budget {args.max_import_ratio:g} x)")
+    if import_ms > args.max_import_ratio * baseline_ms:
+        failures.append("import time over budget")
+    if heavy:
+        failures.append(f"imported at startup: {', '.join(sorted(heavy))}")
+    sent = [p for p in packets if p is not None]
+    if not sent:
+        failures.append("no packet reached the portal")
+    else:
+        packet_ms, spawn = statistics.median(sent), statistics.median(spawns)
+        print(f"spawn -> first packet    median {packet_ms:6.1f} ms  = {packet_ms / spawn:4.2f} x python -c pass "
+              f"({spawn:.1f} ms, budget {args.max_first_packet_ratio:g} x)  logins {logins}/{args.runs}")
+        if packet_ms > args.max_first_packet_ratio * spawn:
+            failures.append("first packet over budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
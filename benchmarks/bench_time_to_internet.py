@@ -0,0 +1,160 @@
+"""End-to-end time-to-internet against the local portal stand-in.
+
+Usage: python benchmarks/bench_time_to_internet.py [--duration 120] [--runs 3]
+           [--lifetime 20] [--max-session 45] [--delay 0] [--reset-rate 0]
+           [--error-rate 0] [--only auto_login|service|monitor]
+
+For each entry point a fresh benchmarks/portal_standin.py is started and the
+front-end is pointed at it through wifi_config.override (portal and login
+URLs, probe URLs, TCP_TARGET empty); the SSID lookup reports the college SSID. Reported per entry point:
+
+  time-to-internet  join -> first successful portal login
+  probes/hour       connectivity checks that reached the portal
+  worst recovery    longest session expiry -> next login (an expiry never
+                    recovered from is flagged separately)
+
+wifi_auto_login is a one-shot, so it is run --runs times from a logged-out
+state instead of for --duration. Learned state (login method, keepalive
+samples, log lines) goes to a scratch directory, not the real files. The
+monitor's login worker needs the fork start method (Linux) to inherit the
+redirected settings.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from portal_standin import PortalStandIn
+
+import wifi_auto_login
+import wifi_config
+import wifi_keepalive
+import wifi_log
+import wifi_portal
+
+COLLEGE_SSID = "PCU_Student"
+
+def point_at(portal):
+    """Redirect every front-end's portal/probe settings to the stand-in (survives config reloads)"""
+    username, password = next(iter(portal.users.items()))
+    wifi_config.override(college_wifi_name=COLLEGE_SSID, portal_url=portal.portal_url,
+                         login_url=portal.login_url, probe_urls=portal.probe_urls, tcp_target="",
+                         alternative_urls=[], username=username, password=password)
+
+def start_portal(args):
+    return PortalStandIn(lifetime=args.lifetime, max_session=args.max_session, delay=args.delay,
+                         reset_rate=args.reset_rate, error_rate=args.error_rate, seed=1).start()
+
+def summarise(name, portal, started, elapsed, ttis):
+    probes_per_hour = portal.counters["probes"] / elapsed * 3600 if elapsed else 0.0
+    worst = max(portal.recoveries) if portal.recoveries else None
+    tti = f"{statistics.mean(ttis):6.2f}s" if ttis else "   n/a "
+    print(f"{name:<12} time-to-internet {tti}  probes/h {probes_per_hour:7.0f}  "
+          f"logins {portal.counters['logins']:3d}  expiries recovered {len(portal.recoveries):2d}  "
+          f"worst recovery {f'{worst:.1f}s' if worst is not None else 'n/a'}"
+          f"{'  (still offline at the end)' if portal.unrecovered else ''}")
+
+# ---- entry points ----
+
+def bench_auto_login(args):
+    portal = start_portal(args)
+    point_at(portal)
+    wifi_auto_login.get_connected_wifi_name = lambda: COLLEGE_SSID
+    ttis = []
+    started = time.time()
+    try:
+        for _ in range(args.runs):
+            portal.expire_all()
+            join = time.time()
+            before = len(portal.login_times)
+            wifi_auto_login.smart_wifi_handler()
+            if len(portal.login_times) > before:
+                ttis.append(portal.login_times[before] - join)
+        summarise("auto_login", portal, started, time.time() - started, ttis)
+    finally:
+        portal.stop()
+
+def run_engine(engine, duration):
+    threading.Timer(duration, engine.stop).start()
+    engine.run_forever()
+
+def bench_service(args):
+    import logging
+    import wifi_service
+    logging.getLogger().setLevel(logging.WARNING)  # Keep the service's console log out of the report
+    portal = start_portal(args)
+    point_at(portal)
+    wifi_service.get_connected_wifi_name = lambda: COLLEGE_SSID
+    cfg = wifi_config.get()
+    keepalive = wifi_keepalive.KeepaliveScheduler(cfg.username, cfg.login_url,
+                                                  lifetime=cfg.session_lifetime, state_file=None)
+    engine = wifi_service.create_engine(keepalive=keepalive if cfg.keepalive_enabled else None)
+    engine.log = lambda message: None
+    started = time.time()
+    try:
+        run_engine(engine, args.duration)
+        ttis = [portal.login_times[0] - started] if portal.login_times else []
+        summarise("service", portal, started, time.time() - started, ttis)
+    finally:
+        portal.stop()
+
+def bench_monitor(args):
+    import wifi_monitor
+    portal = start_portal(args)
+    # The worker child inherits these through fork
+    point_at(portal)
+    wifi_auto_login.get_connected_wifi_name = lambda: COLLEGE_SSID
+    wifi_monitor.get_connected_wifi = lambda: COLLEGE_SSID
+    cfg = wifi_config.get()
+    keepalive = wifi_keepalive.KeepaliveScheduler(cfg.username, cfg.login_url,
+                                                  lifetime=cfg.session_lifetime, state_file=None)
+    engine = wifi_monitor.create_engine(COLLEGE_SSID, keepalive=keepalive if cfg.keepalive_enabled else None)
+    engine.log = lambda message: None
+    wifi_monitor.log_message = lambda message: None
+    started = time.time()
+    try:
+        run_engine(engine, args.duration)
+        ttis = [portal.login_times[0] - started] if portal.login_times else []
+        summarise("monitor", portal, started, time.time() - started, ttis)
+    finally:
+        wifi_monitor.login_worker.stop()
+        portal.stop()
+
+BENCHES = {"auto_login": bench_auto_login, "service": bench_service, "monitor": bench_monitor}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=120, help="seconds per long-running entry point")
+    parser.add_argument("--runs", type=int, default=3, help="wifi_auto_login runs")
+    parser.add_argument("--lifetime", type=float, default=20, help="portal idle session lifetime (s)")
+    parser.add_argument("--max-session", type=float, default=45, help="hard session cap (s), defeats keepalive")
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--reset-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--only", choices=sorted(BENCHES), action="append")
+    args = parser.parse_args()
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method("fork")
+    scratch = tempfile.mkdtemp(prefix="wifi-bench-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    wifi_log.close()
+    wifi_log._writer = wifi_log.LogWriter(path=os.path.join(scratch, "wifi_monitor.log"))
+
+    print(f"Portal: lifetime {args.lifetime:g}s, hard cap {args.max_session:g}s, delay {args.delay:g}s, "
+          f"resets {args.reset_rate:.0%}, 5xx {args.error_rate:.0%}; scratch dir {scratch}")
+    for name in args.only or BENCHES:
+        BENCHES[name](args)
+
+if __name__ == "__main__":
+    main()
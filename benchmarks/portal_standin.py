@@ -0,0 +1,334 @@
+"""Local stand-in for the campus Cyberoam/Sophos portal (10.11.200.1:8090).
+
+Usage: python benchmarks/portal_standin.py [--port 8090] [--lifetime 600]
+           [--delay 0] [--slow-rate 1] [--reset-rate 0] [--error-rate 0] [--reject] [--rate-limit N]
+
+Serves what the scripts talk to:
+  /httpclient.html        the login page (with an ETag; answers 304 when unchanged)
+  /login.xml              mode=191 login (mode=193 logout), Cyberoam-style XML
+  /live                   mode=192 keepalive: <ack>ack</ack> or <ack>login_again</ack>
+  /generate_204, /connecttest.txt, /ip, /
+                          connectivity checks: answered while the client has a
+                          session, redirected to the login page otherwise
+
+Sessions are per client IP and expire `lifetime` seconds after the last
+login or keepalive (and after `max_session` seconds regardless, if set).
+Faults are injected per request: `delay` seconds of latency (on a
+`slow_rate` fraction of requests, for tail latency), a connection
+reset with probability `reset_rate`, HTTP 500 with probability
+`error_rate`, and `reject` to answer every login with the wrong-password
+message. With `rate_limit`, logins beyond that many per second are answered
+503, as the real portal does when a whole lab logs in at once. Assigning
+`form` (action, username and password field names) changes the login page
+and moves the login endpoint, as a portal upgrade would. Point the scripts
+at it with PORTAL_URL/LOGIN_URL and [PROBES] URLS.
+"""
+import argparse
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LOGIN_PAGE = """<html><head><title>Cyberoam Captive Portal</title></head>
+<body><form name="frmHTTPClientLogin" action="{action}" method="post">
+<input type="text" name="{username}"><input type="password" name="{password}">
+<input type="hidden" name="mode" value="191"><input type="submit" value="Login">
+</form></body></html>"""
+DEFAULT_FORM = {"action": "login.xml", "username": "username", "password": "password"}
+
+LOGIN_OK = ("<?xml version='1.0' ?><requestresponse><status><![CDATA[LIVE]]></status>"
+            "<message><![CDATA[You are signed in as {username}]]></message>"
+            "<logoutmessage><![CDATA[You have successfully logged out]]></logoutmessage>"
+            "<state><![CDATA[]]></state></requestresponse>")
+LOGIN_BAD = ("<?xml version='1.0' ?><requestresponse><status><![CDATA[LOGIN]]></status>"
+             "<message><![CDATA[The system could not log you on. Make sure your password is correct]]></message>"
+             "</requestresponse>")
+LOGIN_FULL = ("<?xml version='1.0' ?><requestresponse><status><![CDATA[LOGIN]]></status>"
+              "<message><![CDATA[You have reached the maximum login limit.]]></message>"
+              "</requestresponse>")
+LOGOUT_OK = ("<?xml version='1.0' ?><requestresponse><status><![CDATA[LOGIN]]></status>"
+             "<message><![CDATA[You have successfully logged off]]></message></requestresponse>")
+
+CHECK_PATHS = {
+    "/generate_204": (204, ""),
+    "/connecttest.txt": (200, "Microsoft Connect Test"),
+    "/ip": (200, '{"origin": "203.0.113.7"}'),
+    "/": (200, "<html><body>Search</body></html>"),
+}
+
+class PortalStandIn:
+    """Threaded HTTP server emulating the portal, with counters and fault knobs"""
+
+    def __init__(self, host="127.0.0.1", port=0, users=None, lifetime=600, max_session=None,
+                 delay=0.0, slow_rate=1.0, reset_rate=0.0, error_rate=0.0, reject=False, max_sessions=None,
+                 rate_limit=None, seed=None):
+        self.users = users if users is not None else {"comp1": "Pcu@123456"}
+        self.lifetime = lifetime
+        self.max_session = max_session
+        self.delay = delay
+        self.slow_rate = slow_rate
+        self.reset_rate = reset_rate
+        self.error_rate = error_rate
+        self.reject = reject
+        self.max_sessions = max_sessions
+        self.rate_limit = rate_limit
+        self.form = dict(DEFAULT_FORM)
+        self._login_tokens = float(rate_limit or 0)
+        self._login_tokens_at = time.time()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sessions = {}  # client ip -> {"username", "started", "refreshed"}
+        self.counters = {"probes": 0, "logins": 0, "login_failures": 0, "lives": 0,
+                         "resets": 0, "errors": 0, "portal_pages": 0, "not_modified": 0,
+                         "throttled": 0}
+        self.recoveries = []   # Seconds from a session expiring to the next login
+        self.login_times = []  # Wall-clock time of every successful login
+        self.first_request_at = None  # Wall-clock time of the first request (reset it between runs)
+        self._expired_at = {}  # client ip -> when its last session expired
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._server.handle_error = lambda request, client_address: None  # Clients hanging up mid-request
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def portal_url(self):
+        return self.base_url + "/httpclient.html"
+
+    @property
+    def login_url(self):
+        return self.base_url + "/login.xml"
+
+    @property
+    def probe_urls(self):
+        return [self.base_url + "/generate_204", self.base_url + "/connecttest.txt"]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="portal-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def login_page(self):
+        return LOGIN_PAGE.format(**self.form)
+
+    @property
+    def etag(self):
+        return '"%08x"' % zlib.crc32(self.login_page.encode("utf-8"))
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    # ---- sessions ----
+
+    def _expiry(self, session):
+        expires = session["refreshed"] + self.lifetime
+        if self.max_session is not None:
+            expires = min(expires, session["started"] + self.max_session)
+        return expires
+
+    def session_for(self, client, now=None):
+        """The live session for a client IP, expiring it if its time is up"""
+        now = time.time() if now is None else now
+        with self.lock:
+            session = self.sessions.get(client)
+            if session is not None and now >= self._expiry(session):
+                self._expired_at[client] = self._expiry(session)
+                del self.sessions[client]
+                session = None
+            return session
+
+    @property
+    def unrecovered(self):
+        """Clients whose session expired and who have not logged in again"""
+        now = time.time()
+        with self.lock:
+            expired = [c for c, s in self.sessions.items() if now >= self._expiry(s)]
+            return len(expired) + len(self._expired_at)
+
+    def expire_all(self):
+        """Drop every session now, as the portal does on a timeout or restart"""
+        now = time.time()
+        with self.lock:
+            for client in self.sessions:
+                self._expired_at[client] = now
+            self.sessions.clear()
+
+    def _login(self, client, username, password):
+        if self.reject or self.users.get(username) != password:
+            self.count("login_failures")
+            return LOGIN_BAD
+        self.session_for(client)  # Settle any expiry first so the recovery is counted
+        now = time.time()
+        with self.lock:
+            if self.max_sessions is not None and client not in self.sessions and \
+                    sum(1 for s in self.sessions.values() if s["username"] == username) >= self.max_sessions:
+                self.counters["login_failures"] += 1
+                return LOGIN_FULL
+            expired_at = self._expired_at.pop(client, None)
+            if expired_at is not None:
+                self.recoveries.append(now - expired_at)
+            self.sessions[client] = {"username": username, "started": now, "refreshed": now}
+            self.counters["logins"] += 1
+            self.login_times.append(now)
+        return LOGIN_OK.format(username=username)
+
+    def _admit_login(self):
+        """Token bucket of `rate_limit` logins per second; False means answer 503"""
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.time()
+            self._login_tokens = min(self.rate_limit,
+                                     self._login_tokens + (now - self._login_tokens_at) * self.rate_limit)
+            self._login_tokens_at = now
+            if self._login_tokens < 1:
+                self.counters["throttled"] += 1
+                return False
+            self._login_tokens -= 1
+            return True
+
+    def _live(self, client):
+        session = self.session_for(client)
+        self.count("lives")
+        if session is None:
+            return "<ack><![CDATA[login_again]]></ack>"
+        with self.lock:
+            session["refreshed"] = time.time()
+        return "<ack><![CDATA[ack]]></ack>"
+
+    # ---- HTTP ----
+
+    def _handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body="", content_type="text/html", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(data)
+
+            def _faults(self):
+                """Apply injected faults; True if the request was consumed by one"""
+                if portal.delay and (portal.slow_rate >= 1 or portal.rng.random() < portal.slow_rate):
+                    time.sleep(portal.delay)
+                if portal.reset_rate and portal.rng.random() < portal.reset_rate:
+                    portal.count("resets")
+                    # RST instead of FIN: SO_LINGER with a zero timeout
+                    self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+                    self.close_connection = True
+                    return True
+                if portal.error_rate and portal.rng.random() < portal.error_rate:
+                    portal.count("errors")
+                    self._reply(500, "Internal Server Error")
+                    return True
+                return False
+
+            def _route(self, params):
+                client = self.client_address[0]
+                path = urlparse(self.path).path
+                if portal.first_request_at is None:
+                    portal.first_request_at = time.time()
+                if self._faults():
+                    return
+                if path == "/httpclient.html":
+                    if self.headers.get("If-None-Match") == portal.etag:
+                        portal.count("not_modified")
+                        self._reply(304, headers={"ETag": portal.etag})
+                        return
+                    portal.count("portal_pages")
+                    self._reply(200, portal.login_page, headers={"ETag": portal.etag})
+                elif path == "/" + portal.form["action"]:
+                    mode = params.get("mode", "191")
+                    if mode == "193":
+                        with portal.lock:
+                            portal.sessions.pop(client, None)
+                        self._reply(200, LOGOUT_OK, "text/xml")
+                    elif not portal._admit_login():
+                        self._reply(503, "Service Unavailable")
+                    else:
+                        body = portal._login(client, params.get(portal.form["username"], ""),
+                                             params.get(portal.form["password"], ""))
+                        self._reply(200, body, "text/xml")
+                elif path == "/live":
+                    self._reply(200, portal._live(client), "text/xml")
+                elif path in CHECK_PATHS:
+                    portal.count("probes")
+                    if portal.session_for(client) is None:
+                        self._reply(302, "", headers={"Location": portal.portal_url + "?redirect"})
+                    else:
+                        status, body = CHECK_PATHS[path]
+                        self._reply(status, body, "text/plain")
+                else:
+                    self._reply(404, "Not Found")
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                self._route({k: v[0] for k, v in query.items()})
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = parse_qs(self.rfile.read(length).decode("utf-8", "replace"))
+                self._route({k: v[0] for k, v in form.items()})
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the campus captive portal")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--lifetime", type=float, default=600, help="idle session lifetime (s)")
+    parser.add_argument("--max-session", type=float, default=None, help="hard session cap (s)")
+    parser.add_argument("--delay", type=float, default=0.0, help="latency added to requests (s)")
+    parser.add_argument("--slow-rate", type=float, default=1.0, help="fraction of requests delayed")
+    parser.add_argument("--reset-rate", type=float, default=0.0, help="fraction of connections reset")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--reject", action="store_true", help="answer every login with wrong password")
+    parser.add_argument("--rate-limit", type=float, default=None, help="logins per second before answering 503")
+    parser.add_argument("--user", action="append", default=[], metavar="NAME:PASSWORD")
+    args = parser.parse_args()
+    users = dict(u.split(":", 1) for u in args.user) or None
+    portal = PortalStandIn(args.host, args.port, users=users, lifetime=args.lifetime, max_session=args.max_session,
+                           delay=args.delay, slow_rate=args.slow_rate, reset_rate=args.reset_rate, error_rate=args.error_rate,
+                           reject=args.reject, rate_limit=args.rate_limit).start()
+    print(f"Portal stand-in on {portal.base_url}")
+    print(f"  PORTAL_URL = {portal.portal_url}")
+    print(f"  LOGIN_URL  = {portal.login_url}")
+    print(f"  [PROBES] URLS = {','.join(portal.probe_urls)}  (and TCP_TARGET empty)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        portal.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Replay a recorded trace against polling policies on a virtual clock.
+
+Usage: python benchmarks/replay_trace.py TRACE [--source wlan0] [--ssid NAME]
+           [--check-interval 30 60] [--stable-after 5 10] [--no-events] [--seed N]
+           [--check POLICY] [--tolerance 0.1]
+
+A trace (wifi_trace.py: [TRACE] FILE in config.ini, or
+benchmarks/sim_scheduler.py --trace) says when the machine was on which
+SSID and what its probes, logins and keepalives saw. The replay rebuilds
+the world the monitor lived in from it:
+
+  association     the SSID changes, as recorded
+  link events     roams and address changes, as recorded
+  session drops   at the first link event after the last probe (or
+                  keepalive) that saw us online, if one came before the
+                  probe that saw the portal; otherwise halfway between them
+  joins           keep their session if the first probe after them was online
+  portal outages  from a "portal down" until the portal is seen again
+  login outcomes  the recorded ones in order while the portal was up, then
+                  at their recorded failure rate
+
+Each policy then runs over that world on a virtual clock: it probes when it
+decides to (and on every SSID change and link event, unless --no-events)
+and logs in when a probe finds the portal. Drops happen when they happened
+in the trace, whatever the policy did. Reported per policy: outage minutes (on the
+college SSID without internet), probes and logins, next to what the
+recorded run itself did. "fixed" is the old wifi_service.main_loop policy
+(see sim_scheduler.LegacyPolicy), "adaptive" is wifi_scheduler.PollScheduler.
+
+--check POLICY is the self-consistency test: replaying the policy that made
+the trace (e.g. "adaptive 30s/10" for sim_scheduler.py --trace) must land
+within --tolerance of the recorded outage and probe counts, or the replay
+exits 1, since then its model of the world cannot be trusted to rank others.
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sim_scheduler import LegacyPolicy
+
+import wifi_trace
+from wifi_scheduler import PollScheduler
+
+LOGIN_TIME = 1.0  # Seconds from the probe that finds the portal to working internet
+
+class World:
+    """What a trace says happened, independent of the policy that recorded it"""
+
+    def __init__(self, target):
+        self.target = target
+        self.start = self.end = None
+        # (time, "ssid", name, kept_session) | (time, "link", reason) | (time, "drop") | (time, "portal", "up"/"down")
+        self.changes = []
+        self.login_outcomes = []  # Recorded outcomes while the portal was up, in order
+        self.login_failure_rate = 0.0
+        self.drops = 0
+        self.recorded = {"probes": 0, "logins": 0, "outage": 0.0, "on_network": 0.0}
+
+def _kept_session(events, i, target):
+    """Whether the first probe after the join at events[i] found us online"""
+    for _, _, kind, value in events[i + 1:]:
+        if kind == "ssid" and value != target:
+            return False
+        if kind == "login":
+            return False
+        if kind == "probe":
+            return value == "online"
+    return False
+
+def build_world(events, target=None):
+    """A World from (time, source, kind, value) events of one source, sorted by time"""
+    if target is None:
+        ssid = None
+        for _, _, kind, value in events:
+            if kind == "ssid":
+                ssid = value
+            elif kind == "probe" and ssid:
+                target = ssid  # Engines only probe on their target SSID
+                break
+    world = World(target)
+    if not events:
+        return world
+    world.start, world.end = events[0][0], events[-1][0]
+    recorded = world.recorded
+    ssid = None
+    joined_at = lost_at = last_online = link_since_online = None
+    online = portal_down = False
+
+    def seen_online(t):
+        nonlocal lost_at, online, last_online, link_since_online, portal_down
+        if lost_at is not None:
+            recorded["outage"] += t - lost_at
+            lost_at = None
+        online, last_online, link_since_online = True, t, None
+        if portal_down:
+            world.changes.append((t, "portal", "up"))
+            portal_down = False
+
+    for i, (t, _, kind, value) in enumerate(events):
+        if kind == "link":
+            world.changes.append((t, "link", value))
+            if online and link_since_online is None:
+                link_since_online = t
+            continue
+        if kind == "ssid":
+            if joined_at is not None:
+                recorded["on_network"] += t - joined_at
+                if lost_at is not None:
+                    recorded["outage"] += t - lost_at
+            ssid = value
+            kept = ssid == target and _kept_session(events, i, target)
+            world.changes.append((t, "ssid", ssid, kept))
+            joined_at = t if ssid == target else None
+            online, last_online, link_since_online = kept, (t if kept else None), None
+            lost_at = t if ssid == target and not kept else None
+            continue
+        if ssid != target:
+            continue
+        if kind == "probe":
+            recorded["probes"] += 1
+        if (kind, value) in (("probe", "online"), ("keepalive", "ack")):
+            seen_online(t)
+        elif (kind, value) == ("probe", "captive"):  # A keepalive "expired" is confirmed by the probe after it
+            if online:
+                if link_since_online is not None:
+                    drop_at = link_since_online  # The roam (or address change) cost the session
+                elif last_online is not None:
+                    drop_at = (last_online + t) / 2
+                else:
+                    drop_at = t
+                world.changes.append((drop_at, "drop"))
+                world.drops += 1
+                lost_at, online = drop_at, False
+        elif kind == "portal":
+            if (value == "down") != portal_down:
+                world.changes.append((t, "portal", value))
+                portal_down = value == "down"
+        elif kind == "login":
+            recorded["logins"] += 1
+            if not portal_down:
+                world.login_outcomes.append(value)
+            if value == "success":
+                seen_online(t)
+    if joined_at is not None:
+        recorded["on_network"] += world.end - joined_at
+        if lost_at is not None:
+            recorded["outage"] += world.end - lost_at
+    world.changes.sort(key=lambda change: change[0])
+    outcomes = world.login_outcomes
+    world.login_failure_rate = sum(o != "success" for o in outcomes) / len(outcomes) if outcomes else 0.0
+    return world
+
+def replay(world, policy_factory, events=True, seed=1):
+    """Run one policy over `world` on a virtual clock; returns outage, probes, logins"""
+    rng = random.Random(seed)
+    clock = {"now": world.start}
+    policy = policy_factory(lambda: clock["now"])
+    queue = [(change[0], 1, i) for i, change in enumerate(world.changes)]
+    queue.append((world.start, 2, -1))
+    heapq.heapify(queue)
+    next_probe = world.start
+
+    on_network = session = was_online = False
+    portal_up = True
+    joined_at = lost_at = None
+    outage = on_network_time = 0.0
+    probes = logins = 0
+    outcomes = iter(world.login_outcomes)
+
+    def login_works():
+        outcome = next(outcomes, None)
+        if outcome is None:
+            return rng.random() >= world.login_failure_rate
+        return outcome == "success"
+
+    while queue:
+        now, priority, index = heapq.heappop(queue)
+        if now > world.end:
+            break
+        clock["now"] = now
+        if priority == 2:
+            if now != next_probe:
+                continue  # Superseded by an earlier wake-up
+            online = on_network and session
+            if on_network:
+                probes += 1
+                if online:
+                    policy.on_online()
+                else:
+                    if was_online:
+                        policy.on_session_drop()
+                    if portal_up:
+                        logins += 1
+                    if portal_up and login_works():
+                        session = online = True
+                        probes += 1  # The verify probe
+                        policy.on_login()
+                        if lost_at is not None:
+                            outage += now + LOGIN_TIME - lost_at
+                            lost_at = None
+                    else:
+                        policy.on_failure()
+            was_online = online
+            next_probe = now + policy.next_delay(online, on_network)
+            heapq.heappush(queue, (next_probe, 2, -1))
+            continue
+
+        change = world.changes[index]
+        if change[1] == "ssid":
+            if on_network:
+                on_network_time += now - joined_at
+                if lost_at is not None:
+                    outage += now - lost_at
+            on_network = change[2] == world.target
+            session = on_network and change[3]
+            joined_at = now if on_network else None
+            lost_at = now if on_network and not session else None
+            was_online = False
+            policy.reset()
+            if on_network:
+                policy.on_risky_event("roam")
+            if events:
+                next_probe = now
+                heapq.heappush(queue, (next_probe, 2, -1))
+        elif change[1] == "link":
+            policy.on_risky_event(change[2])
+            if events:
+                next_probe = now
+                heapq.heappush(queue, (next_probe, 2, -1))
+        elif change[1] == "drop":
+            if on_network and session:
+                session, lost_at = False, now
+        elif change[1] == "portal":
+            portal_up = change[2] == "up"
+
+    if on_network:
+        on_network_time += world.end - joined_at
+        if lost_at is not None:
+            outage += world.end - lost_at
+    return {"outage": outage, "probes": probes, "logins": logins, "on_network": on_network_time}
+
+def policies(check_intervals, stable_afters, seed):
+    for interval in check_intervals:
+        yield f"fixed {interval}s", lambda clock, interval=interval: LegacyPolicy(clock, check_interval=interval)
+        for stable_after in stable_afters:
+            yield (f"adaptive {interval}s/{stable_after}",
+                   lambda clock, interval=interval, stable_after=stable_after: PollScheduler(
+                       base_interval=interval, stable_after=stable_after, clock=clock, rng=random.Random(seed)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace")
+    parser.add_argument("--source", help="adapter to replay (default: the first one in the trace)")
+    parser.add_argument("--ssid", help="college SSID (default: the one the trace probed on)")
+    parser.add_argument("--check-interval", type=int, nargs="+", default=[30], help="CHECK_INTERVAL values to try")
+    parser.add_argument("--stable-after", type=int, nargs="+", default=[5, 10], help="stable probes before backing off")
+    parser.add_argument("--no-events", action="store_true", help="no link-event wake-ups")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check", metavar="POLICY", help='the policy that recorded the trace, e.g. "adaptive 30s/10"')
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative error for --check")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    events = list(wifi_trace.read(args.trace))
+    sources = sorted({source for _, source, _, _ in events})
+    source = args.source or (sources[0] if sources else None)
+    events = sorted((e for e in events if e[1] == source), key=lambda e: e[0])
+    world = build_world(events, args.ssid)
+    if world.target is None or world.start is None:
+        sys.exit(f"{args.trace}: no probes on any SSID to replay")
+
+    hours = world.recorded["on_network"] / 3600
+    print(f"{args.trace}: {(world.end - world.start) / 86400:.1f} days, {hours:.1f} h on {world.target}"
+          + (f" via {source}" if source != "-" else "")
+          + f", {world.drops} session drops, login failure rate {world.login_failure_rate:.0%}")
+    if len(sources) > 1 and not args.source:
+        print(f"(other sources in the trace: {', '.join(sources[1:])}; pick one with --source)")
+    print(f"{'policy':<20}{'outage min':>11}{'probes':>9}{'logins':>8}{'probes/h':>10}")
+    rows = [("recorded", world.recorded)]
+    rows += [(name, replay(world, factory, not args.no_events, args.seed))
+             for name, factory in policies(args.check_interval, args.stable_after, args.seed)]
+    for name, r in rows:
+        per_hour = r["probes"] / (r["on_network"] / 3600) if r["on_network"] else 0.0
+        print(f"{name:<20}{r['outage'] / 60:11.1f}{r['probes']:9d}{r['logins']:8d}{per_hour:10.1f}")
+    print(f"replayed in {time.perf_counter() - started:.2f}s")
+    if args.check:
+        replayed = dict(rows).get(args.check)
+        if replayed is None:
+            sys.exit(f"--check: no policy named {args.check!r} (one of: {', '.join(name for name, _ in rows[1:])})")
+        errors = {key: abs(replayed[key] - world.recorded[key]) / max(world.recorded[key], 1)
+                  for key in ("outage", "probes")}
+        worst = max(errors, key=errors.get)
+        verdict = "ok" if errors[worst] <= args.tolerance else "FAILED"
+        print(f"check {args.check}: outage off by {errors['outage']:.1%}, probes by {errors['probes']:.1%} "
+              f"(tolerance {args.tolerance:.0%}) {verdict}")
+        if verdict != "ok":
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Fleet recovery after a portal restart, with and without login throttling.
+
+Usage: python benchmarks/sim_fleet.py [--hosts 200] [--check-interval 10]
+           [--rate-limit 20] [--jitter-window 30] [--fleet-rate 15]
+           [--timeout 300] [--only none|jitter|coordinator]
+
+A lab of --hosts machines is emulated in one process: the multi-interface
+daemon watches that many synthetic adapters, each bound to its own
+127.0.0.x address, so the portal stand-in sees one client per host. The
+stand-in answers 503 to logins beyond --rate-limit per second. Once every
+host is online the portal "restarts" (all sessions dropped) and each host
+notices within one --check-interval, as it would by polling. Scenarios:
+
+  none         every host logs in as soon as it notices (today's behaviour)
+  jitter       deterministic per-host slot in --jitter-window + token bucket
+  coordinator  slots granted by a local wifi_fleet.Coordinator at --fleet-rate
+
+Reported per scenario: time until the whole fleet is back online, login
+requests the portal saw, and how many of them it refused.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_daemon import fake_interfaces
+from portal_standin import PortalStandIn
+
+import wifi_daemon
+import wifi_fleet
+import wifi_portal
+
+COLLEGE_SSID = "PCU_Student"
+
+def wait_until(condition, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+def login_requests(portal):
+    return portal.counters["logins"] + portal.counters["login_failures"] + portal.counters["throttled"]
+
+def run(scenario, args):
+    fake_interfaces(args.hosts)
+    portal = PortalStandIn(lifetime=3600).start()  # The limit only applies after the restart
+    coordinator = None
+    fleet = None
+    if scenario != "none":
+        fleet = {"jitter_window": args.jitter_window}
+    if scenario == "coordinator":
+        coordinator = wifi_fleet.Coordinator("127.0.0.1", 0, rate=args.fleet_rate).start()
+        fleet["coordinator"] = "%s:%d" % coordinator.address
+    username, password = next(iter(portal.users.items()))
+    profile = wifi_daemon.Profile("lab", COLLEGE_SSID, portal.portal_url, portal.login_url, username, password)
+    daemon = wifi_daemon.Daemon([profile], portal.probe_urls, check_interval=args.check_interval,
+                                keepalive=False, fleet=fleet, max_workers=args.hosts,
+                                log=lambda message: None)
+    runner = threading.Thread(target=asyncio.run, args=(daemon.run(),), daemon=True)
+    runner.start()
+    try:
+        if not wait_until(lambda: len(portal.sessions) == args.hosts, args.timeout):
+            print(f"{scenario:<12} fleet never came online ({len(portal.sessions)}/{args.hosts})")
+            return
+        time.sleep(1)
+        before = login_requests(portal)
+        throttled_before = portal.counters["throttled"]
+
+        portal.rate_limit = args.rate_limit
+        portal.expire_all()
+        restarted = time.time()
+        engines = [engine for monitor in daemon.monitors.values() for engine in monitor.engines]
+        rng = random.Random(1)
+        for engine in engines:  # Each host's next poll lands somewhere in the next interval
+            threading.Timer(rng.uniform(0, args.check_interval), engine.wake, args=("event",)).start()
+
+        recovered = wait_until(lambda: len(portal.sessions) == args.hosts, args.timeout)
+        elapsed = time.time() - restarted
+        requests = login_requests(portal) - before
+        refused = portal.counters["throttled"] - throttled_before
+        recovery = f"{elapsed:6.1f}s" if recovered else f">{args.timeout:g}s ({len(portal.sessions)}/{args.hosts})"
+        print(f"{scenario:<12} fleet recovery {recovery}  login requests {requests:5d}  "
+              f"refused (503) {refused:5d}")
+    finally:
+        daemon.stop()
+        runner.join(10)
+        portal.stop()
+        if coordinator is not None:
+            coordinator.stop()
+
+SCENARIOS = ("none", "jitter", "coordinator")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--check-interval", type=int, default=10)
+    parser.add_argument("--rate-limit", type=float, default=20, help="portal logins/s before 503")
+    parser.add_argument("--jitter-window", type=float, default=30)
+    parser.add_argument("--fleet-rate", type=float, default=15, help="coordinator grants/s")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--only", choices=SCENARIOS, action="append")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="wifi-fleet-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    print(f"{args.hosts} hosts, check interval {args.check_interval}s, portal limit {args.rate_limit:g} logins/s")
+    for scenario in args.only or SCENARIOS:
+        run(scenario, args)
+
+if __name__ == "__main__":
+    main()
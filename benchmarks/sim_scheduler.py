@@ -0,0 +1,193 @@
+"""Simulate a week of campus WiFi and compare polling policies.
+
+Usage: python benchmarks/sim_scheduler.py [days] [--no-events] [--seed N] [--trace PATH]
+
+The simulated student is on campus 08:00-18:00, roams between APs every
+~45 minutes (a third of roams cost the portal session), and the portal drops
+sessions an hour (+/- 10s) after login. Both policies get the same link-event
+wake-ups unless --no-events is given. Reports probes per on-campus hour and the mean
+and worst outage (connectivity lost -> logged in again). --trace writes what the
+adaptive policy saw (joins, roams, probes, logins) as a wifi_trace file, for
+benchmarks/replay_trace.py; replaying it with --check "adaptive 30s/10"
+should reproduce the recorded outage and probe counts. PATH must not exist
+yet (traces are appended to, and an old one would be mixed in).
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import wifi_trace
+from wifi_scheduler import PollScheduler
+
+CHECK_INTERVAL = 30
+COLLEGE_SSID = "PCU_Student"
+DAY = 24 * 3600
+
+class LegacyPolicy:
+    """The old fixed multipliers from wifi_service.main_loop"""
+
+    def __init__(self, clock, check_interval=CHECK_INTERVAL, idle_after=10):
+        self.check_interval = check_interval
+        self.idle_after = idle_after  # max_idle_checks
+        self.failures = 0
+        self.idle = 0
+
+    def on_risky_event(self, kind="link"):
+        pass
+
+    def on_online(self):
+        self.failures = 0
+        self.idle += 1
+
+    def on_failure(self):
+        self.failures += 1
+        self.idle = 0
+
+    def on_login(self):
+        self.failures = 0
+        self.idle = 0
+
+    def on_session_drop(self):
+        self.idle = 0
+
+    def reset(self):
+        self.failures = 0
+        self.idle = 0
+
+    def next_delay(self, online, on_network=True):
+        if not on_network:
+            return self.check_interval * 2
+        if self.failures:
+            return self.check_interval * (2 ** min(self.failures, 3))
+        if online and self.idle >= self.idle_after:
+            return self.check_interval * 3
+        return self.check_interval
+
+def build_world(days, rng):
+    """Timeline of (time, kind) environment changes"""
+    changes = []
+    for day in range(days):
+        start = day * DAY + 8 * 3600 + rng.uniform(-900, 900)
+        end = day * DAY + 18 * 3600 + rng.uniform(-900, 900)
+        changes.append((start, "join"))
+        t = start + rng.expovariate(1 / 2700)
+        while t < end:
+            changes.append((t, "roam"))
+            t += rng.expovariate(1 / 2700)
+        changes.append((end, "leave"))
+    return sorted(changes)
+
+def simulate(policy_factory, days, events, seed, trace_path=None):
+    rng = random.Random(seed)
+    world = build_world(days, random.Random(seed))
+    clock = {"now": 0.0}
+    policy = policy_factory(lambda: clock["now"])
+    trace = wifi_trace.TraceRecorder(trace_path, clock=lambda: clock["now"]) if trace_path else None
+    record = trace.record if trace is not None else (lambda kind, value: None)
+
+    on_network = False
+    session_until = None  # Portal session expiry, None when logged out
+    lost_at = None        # When connectivity was lost (for outage accounting)
+    outages = []
+    probes = 0            # Connectivity probes (cycles off the college SSID only look at the SSID)
+    on_network_time = 0.0
+    joined_at = None
+    was_online = False
+
+    queue = [(t, 1, kind) for t, kind in world]
+    queue.append((0.0, 2, "probe"))
+    heapq.heapify(queue)
+    next_probe = 0.0
+
+    while queue:
+        now, _, kind = heapq.heappop(queue)
+        if now > days * DAY:
+            break
+        clock["now"] = now
+        if session_until is not None and now >= session_until:
+            if on_network and lost_at is None:
+                lost_at = session_until  # The portal timed the session out
+            session_until = None
+        if kind == "probe":
+            if now != next_probe:
+                continue  # Superseded by an earlier wake-up
+            online = on_network and session_until is not None
+            if on_network:
+                probes += 1
+                record("probe", "online" if online else "captive")
+            if online:
+                policy.on_online()
+            elif on_network:
+                if was_online:
+                    policy.on_session_drop()  # ONLINE -> CAPTIVE, as the engine reports it
+                if rng.random() < 0.95:
+                    session_until = now + 1 + rng.uniform(3590, 3610)
+                    policy.on_login()
+                    record("login", "success")
+                    record("probe", "online")  # The engine's verify probe
+                    online = True
+                    if lost_at is not None:
+                        outages.append(now + 1 - lost_at)
+                        lost_at = None
+                else:
+                    policy.on_failure()
+                    record("login", "unknown")
+            was_online = online
+            next_probe = now + policy.next_delay(online, on_network)
+            heapq.heappush(queue, (next_probe, 2, "probe"))
+            continue
+
+        if kind in ("join", "leave"):
+            record("ssid", COLLEGE_SSID if kind == "join" else "")
+        if kind == "join":
+            on_network, lost_at, joined_at = True, now, now
+            policy.reset()
+            policy.on_risky_event("roam")
+        elif kind == "leave":
+            on_network_time += now - joined_at
+            on_network, session_until, lost_at, was_online = False, None, None, False
+            policy.reset()
+        elif kind == "roam":
+            record("link", "roam")
+            policy.on_risky_event("roam")
+            if session_until is not None and rng.random() < 1 / 3:
+                session_until = None
+                lost_at = now
+        if events:
+            next_probe = now
+            heapq.heappush(queue, (next_probe, 2, "probe"))
+
+    if trace is not None:
+        trace.close()
+    return {
+        "probes_per_hour": probes / (on_network_time / 3600),
+        "mean_outage": sum(outages) / len(outages) if outages else 0.0,
+        "worst_outage": max(outages) if outages else 0.0,
+        "outages": len(outages),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("days", type=int, nargs="?", default=7, help="simulated days")
+    parser.add_argument("--no-events", action="store_true", help="no link-event wake-ups")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace", metavar="PATH", help="write what the adaptive policy saw to this new file")
+    args = parser.parse_args()
+    if args.trace and os.path.exists(args.trace):
+        sys.exit(f"{args.trace} already exists; --trace writes a new file")
+    days, events, seed, trace_path = args.days, not args.no_events, args.seed, args.trace
+    print(f"{days} simulated days, link events {'on' if events else 'off'}, seed {seed}")
+    print(f"{'policy':<10} {'probes/h':>9} {'outages':>8} {'mean outage':>12} {'worst':>8}")
+    for name, factory in [("fixed", LegacyPolicy),
+                          ("adaptive", lambda clock: PollScheduler(base_interval=CHECK_INTERVAL, stable_after=10,
+                                                                   clock=clock, rng=random.Random(seed)))]:
+        r = simulate(factory, days, events, seed, trace_path if name == "adaptive" else None)
+        print(f"{name:<10} {r['probes_per_hour']:9.1f} {r['outages']:8d} {r['mean_outage']:11.1f}s {r['worst_outage']:7.0f}s")
+
+if __name__ == "__main__":
+    main()
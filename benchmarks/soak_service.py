@@ -0,0 +1,192 @@
+"""Long-run soak of wifi_service.main_loop: file descriptors, RSS and heap must stay flat.
+
+Usage: python benchmarks/soak_service.py [--cycles 200000] [--warmup 5000]
+           [--phase 1000] [--drop-every 200] [--max-fd-growth 2]
+           [--max-rss-growth-mb 8] [--max-heap-growth-kb 512]
+
+main_loop runs unmodified except that the waits between cycles are zero,
+so a week of monitoring is compressed into minutes. The portal stand-in
+runs in a child process (so its sockets and memory are not counted) and
+the service alternates every --phase cycles between the TCP_TARGET online
+check and the HTTP classifier; in the HTTP phases the harness logs out
+every --drop-every cycles, so the login path runs too. Keepalive,
+metrics and config reload checks run as in production.
+
+After --warmup cycles the open fd count, RSS and tracemalloc's traced
+size are taken as the baseline; growth by the end beyond the budgets
+fails the run (exit 1). Learned state and logs go to a scratch directory.
+"""
+import argparse
+import functools
+import http.client
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import wifi_config
+import wifi_dns
+import wifi_keepalive
+import wifi_log
+import wifi_portal
+import wifi_service
+
+COLLEGE_SSID = "PCU_Student"
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1  # Not Linux: fd tracking unavailable
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def sample():
+    return {"fds": open_fds(), "rss": rss_mb(), "heap": tracemalloc.get_traced_memory()[0] / 1024}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_portal(port):
+    portal = subprocess.Popen([sys.executable, os.path.join(ROOT, "benchmarks", "portal_standin.py"),
+                               "--port", str(port), "--lifetime", "3600"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return portal
+        except OSError:
+            time.sleep(0.05)
+    portal.kill()
+    raise RuntimeError("portal stand-in did not start")
+
+def log_out(port, username):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("POST", "/login.xml", body=f"mode=193&username={username}",
+                     headers={"Content-Type": "application/x-www-form-urlencoded"})
+        conn.getresponse().read()
+    finally:
+        conn.close()
+
+class Driver:
+    """Stands in for the SSID lookup: counts cycles and steers the run"""
+
+    def __init__(self, args, port):
+        self.args = args
+        self.port = port
+        self.cycles = 0
+        self.engine = None
+        self.baseline = None
+        self.logins_forced = 0
+        self.started = time.time()
+
+    def __call__(self):
+        self.cycles += 1
+        n = self.cycles
+        args = self.args
+        if n % args.phase == 0:
+            tcp_phase = (n // args.phase) % 2 == 1
+            wifi_config.override(tcp_target=f"127.0.0.1:{self.port}" if tcp_phase else "")
+        if n % args.drop_every == 0 and wifi_config.get().tcp_target == "":
+            log_out(self.port, wifi_config.get().username)
+            self.logins_forced += 1
+        if n == args.warmup:
+            self.baseline = sample()
+        if n % max(1, args.cycles // 10) == 0:
+            now = sample()
+            print(f"{n:8d} cycles  {n / (time.time() - self.started):6.0f}/s  fds {now['fds']:4d}  "
+                  f"rss {now['rss']:6.1f} MB  heap {now['heap']:8.0f} KB", flush=True)
+        if n >= args.cycles and self.engine is not None:
+            self.engine.stop()
+        return COLLEGE_SSID
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=200000)
+    parser.add_argument("--warmup", type=int, default=5000)
+    parser.add_argument("--phase", type=int, default=1000, help="cycles per TCP/HTTP check phase")
+    parser.add_argument("--drop-every", type=int, default=200, help="log out this often in HTTP phases")
+    parser.add_argument("--max-fd-growth", type=int, default=2)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=8)
+    parser.add_argument("--max-heap-growth-kb", type=float, default=512)
+    args = parser.parse_args()
+    args.warmup = min(args.warmup, args.cycles // 2)
+
+    scratch = tempfile.mkdtemp(prefix="wifi-soak-")
+    wifi_portal.METHOD_CACHE_FILE = os.path.join(scratch, ".login_method.json")
+    wifi_portal.FORM_CACHE_FILE = os.path.join(scratch, ".portal_form.json")
+    wifi_portal.LATENCY_FILE = os.path.join(scratch, ".login_latency.json")
+    wifi_dns.CACHE_FILE = os.path.join(scratch, ".dns_cache.json")
+    wifi_log.close()
+    wifi_log._writer = wifi_log.LogWriter(path=os.path.join(scratch, "wifi_monitor.log"))
+    wifi_service.wifi_keepalive.KeepaliveScheduler = functools.partial(
+        wifi_keepalive.KeepaliveScheduler, state_file=os.path.join(scratch, ".keepalive.json"))
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])  # main_loop keeps these
+
+    port = free_port()
+    portal = start_portal(port)
+    base = f"http://127.0.0.1:{port}"
+    wifi_config.override(college_wifi_name=COLLEGE_SSID, portal_url=base + "/httpclient.html",
+                         login_url=base + "/login.xml", probe_urls=[base + "/generate_204", base + "/connecttest.txt"],
+                         alternative_urls=[], tcp_target="", username="comp1", password="Pcu@123456",
+                         event_source="polling", fleet_enabled=False, session_lifetime=20,
+                         metrics_textfile=os.path.join(scratch, "wifi_metrics.prom"), metrics_port=0)
+
+    driver = Driver(args, port)
+    wifi_service.get_connected_wifi_name = driver
+    create_engine = wifi_service.create_engine
+
+    def create_fast_engine(*a, **kw):
+        engine = driver.engine = create_engine(*a, **kw)
+        engine.next_delay = lambda: 0  # Back-to-back cycles
+        engine.verify_delay = 0
+        return engine
+
+    wifi_service.create_engine = create_fast_engine
+    tracemalloc.start()
+    started = time.time()
+    try:
+        wifi_service.main_loop()
+    finally:
+        end = sample()
+        tracemalloc.stop()
+        portal.terminate()
+        portal.wait(10)
+
+    base_sample = driver.baseline or end
+    growth = {key: end[key] - base_sample[key] for key in end}
+    elapsed = time.time() - started
+    print(f"{driver.cycles} cycles in {elapsed:.0f}s ({driver.cycles / elapsed:.0f}/s), "
+          f"{driver.logins_forced} forced logouts, final state {driver.engine.state}")
+    print(f"growth after warm-up: fds {growth['fds']:+d}  rss {growth['rss']:+.1f} MB  "
+          f"heap {growth['heap']:+.0f} KB")
+    failures = []
+    if growth["fds"] > args.max_fd_growth:
+        failures.append(f"fd count grew by {growth['fds']}")
+    if growth["rss"] > args.max_rss_growth_mb:
+        failures.append(f"RSS grew by {growth['rss']:.1f} MB")
+    if growth["heap"] > args.max_heap_growth_kb:
+        failures.append(f"traced heap grew by {growth['heap']:.0f} KB")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,158 +1,122 @@
-import subprocess
-import socket
 import time
-import requests
 from datetime import datetime
-import configparser
-import os
 import sys
 
+import wifi_config
+import wifi_http
+import wifi_iface
+import wifi_log
+import wifi_metrics
+import wifi_portal
+import wifi_probe
+import wifi_scheduler
+
 def log_error(msg):
-    # Log errors to wifi_monitor.log only
-    log_path = os.path.join(os.path.dirname(__file__), 'wifi_monitor.log')
+    # Log errors to wifi_monitor.log only (shared, batched writer)
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    try:
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] [AUTO-LOGIN ERROR] {msg}\n")
-    except:
-        pass
+    wifi_log.write(f"[{timestamp}] [AUTO-LOGIN ERROR] {msg}")
 
-# Load configuration
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), 'config.ini')
+def get_connected_wifi_name():
+    """Get currently connected WiFi name (cached, see wifi_iface)"""
+    return wifi_iface.get_connected_ssid()
 
-# Default configuration
-COLLEGE_WIFI_NAME = "PCU_Student"
-PORTAL_URL = "http://10.11.200.1:8090/httpclient.html"
-LOGIN_URL = "http://10.11.200.1:8090/login.xml"
-USERNAME = "comp1"
-PASSWORD = "Pcu@123456"
-CHECK_INTERVAL = 30
-MAX_LOGIN_ATTEMPTS = 3
+# One classification per decision: the checks below all read the last answer
+classifier = wifi_probe.ConfigClassifier()
 
-# Load from config file
-try:
-    if os.path.exists(config_path):
-        config.read(config_path)
-        COLLEGE_WIFI_NAME = config.get('WIFI_SETTINGS', 'COLLEGE_WIFI_NAME', fallback=COLLEGE_WIFI_NAME)
-        PORTAL_URL = config.get('WIFI_SETTINGS', 'PORTAL_URL', fallback=PORTAL_URL)
-        LOGIN_URL = config.get('WIFI_SETTINGS', 'LOGIN_URL', fallback=LOGIN_URL)
-        USERNAME = config.get('CREDENTIALS', 'USERNAME', fallback=USERNAME)
-        PASSWORD = config.get('CREDENTIALS', 'PASSWORD', fallback=PASSWORD)
-        CHECK_INTERVAL = config.getint('MONITORING', 'CHECK_INTERVAL', fallback=CHECK_INTERVAL)
-except Exception as e:
-    log_error(f"Error loading config: {e}, using defaults")
+VERIFY_DELAY = 5  # Seconds between a successful login and the check that it worked
 
-def get_connected_wifi_name():
+def check_internet_connectivity(deadline=None):
+    """Probe afresh (starts a new cycle); True if online"""
     try:
-        result = subprocess.check_output("netsh wlan show interfaces", shell=True).decode()
-        for line in result.split('\n'):
-            if "SSID" in line and "BSSID" not in line:
-                return line.split(":")[1].strip()
-    except Exception as e:
-        log_error(f"Error getting WiFi name: {e}")
-    return None
-
-def check_internet_connectivity():
-    try:
-        test_urls = [
-            "http://www.google.com",
-            "http://httpbin.org/ip",
-            "http://www.msftconnecttest.com/connecttest.txt"
-        ]
-        for url in test_urls:
-            try:
-                response = requests.get(url, timeout=5, allow_redirects=False)
-                if response.status_code == 302 or response.status_code == 301:
-                    location = response.headers.get('Location', '')
-                    if '10.11.200.1' in location or 'httpclient.html' in location:
-                        return False
-                elif response.status_code == 200:
-                    if 'httpclient.html' not in response.text and '10.11.200.1' not in response.text:
-                        return True
-                    else:
-                        return False
-            except requests.exceptions.RequestException:
-                continue
-        return False
+        return classifier.check_online(deadline)
     except Exception as e:
         log_error(f"Internet connectivity check error: {e}")
     return False
 
-def detect_captive_portal():
-    try:
-        response = requests.get("http://www.google.com", timeout=5, allow_redirects=False)
-        if response.status_code in [302, 301, 307]:
-            location = response.headers.get('Location', '')
-            if '10.11.200.1' in location or 'httpclient.html' in location:
-                return True
-        try:
-            portal_response = requests.get(PORTAL_URL, timeout=5)
-            if portal_response.status_code == 200:
-                return True
-        except:
-            pass
-        return False
-    except Exception as e:
-        log_error(f"Captive portal detection error: {e}")
-    return True  # Assume portal exists if we can't check
-
 def is_portal_accessible():
+    """Whether the last check reached the portal (no extra requests)"""
     try:
-        socket.create_connection(("10.11.200.1", 8090), timeout=5)
-        return True
-    except:
+        return classifier.portal_reachable()
+    except Exception:
         return False
 
-def login_to_wifi():
-    payload = {
-        "mode": "191",
-        "username": USERNAME,
-        "password": PASSWORD,
-        "a": int(time.time() * 1000)
-    }
+def login_to_wifi(deadline=None):
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': PORTAL_URL,
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        response = requests.post(LOGIN_URL, data=payload, headers=headers, timeout=10)
-        if "LIVE" in response.text or response.status_code == 200:
-            return True
-        else:
-            return False
+        cfg = wifi_config.get()
+        return wifi_portal.login(cfg.username, cfg.password, cfg.login_url, referer=cfg.portal_url,
+                                 timeout=cfg.timeout, alternative_urls=cfg.alternative_urls,
+                                 hedge_delay=cfg.hedge_delay, deadline=deadline)
     except Exception as e:
         log_error(f"Login error: {e}")
+    return wifi_portal.LoginResult(wifi_portal.UNKNOWN, "login raised an error")
+
+def _out_of_time(deadline, step, reason):
+    """Stop the cycle cleanly: record why in the log and wifi_cycle_deadline_total"""
+    deadline.stop(reason)
+    wifi_metrics.inc("wifi_cycle_deadline_total", step=step)
+    log_error(f"Login cycle stopped after {deadline.elapsed():.1f}s of its {deadline.budget}s budget: {reason}")
     return False
 
 def smart_wifi_handler():
-    wifi_name = get_connected_wifi_name()
-    if wifi_name != COLLEGE_WIFI_NAME:
+    """One login cycle, kept within CYCLE_BUDGET seconds.
+
+    Every probe and POST gets only what is left of the budget (see
+    wifi_scheduler.Deadline); a step that no longer fits is skipped and the
+    cycle returns False with the reason logged.
+    """
+    cfg = wifi_config.get()
+    deadline = wifi_scheduler.Deadline(cfg.cycle_budget)
+    with wifi_metrics.phase("ssid"):
+        wifi_name = get_connected_wifi_name()
+    wifi_http.note_ssid(wifi_name)
+    if wifi_name != cfg.college_wifi_name:
         return False
-    if check_internet_connectivity():
+    with wifi_metrics.phase("probe"):
+        online = check_internet_connectivity(deadline)
+    if online:
         return True
-    if detect_captive_portal():
-        pass
-    else:
-        pass
-    if not is_portal_accessible():
-        log_error("Portal is not accessible. Cannot proceed with login.")
+    if deadline.expired:
+        return _out_of_time(deadline, "probe", "the connectivity check used up the budget")
+    with wifi_metrics.phase("portal"):
+        reachable = is_portal_accessible()
+    if not reachable:
+        verdict = classifier.last.verdict if classifier.last is not None else wifi_probe.OFFLINE
+        log_error(f"Portal is not accessible ({verdict}). Cannot proceed with login.")
         return False
-    for attempt in range(1, MAX_LOGIN_ATTEMPTS + 1):
-        if login_to_wifi():
-            time.sleep(5)
-            if check_internet_connectivity():
+    for attempt in range(1, cfg.max_login_attempts + 1):
+        if deadline.expired:
+            return _out_of_time(deadline, "login", f"no time left for login attempt {attempt}")
+        with wifi_metrics.phase("login"):
+            result = login_to_wifi(deadline)
+        if result:
+            if not deadline.allows(VERIFY_DELAY):
+                log_error("Login succeeded, but there is no time left in this cycle to verify it")
+                return True
+            with wifi_metrics.phase("verify"):
+                time.sleep(VERIFY_DELAY)
+                online = check_internet_connectivity(deadline)
+            wifi_portal.report_verification(result, online)
+            if online:
                 return True
             else:
                 log_error("Login appeared successful but internet still not working")
-        if attempt < MAX_LOGIN_ATTEMPTS:
-            wait_time = attempt * 2
-            time.sleep(wait_time)
-    log_error(f"All {MAX_LOGIN_ATTEMPTS} login attempts failed.")
+        elif not result.retryable or result.retry_after:
+            # Bad credentials or a full session table won't clear in a few seconds
+            log_error(f"Login rejected ({result.outcome}): {result.message}. Not retrying.")
+            return False
+        if attempt < cfg.max_login_attempts:
+            delay = wifi_scheduler.backoff_delay(attempt, base=2, cap=10)
+            if not deadline.allows(delay):
+                return _out_of_time(deadline, "backoff", f"no time left for login attempt {attempt + 1}")
+            time.sleep(delay)
+    log_error(f"All {cfg.max_login_attempts} login attempts failed.")
     return False
 
 def main():
+    cfg = wifi_config.get()  # Settings are read here, on first use, not at import
+    # One-shot: a few plain-http requests, then exit; skip importing requests
+    if all(url.startswith("http://") for url in cfg.probe_urls + cfg.alternative_urls + [cfg.portal_url, cfg.login_url]):
+        wifi_http.use_fast_path()
     try:
         success = smart_wifi_handler()
         if success:
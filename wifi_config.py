@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(SCRIPT_DIR, "config.ini")
+
+# ---- CONFIG ----
+RELOAD_CHECK = 2.0  # get() looks at config.ini's mtime at most this often
+EVENT_SOURCES = ("auto", "netlink", "nmcli", "file", "polling")
+# Read once at startup (threads, sockets, files); everything else applies on the next cycle
+RESTART_FIELDS = ("event_source", "event_file", "keepalive_enabled", "metrics_textfile", "metrics_port", "trace_file",
+                  "control_port", "fleet_enabled", "fleet_jitter_window", "fleet_login_burst", "fleet_login_refill",
+                  "fleet_coordinator", "daemon_interfaces", "daemon_max_workers")
+# ----------------
+
+# attribute -> (section, key, kind, default); the one place defaults live
+FIELDS = {
+    "college_wifi_name": ("WIFI_SETTINGS", "COLLEGE_WIFI_NAME", "str", "PCU_Student"),
+    "portal_url": ("WIFI_SETTINGS", "PORTAL_URL", "url", "http://10.11.200.1:8090/httpclient.html"),
+    "login_url": ("WIFI_SETTINGS", "LOGIN_URL", "url", "http://10.11.200.1:8090/login.xml"),
+    "username": ("CREDENTIALS", "USERNAME", "str", "comp1"),
+    "password": ("CREDENTIALS", "PASSWORD", "str", "Pcu@123456"),
+    "check_interval": ("MONITORING", "CHECK_INTERVAL", "int", 30),
+    "timeout": ("MONITORING", "TIMEOUT", "int", 10),
+    "max_login_attempts": ("MONITORING", "MAX_LOGIN_ATTEMPTS", "int", 3),
+    "cycle_budget": ("MONITORING", "CYCLE_BUDGET", "int", 50),
+    "event_source": ("MONITORING", "EVENT_SOURCE", "str", "auto"),
+    "event_file": ("MONITORING", "EVENT_FILE", "optional", None),
+    "keepalive_enabled": ("KEEPALIVE", "ENABLED", "bool", True),
+    "keepalive_url": ("KEEPALIVE", "URL", "optional-url", None),
+    "session_lifetime": ("KEEPALIVE", "SESSION_LIFETIME", "int", 600),
+    "alternative_urls": ("ADVANCED", "ALTERNATIVE_URLS", "url-list", []),
+    "hedge_delay": ("ADVANCED", "HEDGE_DELAY", "auto-float", None),
+    # Defaults spelled out rather than imported, so reading config stays cheap for
+    # the one-shot login (same values as wifi_probe.DEFAULT_* and wifi_fleet)
+    "probe_urls": ("PROBES", "URLS", "url-list", ["http://www.google.com", "http://httpbin.org/ip",
+                                                  "http://www.msftconnecttest.com/connecttest.txt"]),
+    "probe_quorum": ("PROBES", "QUORUM", "int", 1),
+    "tcp_target": ("PROBES", "TCP_TARGET", "str", "8.8.8.8:53"),
+    "metrics_textfile": ("METRICS", "TEXTFILE", "optional", "wifi_metrics.prom"),
+    "metrics_port": ("METRICS", "HTTP_PORT", "int", 0),
+    "trace_file": ("TRACE", "FILE", "optional", None),
+    "control_port": ("CONTROL", "PORT", "int", 0),
+    "fleet_enabled": ("FLEET", "ENABLED", "bool", False),
+    "fleet_jitter_window": ("FLEET", "JITTER_WINDOW", "float", 60),
+    "fleet_login_burst": ("FLEET", "LOGIN_BURST", "int", 3),
+    "fleet_login_refill": ("FLEET", "LOGIN_REFILL", "float", 20),
+    "fleet_coordinator": ("FLEET", "COORDINATOR", "optional", None),
+    "daemon_interfaces": ("DAEMON", "INTERFACES", "list", []),
+    "daemon_max_workers": ("DAEMON", "MAX_WORKERS", "int", 16),
+}
+
+# attribute -> (check, message) applied after parsing
+RULES = {
+    "check_interval": (lambda v: v >= 1, "must be at least 1 second"),
+    "timeout": (lambda v: v >= 1, "must be at least 1 second"),
+    "max_login_attempts": (lambda v: v >= 1, "must be at least 1"),
+    "cycle_budget": (lambda v: v >= 10, "must be at least 10 seconds"),
+    "event_source": (lambda v: v in EVENT_SOURCES, f"must be one of {', '.join(EVENT_SOURCES)}"),
+    "session_lifetime": (lambda v: v >= 1, "must be at least 1 second"),
+    "probe_urls": (lambda v: len(v) > 0, "needs at least one URL"),
+    "probe_quorum": (lambda v: v >= 1, "must be at least 1"),
+    "hedge_delay": (lambda v: v is None or v >= 0, "must not be negative"),
+    "metrics_port": (lambda v: 0 <= v <= 65535, "must be a port number (0 disables)"),
+    "control_port": (lambda v: 0 <= v <= 65535, "must be a port number (0 disables)"),
+    "fleet_jitter_window": (lambda v: v >= 0, "must not be negative"),
+    "fleet_login_burst": (lambda v: v >= 1, "must be at least 1"),
+    "fleet_login_refill": (lambda v: v >= 0, "must not be negative"),
+    "daemon_max_workers": (lambda v: v >= 1, "must be at least 1"),
+}
+
+class ConfigError(ValueError):
+    pass
+
+def _is_url(value):
+    return value.startswith(("http://", "https://"))
+
+def _convert(parser, section, key, kind, default):
+    raw = parser.get(section, key, fallback=None)
+    if raw is None:
+        return default
+    raw = raw.strip()
+    if kind == "int":
+        try:
+            return int(raw)
+        except ValueError:
+            raise ConfigError(f"expected a whole number, got {raw!r}")
+    if kind == "auto-float" and raw.lower() in ("", "auto"):
+        return None  # Worked out at run time
+    if kind in ("float", "auto-float"):
+        try:
+            return float(raw)
+        except ValueError:
+            raise ConfigError(f"expected a number, got {raw!r}")
+    if kind == "bool":
+        if raw.lower() not in parser.BOOLEAN_STATES:
+            raise ConfigError(f"expected true or false, got {raw!r}")
+        return parser.BOOLEAN_STATES[raw.lower()]
+    if kind in ("list", "url-list"):
+        items = [item.strip() for item in raw.split(",") if item.strip()]
+        if kind == "url-list":
+            if not items:
+                return default
+            bad = [item for item in items if not _is_url(item)]
+            if bad:
+                raise ConfigError(f"not an http(s) URL: {', '.join(bad)}")
+        return items
+    if kind in ("optional", "optional-url"):
+        if not raw:
+            return None
+        if kind == "optional-url" and not _is_url(raw):
+            raise ConfigError(f"not an http(s) URL: {raw!r}")
+        return raw
+    if kind == "url" and not _is_url(raw):
+        raise ConfigError(f"not an http(s) URL: {raw!r}")
+    return raw
+
+class Config:
+    """Typed, validated settings from config.ini (one attribute per FIELDS entry).
+
+    `problems` lists every value that was rejected; those fields keep their
+    defaults. `parser` is the raw ConfigParser for sections that are not
+    fixed fields (the daemon's [PROFILE:<name>] sections).
+    """
+
+    def __init__(self, parser=None, path=None, mtime=None):
+        self.path = path
+        self.mtime = mtime
+        self.parser = parser
+        self.problems = []
+        for name, (section, key, kind, default) in FIELDS.items():
+            value = list(default) if isinstance(default, list) else default
+            if parser is not None:
+                try:
+                    value = _convert(parser, section, key, kind, value)
+                except ConfigError as e:
+                    self.problems.append(f"[{section}] {key}: {e}")
+            setattr(self, name, value)
+        for name, (check, message) in RULES.items():
+            if not check(getattr(self, name)):
+                section, key, _, default = FIELDS[name]
+                self.problems.append(f"[{section}] {key} = {getattr(self, name)!r} {message}")
+                setattr(self, name, list(default) if isinstance(default, list) else default)
+        if self.event_source == "file" and not self.event_file:
+            self.problems.append("[MONITORING] EVENT_SOURCE = 'file' needs EVENT_FILE")
+            self.event_source = FIELDS["event_source"][3]
+
+    def replace(self, **values):
+        """A copy with some values swapped (how benchmarks point a front-end elsewhere)"""
+        copy = Config.__new__(Config)
+        copy.__dict__.update(self.__dict__)
+        for name, value in values.items():
+            if name not in FIELDS:
+                raise AttributeError(f"unknown setting {name!r}")
+            setattr(copy, name, value)
+        return copy
+
+    def changed(self, other):
+        """Names of the fields whose values differ from `other`"""
+        return [name for name in FIELDS if getattr(self, name) != getattr(other, name)]
+
+def load(path=None):
+    """Parse config.ini (or `path`) into a fresh Config; a missing file gives the defaults"""
+    import configparser
+
+    path = path or CONFIG_FILE
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return Config(path=path)
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(path, encoding="utf-8")
+    except configparser.Error as e:
+        config = Config(path=path, mtime=mtime)
+        config.problems.append(f"could not parse {os.path.basename(path)}: {e}")
+        return config
+    return Config(parser, path, mtime)
+
+def _default_log(message):
+    import wifi_log
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    wifi_log.write(f"[{timestamp}] {message}")
+
+# ---- Shared instance with hot reload ----
+
+_current = None
+_overrides = {}
+_listeners = []
+_checked_at = 0.0
+_lock = threading.Lock()
+log = _default_log  # Where reloads and rejected edits are reported; front-ends point it at their log
+
+def get():
+    """The shared Config, loaded on first use and reloaded when config.ini changes"""
+    global _current
+    if _current is None:
+        with _lock:
+            if _current is None:
+                _current = _apply_overrides(load())
+                for problem in _current.problems:
+                    log(f"⚠️ Config: {problem} (using the default)")
+    elif time.monotonic() - _checked_at >= RELOAD_CHECK:
+        reload_if_changed()
+    return _current
+
+def _apply_overrides(config):
+    return config.replace(**_overrides) if _overrides else config
+
+def reload_if_changed():
+    """Re-read config.ini if its mtime moved; True if new settings were applied.
+
+    An edit with any invalid value is rejected as a whole (and reported
+    once), so a half-typed change never replaces a working config.
+    """
+    global _current, _checked_at
+    with _lock:
+        _checked_at = time.monotonic()
+        old = _current
+        path = old.path if old is not None else CONFIG_FILE
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        if old is not None and mtime == old.mtime:
+            return False
+        new = _apply_overrides(load(path))
+        if new.problems:
+            if old is not None:
+                old.mtime = mtime  # Report this edit once, not on every check
+            for problem in new.problems:
+                log(f"⚠️ Config change rejected: {problem}")
+            return False
+        _current = new
+    changed = new.changed(old) if old is not None else list(FIELDS)
+    if old is not None and changed:
+        log(f"🔄 Config reloaded: {', '.join(changed)} changed")
+        pending = [name for name in changed if name in RESTART_FIELDS]
+        if pending:
+            log(f"ℹ️ Restart to apply: {', '.join(pending)}")
+    for callback in list(_listeners):
+        try:
+            callback(new, old)
+        except Exception as e:
+            log(f"⚠️ Config reload handler failed: {e}")
+    return True
+
+def on_reload(callback):
+    """Call `callback(new, old)` after every applied reload"""
+    _listeners.append(callback)
+    return callback
+
+def follow(engine, keepalive=None):
+    """Keep a running MonitorEngine (and its keepalive) in step with config reloads"""
+    def apply(new, old):
+        engine.configure(target_ssid=new.college_wifi_name, check_interval=new.check_interval)
+        if keepalive is not None:
+            keepalive.configure(new.username, new.login_url, new.keepalive_url)
+    engine.before_cycle = get
+    return on_reload(apply)
+
+def override(**values):
+    """Pin settings regardless of config.ini (benchmarks, tests); kept across reloads"""
+    global _current
+    for name in values:
+        if name not in FIELDS:
+            raise AttributeError(f"unknown setting {name!r}")
+    with _lock:
+        _overrides.update(values)
+        if _current is not None:
+            _current = _current.replace(**values)
+
+def reset():
+    """Forget the shared instance, overrides and reload handlers; the next get() loads afresh"""
+    global _current
+    with _lock:
+        _current = None
+        _overrides.clear()
+        del _listeners[:]
@@ -0,0 +1,193 @@
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs
+
+# ---- CONTROL ----
+# A localhost HTTP endpoint, like the metrics one:
+#   GET  /status   every engine's state, last probe and login, session age
+#   POST /probe    run a cycle now (probe, and log in if the portal holds us)
+#   POST /login    log in now, even if the last probe found us online
+# ?interface=wlan0 narrows any of them to one adapter (wifi_daemon.py).
+HOST = "127.0.0.1"
+COMMANDS = ("probe", "login")
+WAIT_TIMEOUT = 90  # CLI: how long to wait for the woken cycle to finish
+# -----------------
+
+class ControlServer:
+    """Serves /status, /probe and /login for the engines of one front-end.
+
+    `engines` is a callable returning the engines to report on and wake, as
+    the daemon's set changes when adapters come and go. Commands only wake
+    the engines and answer 202 at once; the cycle they run shows up in
+    /status ("cycles" goes up). Requests carrying an Origin header come
+    from a web page, not from a local tool, and are refused.
+    """
+
+    def __init__(self, engines, port=0, host=HOST, log=print):
+        self.engines = engines
+        self.port = port
+        self.host = host
+        self.log = log
+        self._server = None
+
+    def start(self):
+        if self.port:
+            self._serve()
+        return self
+
+    def handle(self, method, path):
+        """(HTTP status, JSON-able body) for one request"""
+        route, _, query = path.partition("?")
+        route = route.rstrip("/") or "/status"
+        interface = parse_qs(query).get("interface", [None])[0]
+        engines = [engine for engine in self.engines() if interface is None or engine.interface == interface]
+        if route == "/status":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, {"pid": os.getpid(), "engines": [engine.status() for engine in engines]}
+        command = route[1:]
+        if command not in COMMANDS:
+            return 404, {"error": f"unknown path {route}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        if not engines:
+            return 404, {"error": f"no monitor on {interface}" if interface else "no monitor running"}
+        statuses = [engine.status() for engine in engines]  # Taken before waking, so "cycles" is a baseline
+        for engine in engines:
+            if command == "login":
+                engine.request_login()
+            else:
+                engine.wake("control")
+        self.log(f"🎛️ Control: {command} requested" + (f" on {interface}" if interface else ""))
+        return 202, {"command": command, "engines": statuses}
+
+    def _serve(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        control = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                if self.headers.get("Origin"):
+                    code, body = 403, {"error": "requests from web pages are not accepted"}
+                else:
+                    code, body = control.handle(self.command, self.path)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass  # Requests are logged by handle() when they do something
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="wifi-control-http", daemon=True).start()
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server is not None else None
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+# ---- client ----
+
+def request(method, path, port, host=HOST, timeout=5):
+    """(HTTP status, decoded body) from a running front-end's control endpoint"""
+    import http.client  # Plain connection: proxy settings must not apply to localhost
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request(method, path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+
+def _seconds(value):
+    if value is None:
+        return "-"
+    value = int(value)
+    if value < 120:
+        return f"{value}s"
+    if value < 7200:
+        return f"{value // 60}m"
+    return f"{value // 3600}h{value % 3600 // 60:02d}m"
+
+def describe(status):
+    """One line per engine, for people"""
+    where = f"{status['interface']}: " if status.get("interface") else ""
+    line = f"{where}{status['state']} on {status['ssid'] or 'no WiFi'} (target {status['target']})"
+    if status["session_age"] is not None:
+        line += f", online for {_seconds(status['session_age'])}"
+    if status["last_probe"] is not None:
+        line += f", last probe {status['last_probe']} {_seconds(status['last_probe_age'])} ago"
+    if status["last_login"] is not None:
+        line += f", last login {status['last_login']} {_seconds(status['last_login_age'])} ago"
+    if status["failures"]:
+        line += f", {status['failures']} failures"
+    line += ", cycle running" if status["next_cycle_in"] is None else f", next cycle in {_seconds(status['next_cycle_in'])}"
+    return line
+
+def _wait_for_cycles(port, path, before, timeout):
+    """Poll /status until every woken engine has finished a cycle"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        _, body = request("GET", path, port)
+        engines = body.get("engines", [])
+        if all(engine["cycles"] > before.get((engine["interface"], engine["target"]), -1) for engine in engines):
+            return engines
+    return None
+
+def main():
+    import argparse
+    import wifi_config
+    parser = argparse.ArgumentParser(description="Ask a running WiFi monitor for its state, or to probe or log in now")
+    parser.add_argument("command", nargs="?", default="status", choices=("status",) + COMMANDS)
+    parser.add_argument("--port", type=int, help="control port (default: [CONTROL] PORT in config.ini)")
+    parser.add_argument("--interface", help="only this adapter (wifi_daemon.py)")
+    parser.add_argument("--no-wait", action="store_true", help="don't wait for the probe or login to finish")
+    parser.add_argument("--json", action="store_true", help="print the raw JSON answer")
+    args = parser.parse_args()
+
+    port = args.port or wifi_config.get().control_port
+    if not port:
+        sys.exit("The control endpoint is off: set [CONTROL] PORT in config.ini and restart the monitor")
+    query = f"?interface={args.interface}" if args.interface else ""
+    try:
+        if args.command == "status":
+            code, body = request("GET", "/status" + query, port)
+        else:
+            code, body = request("POST", f"/{args.command}{query}", port)
+            if code == 202 and not args.no_wait:
+                # A cycle already running finishes first; the requested one comes after it
+                before = {(engine["interface"], engine["target"]):
+                          engine["cycles"] + (engine["next_cycle_in"] is None) for engine in body["engines"]}
+                print(f"⏳ {args.command.capitalize()} requested, waiting for the cycle to finish...")
+                engines = _wait_for_cycles(port, "/status" + query, before, WAIT_TIMEOUT)
+                if engines is None:
+                    print(f"⏰ Still running after {WAIT_TIMEOUT}s")
+                else:
+                    body = {"engines": engines}
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ No monitor answering on 127.0.0.1:{port} ({e})")
+    if code >= 400:
+        sys.exit(f"❌ {body.get('error', code)}")
+    if args.json:
+        print(json.dumps(body, indent=2))
+    else:
+        for engine in body.get("engines", []):
+            print(describe(engine))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import wifi_config
+import wifi_control
+import wifi_engine
+import wifi_events
+import wifi_fleet
+import wifi_iface
+import wifi_keepalive
+import wifi_log
+import wifi_metrics
+import wifi_portal
+import wifi_probe
+import wifi_trace
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ---- DAEMON ----
+MAX_WORKERS = 16      # Shared pool for the blocking steps of every engine (not one thread per interface)
+RESCAN_INTERVAL = 60  # Look for new or vanished interfaces this often, and on every link event
+PROFILE_PREFIX = "PROFILE:"
+# ----------------
+
+class Profile:
+    """One campus network: its SSID, portal and credentials"""
+    __slots__ = ("name", "ssid", "portal_url", "login_url", "username", "password", "keepalive_url",
+                 "alternative_urls", "hedge_delay")
+
+    def __init__(self, name, ssid, portal_url, login_url, username, password, keepalive_url=None,
+                 alternative_urls=(), hedge_delay=None):
+        self.name = name
+        self.ssid = ssid
+        self.portal_url = portal_url
+        self.login_url = login_url
+        self.username = username
+        self.password = password
+        self.keepalive_url = keepalive_url
+        self.alternative_urls = list(alternative_urls)
+        self.hedge_delay = hedge_delay
+
+    def update(self, other):
+        """Take over another profile's settings (a config reload), keeping this object"""
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+
+    @property
+    def keepalive_state_file(self):
+        if self.name == "default":
+            return wifi_keepalive.STATE_FILE
+        return os.path.join(SCRIPT_DIR, f".keepalive.{self.name}.json")
+
+    def __repr__(self):
+        return f"Profile({self.name!r}, ssid={self.ssid!r}, login_url={self.login_url!r}, username={self.username!r})"
+
+def load_profiles(cfg):
+    """One Profile per [PROFILE:<name>] section of a wifi_config.Config.
+
+    Keys a profile leaves out fall back to [WIFI_SETTINGS]/[CREDENTIALS];
+    without any profile sections those settings form the single "default"
+    profile, so existing config.ini files keep working.
+    """
+    defaults = {
+        "PORTAL_URL": cfg.portal_url,
+        "LOGIN_URL": cfg.login_url,
+        "USERNAME": cfg.username,
+        "PASSWORD": cfg.password,
+        "KEEPALIVE_URL": cfg.keepalive_url,
+        "ALTERNATIVE_URLS": ",".join(cfg.alternative_urls),
+    }
+    profiles = []
+    config = cfg.parser
+    for section in config.sections() if config is not None else ():
+        if not section.upper().startswith(PROFILE_PREFIX):
+            continue
+        name = section[len(PROFILE_PREFIX):].strip()
+        get = lambda key: config.get(section, key, fallback=None) or defaults[key]
+        alternates = [url.strip() for url in (get("ALTERNATIVE_URLS") or "").split(",") if url.strip()]
+        profiles.append(Profile(name, config.get(section, 'SSID', fallback=name), get("PORTAL_URL"),
+                                get("LOGIN_URL"), get("USERNAME"), get("PASSWORD"), get("KEEPALIVE_URL"),
+                                alternates, cfg.hedge_delay))
+    if not profiles:
+        profiles.append(Profile("default", cfg.college_wifi_name, cfg.portal_url, cfg.login_url,
+                                cfg.username, cfg.password, cfg.keepalive_url, cfg.alternative_urls,
+                                cfg.hedge_delay))
+    return profiles
+
+class InterfaceMonitor:
+    """Independent login state machines for one adapter, one engine per profile.
+
+    Every engine only acts while the adapter is on its profile's SSID; all
+    of them run as coroutines on the daemon's loop, and their HTTP traffic
+    is bound to the adapter (see wifi_http.get_session).
+    """
+
+    def __init__(self, interface, profiles, probe_urls, check_interval=30, keepalive=True,
+                 session_lifetime=600, fleet=None, timeout=10, before_cycle=None, trace=None, log=print):
+        self.interface = interface
+        self.fleet = fleet  # wifi_fleet.LoginThrottle settings, or None
+        self.probe_urls = probe_urls
+        self.check_interval = check_interval
+        self.keepalive = keepalive
+        self.session_lifetime = session_lifetime
+        self.timeout = timeout
+        self.before_cycle = before_cycle
+        self.trace = trace
+        self.log = log
+        self.engines = [self._build_engine(profile) for profile in profiles]
+
+    def get_ssid(self):
+        state = wifi_iface.get_interface_state(self.interface)
+        return state.ssid if state is not None and state.connected else None
+
+    def _build_engine(self, profile):
+        interface = self.interface
+        log = lambda message: self.log(f"[{interface}/{profile.name}] {message}")
+
+        # The portal check reads the connectivity check's answer instead of probing again
+        classifier = wifi_probe.Classifier(lambda: (self.probe_urls, profile.portal_url, 1), interface=interface)
+
+        def login():
+            return wifi_portal.login(profile.username, profile.password, profile.login_url,
+                                     referer=profile.portal_url, timeout=self.timeout, log=log,
+                                     interface=interface, alternative_urls=profile.alternative_urls,
+                                     hedge_delay=profile.hedge_delay)
+
+        keepalive = None
+        if self.keepalive:
+            keepalive = wifi_keepalive.KeepaliveScheduler(profile.username, profile.login_url,
+                                                          url=profile.keepalive_url,
+                                                          lifetime=self.session_lifetime,
+                                                          state_file=profile.keepalive_state_file,
+                                                          log=log, interface=interface)
+        throttle = None
+        if self.fleet is not None:
+            # Each adapter is its own portal client, so it gets its own slot
+            throttle = wifi_fleet.LoginThrottle(identity=f"{wifi_fleet.host_id()}/{interface}/{profile.name}",
+                                                **self.fleet)
+        return wifi_engine.MonitorEngine(
+            target_ssid=profile.ssid,
+            get_ssid=self.get_ssid,
+            check_online=classifier.check_online,
+            portal_reachable=classifier.portal_reachable,
+            login=login,
+            keepalive=keepalive,
+            throttle=throttle,
+            check_interval=self.check_interval,
+            stable_after=10,
+            verify_delay=5,
+            interface=interface,
+            before_cycle=self.before_cycle,
+            trace=self.trace,
+            confirm_login=wifi_portal.report_verification,
+            log=log
+        )
+
+class Daemon:
+    """Watches every wireless interface concurrently from one asyncio loop.
+
+    Interfaces are discovered through wifi_iface (and re-discovered on link
+    events and every RESCAN_INTERVAL); each gets an InterfaceMonitor. One
+    thread pumps link events to all engines and one bounded pool runs their
+    blocking steps, so the thread count does not grow with the interfaces.
+    """
+
+    def __init__(self, profiles, probe_urls, interfaces=None, events=None, check_interval=30,
+                 keepalive=True, session_lifetime=600, fleet=None, max_workers=MAX_WORKERS, timeout=10,
+                 before_cycle=None, trace=None, log=print):
+        self.profiles = profiles
+        self.probe_urls = probe_urls
+        self.interfaces = set(interfaces) if interfaces else None
+        self.events = events
+        self.check_interval = check_interval
+        self.keepalive = keepalive
+        self.session_lifetime = session_lifetime
+        self.fleet = fleet
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.before_cycle = before_cycle  # Passed to every engine (wifi_config.get for hot reload)
+        self.trace = trace  # One wifi_trace.TraceRecorder shared by every engine (lines carry the adapter)
+        self.log = log
+        self.monitors = {}  # interface name -> InterfaceMonitor
+        self._tasks = {}    # interface name -> engine tasks
+        self._loop = None
+        self._rescan = None
+        self._stopping = False
+
+    # ---- interfaces ----
+
+    def discover(self):
+        names = [state.name for state in wifi_iface.get_interface_states()]
+        if self.interfaces is not None:
+            names = [name for name in names if name in self.interfaces]
+        return names
+
+    def _sync(self):
+        names = set(self.discover())
+        for name in sorted(names - set(self.monitors)):
+            monitor = InterfaceMonitor(name, self.profiles, self.probe_urls, self.check_interval,
+                                       self.keepalive, self.session_lifetime, self.fleet, self.timeout,
+                                       self.before_cycle, self.trace, self.log)
+            self.monitors[name] = monitor
+            self._tasks[name] = [asyncio.ensure_future(engine.run()) for engine in monitor.engines]
+            self.log(f"📡 Watching {name} for {', '.join(p.ssid for p in self.profiles)}")
+        for name in sorted(set(self.monitors) - names):
+            self.log(f"🔌 {name} disappeared, stopping its monitors")
+            for engine in self.monitors.pop(name).engines:
+                engine.stop()
+            self._tasks.pop(name, None)
+
+    def reconfigure(self, profiles, probe_urls=None, check_interval=None, timeout=None):
+        """Apply reloaded settings from the loop thread.
+
+        Edited profiles are updated in place, so running engines pick them
+        up on their next cycle; adding, removing or renaming a profile
+        restarts every monitor with the new set.
+        """
+        if probe_urls is not None:
+            self.probe_urls = probe_urls
+        if timeout is not None:
+            self.timeout = timeout
+        if check_interval is not None:
+            self.check_interval = check_interval
+        if [p.name for p in profiles] != [p.name for p in self.profiles]:
+            self.profiles = profiles
+            self.log(f"🔄 Profiles now {', '.join(p.name for p in profiles)}, restarting monitors")
+            for name in sorted(self.monitors):
+                for engine in self.monitors.pop(name).engines:
+                    engine.stop()
+                self._tasks.pop(name, None)
+            if self._loop is not None and not self._stopping:
+                self._sync()
+            return
+        for current, new in zip(self.profiles, profiles):
+            current.update(new)
+        for monitor in self.monitors.values():
+            monitor.probe_urls, monitor.timeout = self.probe_urls, self.timeout
+            for engine, profile in zip(monitor.engines, self.profiles):
+                engine.configure(target_ssid=profile.ssid, check_interval=self.check_interval)
+                if engine.keepalive is not None:
+                    engine.keepalive.configure(profile.username, profile.login_url, profile.keepalive_url)
+
+    def _pump_link_events(self):
+        while not self._stopping:
+            event = self.events.wait(1.0)
+            if event is None or self._stopping:
+                continue
+            wifi_iface.invalidate()  # One re-query serves every engine's SSID check
+            for monitor in list(self.monitors.values()):
+                for engine in monitor.engines:
+                    engine.notify_link_event(event)
+            self._loop.call_soon_threadsafe(self._rescan.set)
+
+    # ---- main loop ----
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_workers,
+                                                           thread_name_prefix="daemon"))
+        self._rescan = asyncio.Event()
+        if self.events is not None:
+            threading.Thread(target=self._pump_link_events, name="daemon-link-events", daemon=True).start()
+        try:
+            while not self._stopping:
+                self._sync()
+                try:
+                    await asyncio.wait_for(self._rescan.wait(), timeout=RESCAN_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._rescan.clear()
+        finally:
+            self._stopping = True
+            for monitor in self.monitors.values():
+                for engine in monitor.engines:
+                    engine.stop()
+            tasks = [task for tasks in self._tasks.values() for task in tasks]
+            if tasks:
+                await asyncio.wait(tasks, timeout=5)
+
+    def stop(self):
+        """Thread-safe: stop every engine and leave run()"""
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._rescan.set)
+
+    def engines(self):
+        return [engine for monitor in list(self.monitors.values()) for engine in monitor.engines]
+
+    def status(self):
+        return {name: [engine.status() for engine in monitor.engines]
+                for name, monitor in self.monitors.items()}
+
+def log_message(message):
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_entry = f"[{timestamp}] {message}"
+    print(log_entry)
+    wifi_log.write(log_entry)
+
+def main():
+    wifi_config.log = log_message
+    cfg = wifi_config.get()
+    profiles = load_profiles(cfg)
+
+    log_message("🚀 Starting multi-interface WiFi daemon...")
+    for profile in profiles:
+        log_message(f"🎓 Profile {profile.name}: {profile.ssid} → {profile.login_url} as {profile.username}")
+    events = wifi_events.create_event_source(cfg.event_source, cfg.event_file).start()
+    log_message(f"👂 Link-change events: {events.name}")
+    metrics = wifi_metrics.Exporter(textfile=cfg.metrics_textfile, port=cfg.metrics_port).start()
+    trace = wifi_trace.open_recorder(cfg.trace_file)
+    if trace is not None:
+        log_message(f"🎞️ Recording a trace to {trace.path}")
+    fleet = None
+    if cfg.fleet_enabled:
+        fleet = {
+            "jitter_window": cfg.fleet_jitter_window,
+            "burst": cfg.fleet_login_burst,
+            "refill": cfg.fleet_login_refill,
+            "coordinator": cfg.fleet_coordinator,
+        }
+    daemon = Daemon(
+        profiles,
+        cfg.probe_urls,
+        interfaces=cfg.daemon_interfaces,
+        events=events,
+        check_interval=cfg.check_interval,
+        keepalive=cfg.keepalive_enabled,
+        session_lifetime=cfg.session_lifetime,
+        fleet=fleet,
+        max_workers=cfg.daemon_max_workers,
+        timeout=cfg.timeout,
+        before_cycle=wifi_config.get,
+        trace=trace,
+        log=log_message
+    )
+    control = wifi_control.ControlServer(daemon.engines, port=cfg.control_port, log=log_message).start()
+    if cfg.control_port:
+        log_message(f"🎛️ Control: http://127.0.0.1:{cfg.control_port}/status")
+    wifi_config.on_reload(lambda new, old: daemon.reconfigure(load_profiles(new), new.probe_urls,
+                                                              new.check_interval, new.timeout))
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        log_message("🛑 Daemon stopped by user")
+    finally:
+        events.stop()
+        metrics.stop()
+        control.stop()
+        if trace is not None:
+            trace.close()
+
+if __name__ == "__main__":
+    main()
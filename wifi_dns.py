@@ -0,0 +1,117 @@
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import wifi_util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_FILE = os.path.join(SCRIPT_DIR, ".dns_cache.json")
+
+# ---- PROBE HOST CACHE ----
+# Behind the portal, DNS is often slow or hijacked, so probe hosts are
+# resolved while online and probed by address afterwards.
+MAX_AGE = 7 * 24 * 3600    # Resolve afresh once an entry is this old
+REFRESH_AFTER = 24 * 3600  # Re-resolve (while online) once an entry is this old
+# --------------------------
+
+_entries = None  # host -> {"address", "learned_at"}; loaded on first use
+_lock = threading.Lock()
+
+def _after_fork():
+    global _lock
+    _lock = threading.Lock()
+
+wifi_util.reset_after_fork(_after_fork)
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE, "r", encoding="utf-8") as f:
+                _entries = {host: entry for host, entry in json.load(f).items()
+                            if isinstance(entry, dict) and entry.get("address")}
+        except (OSError, ValueError, AttributeError):
+            _entries = {}
+    return _entries
+
+def _save():
+    wifi_util.write_atomic(CACHE_FILE, json.dumps(_entries))
+
+def is_address(host):
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+def cached(host):
+    """The remembered address of `host`, or None if unknown or too old"""
+    with _lock:
+        entry = _load().get(host)
+    if entry is None or time.time() - entry.get("learned_at", 0) > MAX_AGE:
+        return None
+    return entry["address"]
+
+def stale(host):
+    """Whether a remembered address is due for a refresh"""
+    with _lock:
+        entry = _load().get(host)
+    return entry is not None and time.time() - entry.get("learned_at", 0) > REFRESH_AFTER
+
+def remember(host, address):
+    with _lock:
+        entries = _load()
+        entries[host] = {"address": address, "learned_at": time.time()}
+        _save()
+
+def forget(host=None):
+    """Drop one host, or every host"""
+    with _lock:
+        entries = _load()
+        if host is None:
+            entries.clear()
+        else:
+            entries.pop(host, None)
+        _save()
+
+def lookup(host, port=80):
+    """IPv4 address of `host` from the system resolver, or None"""
+    try:
+        return socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+    except (OSError, IndexError):
+        return None
+
+def is_hijacked(address, portal_host=None):
+    """Whether a public probe host resolved somewhere a portal would send it.
+
+    The portal's own address or a private, link-local or unspecified one
+    means the resolver is answering for the portal. Loopback is allowed so
+    local stand-ins work.
+    """
+    if portal_host and address == portal_host:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if ip.is_loopback:
+        return False
+    return ip.is_private or ip.is_link_local or ip.is_unspecified
+
+def refresh(host, port=80, portal_host=None):
+    """Re-resolve `host` (call only while online) and keep the answer if it is genuine"""
+    address = lookup(host, port)
+    if address is not None and not is_hijacked(address, portal_host):
+        remember(host, address)
+    return address
+
+def direct_url(url, address):
+    """`url` with its host swapped for `address`, plus the Host header to send"""
+    parts = urlsplit(url)
+    netloc = address if parts.port is None else f"{address}:{parts.port}"
+    host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+    return parts._replace(netloc=netloc).geturl(), {"Host": host_header}
@@ -0,0 +1,465 @@
+import asyncio
+import threading
+import time
+
+import wifi_events
+import wifi_http
+import wifi_iface
+import wifi_metrics
+import wifi_scheduler
+
+# ---- ENGINE STATES ----
+OFF_NETWORK = "off-network"  # Not on the college SSID
+ASSOCIATED = "associated"    # On the college SSID, connectivity not known yet
+CAPTIVE = "captive"          # On the college SSID, portal is holding us
+LOGGING_IN = "logging-in"    # Login request in flight
+ONLINE = "online"            # Internet works
+DEGRADED = "degraded"        # Login failed or portal unreachable; backing off
+# -----------------------
+
+class MonitorEngine:
+    """Single asyncio state machine behind every monitoring front-end.
+
+    Blocking work (SSID lookup, probes, login) runs in the default executor
+    as cancellable tasks. Timers wait on a wake event, so a link event (or
+    wake()) interrupts them immediately, and a link event that really
+    changed the SSID also abandons whatever step is still in flight.
+    request_login() does the same for a login the user asked for (see
+    wifi_control.py).
+
+    With `watch_connectivity=False` the engine only logs in once per join to
+    the target SSID and otherwise just watches the association.
+    """
+
+    def __init__(self, target_ssid, get_ssid, login, check_online=None, portal_reachable=None,
+                 events=None, check_interval=30, stable_after=5, verify_delay=5,
+                 poll_interval=None, watch_connectivity=True, keepalive=None, scheduler=None,
+                 interface=None, throttle=None, before_cycle=None, trace=None, confirm_login=None, log=print):
+        self.target_ssid = target_ssid
+        self.get_ssid = get_ssid
+        self.login = login
+        self.check_online = check_online
+        self.portal_reachable = portal_reachable
+        self.events = events
+        self.check_interval = check_interval
+        self.stable_after = stable_after
+        self.verify_delay = verify_delay
+        self.poll_interval = poll_interval or check_interval
+        self.watch_connectivity = watch_connectivity
+        self.keepalive = keepalive
+        self.interface = interface  # Adapter this engine watches (None: whichever is connected)
+        self.throttle = throttle    # wifi_fleet.LoginThrottle, spreads a fleet's re-logins
+        self.before_cycle = before_cycle  # Called first thing every cycle (e.g. wifi_config.get for hot reload)
+        self.trace = trace  # wifi_trace.TraceRecorder: what this engine saw, for replaying other policies
+        self.confirm_login = confirm_login  # (result, online) after the verify probe, e.g. wifi_portal.report_verification
+        self.scheduler = scheduler or wifi_scheduler.PollScheduler(base_interval=check_interval,
+                                                                   stable_after=stable_after)
+        self.log = log
+
+        self.state = OFF_NETWORK
+        self.ssid = None
+        self.failures = 0
+        self.stable_count = 0
+        self.joined_at = None
+        self.online_since = None   # Start of the current working session
+        self.last_probe = None     # (online, time) of the latest connectivity probe
+        self.last_login = None     # (outcome, time) of the latest login
+        self.next_cycle_at = None  # None while a cycle runs
+        self.cycles = 0
+        self.detection = wifi_events.DetectionStats()
+
+        self._loop = None
+        self._wake_event = None
+        self._wake_reason = None
+        self._link_event = None
+        self._cycle_task = None
+        self._login_pending = False
+        self._login_hold_until = 0  # No login before this time (after a definite rejection)
+        self._offline_since = None   # On the target SSID without internet since (for metrics)
+        self._recovering = False     # Joined but not online yet (time-to-internet pending)
+        self._after_drop = False     # Next login follows a session drop (fleet-wide after a portal restart)
+        self._force_login = False    # Log in next cycle without probing first (request_login)
+        self._stopping = False
+
+    # ---- state ----
+
+    def _account_offline(self, state):
+        now = time.time()
+        if self._offline_since is not None:
+            wifi_metrics.inc("wifi_offline_seconds_total", now - self._offline_since)
+        self._offline_since = now if state not in (ONLINE, OFF_NETWORK) else None
+        # One gauge per adapter and network when the daemon runs several engines
+        labels = {"interface": self.interface, "ssid": self.target_ssid} if self.interface else {}
+        wifi_metrics.REGISTRY.set("wifi_online", 1 if state == ONLINE else 0, **labels)
+        if state == ONLINE and self._recovering and self.joined_at is not None:
+            wifi_metrics.observe("wifi_time_to_internet_seconds", now - self.joined_at)
+            self._recovering = False
+
+    def _set_state(self, state):
+        self._account_offline(state)
+        if state != self.state:
+            if state == ONLINE and self.state == LOGGING_IN:
+                self.scheduler.on_login()
+            elif self.state == ONLINE and state == CAPTIVE:
+                self.scheduler.on_session_drop()
+                self._after_drop = True
+            if self.keepalive is not None:
+                if state == ONLINE and (self.state == LOGGING_IN or not self.keepalive.active):
+                    self.keepalive.on_login()
+                elif self.state == ONLINE and state == CAPTIVE:
+                    self.keepalive.on_drop()
+            if state == ONLINE:
+                self.online_since = time.time()
+            elif self.state == ONLINE:
+                self.online_since = None
+            self.state = state
+
+    def _record(self, kind, value):
+        if self.trace is not None:
+            self.trace.record(kind, value, self.interface)
+
+    def _probed(self, online):
+        self.last_probe = (online, time.time())
+        self._record("probe", "online" if online else "captive")
+
+    def _logged_in(self, result):
+        outcome = getattr(result, "outcome", "success" if result else "unknown")
+        self.last_login = (outcome, time.time())
+        self._record("login", outcome)
+
+    def next_delay(self):
+        """Seconds until the next cycle, as decided by the poll scheduler"""
+        if not self.watch_connectivity:
+            return self.poll_interval
+        return self.scheduler.next_delay(online=self.state == ONLINE, on_network=self.state != OFF_NETWORK)
+
+    def _fail(self):
+        self.failures += 1
+        self.scheduler.on_failure()
+
+    def configure(self, target_ssid=None, check_interval=None, poll_interval=None, verify_delay=None):
+        """Apply changed settings (a config reload); they take effect from the next cycle"""
+        if target_ssid is not None:
+            self.target_ssid = target_ssid
+        if check_interval is not None and check_interval != self.check_interval:
+            if self.poll_interval == self.check_interval:
+                self.poll_interval = check_interval
+            if self.scheduler.off_network_interval == self.check_interval * 2:
+                self.scheduler.off_network_interval = check_interval * 2
+            self.check_interval = check_interval
+            self.scheduler.base_interval = check_interval
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+        if verify_delay is not None:
+            self.verify_delay = verify_delay
+        self._login_hold_until = 0  # A held-back login may work with the new settings
+
+    def status(self):
+        """Thread-safe snapshot; ages and delays are in seconds, None when not applicable"""
+        now = time.time()
+
+        def age(since):
+            return round(now - since, 1) if since is not None else None
+
+        return {
+            "interface": self.interface,
+            "target": self.target_ssid,
+            "state": self.state,
+            "ssid": self.ssid,
+            "failures": self.failures,
+            "stable_count": self.stable_count,
+            "joined_at": self.joined_at,
+            "session_age": age(self.online_since),
+            "last_probe": self.last_probe and ("online" if self.last_probe[0] else "captive"),
+            "last_probe_age": self.last_probe and age(self.last_probe[1]),
+            "last_login": self.last_login and self.last_login[0],
+            "last_login_age": self.last_login and age(self.last_login[1]),
+            "next_cycle_in": self.next_cycle_at and round(max(0.0, self.next_cycle_at - now), 1),
+            "cycles": self.cycles,
+        }
+
+    # ---- waking ----
+
+    def wake(self, reason="wake"):
+        """Thread-safe: cut the current wait short and run a cycle now"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._on_wake, reason)
+
+    def request_login(self):
+        """Thread-safe: log in now, even if the last probe found us online"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._on_login_request)
+
+    def _on_login_request(self):
+        self._force_login = True
+        self._login_hold_until = 0  # Asked for explicitly: try despite an earlier rejection
+        self._on_wake("login")
+
+    def _on_wake(self, reason):
+        self._wake_reason = reason
+        if reason in ("link", "event"):
+            self.scheduler.on_risky_event(reason)
+        if reason == "link" and self._cycle_task is not None and not self._cycle_task.done():
+            self._cycle_task.cancel()  # Whatever it was doing is about the old network
+        self._wake_event.set()
+
+    def notify_link_event(self, event):
+        """Thread-safe: a link event arrived (the caller has invalidated wifi_iface)"""
+        # Address and carrier events often arrive without an SSID change;
+        # those only trigger an early cycle, they don't abort the current one.
+        try:
+            changed = self.get_ssid() != self.ssid
+        except Exception:
+            changed = True
+        if changed:
+            self._link_event = event
+        self._record("link", "roam" if changed else "event")
+        self.wake("link" if changed else "event")
+
+    def _pump_link_events(self):
+        while not self._stopping:
+            event = self.events.wait(1.0)
+            if event is None or self._stopping:
+                continue
+            wifi_iface.invalidate()
+            self.notify_link_event(event)
+
+    async def _sleep(self, delay):
+        started = time.time()
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        self._wake_event.clear()
+        overshoot = time.time() - started - delay
+        if overshoot > wifi_scheduler.RESUME_GAP:
+            # The wall clock jumped past our timer: the machine was asleep
+            self.log(f"💤 Resumed after ~{overshoot:.0f}s asleep, re-probing quickly")
+            self.scheduler.on_risky_event("resume")
+
+    # ---- one monitoring cycle ----
+
+    async def _call(self, phase, fn, *args):
+        started = time.perf_counter()
+        try:
+            return await self._loop.run_in_executor(None, fn, *args)
+        finally:
+            wifi_metrics.observe("wifi_phase_duration_seconds", time.perf_counter() - started, phase=phase)
+
+    def _on_ssid_change(self, ssid):
+        if self._link_event is not None:
+            latency = self.detection.record(self._link_event)
+            wifi_metrics.observe("wifi_phase_duration_seconds", latency, phase="detect")
+            self.log(f"⚡ Change detected {latency * 1000:.0f} ms after link event ({self.detection.summary()})")
+            self._link_event = None
+        self.log(f"📶 WiFi changed: '{self.ssid}' → '{ssid}'")
+        self._record("ssid", ssid)
+        self.ssid = ssid
+        self.failures = 0
+        self.stable_count = 0
+        self.scheduler.reset()
+        if ssid == self.target_ssid:
+            self.scheduler.on_risky_event("roam")
+        self.joined_at = time.time() if ssid == self.target_ssid else None
+        self._recovering = ssid == self.target_ssid
+        self._login_pending = ssid == self.target_ssid
+        self._login_hold_until = 0
+        wifi_http.note_ssid(ssid, self.interface)  # Drop pooled sockets from the old network
+        if self.keepalive is not None:
+            self.keepalive.reset()
+
+    async def _cycle(self):
+        self._wake_event.clear()
+        self._wake_reason = None
+        if self.before_cycle is not None:
+            self.before_cycle()
+
+        ssid = await self._call("ssid", self.get_ssid)
+        joined = ssid != self.ssid
+        if joined:
+            self._on_ssid_change(ssid)
+
+        if ssid != self.target_ssid:
+            self._force_login = False  # Nothing to log in to here
+            if joined:
+                self.log(f"📱 Connected to: {ssid} (not college WiFi)" if ssid else "📵 No WiFi connection detected")
+            self._set_state(OFF_NETWORK)
+            return
+
+        if joined:
+            self.log(f"🎓 Connected to college WiFi: {self.target_ssid}")
+            self._set_state(ASSOCIATED)
+
+        forced, self._force_login = self._force_login, False
+        if not self.watch_connectivity:
+            if self._login_pending or forced:
+                await self._login_once()
+            return
+
+        if forced:
+            self.log("🔁 Login requested, logging in without probing first")
+            self.stable_count = 0
+            await self._attempt_login()
+            return
+
+        online = await self._call("probe", self.check_online)
+        self._probed(online)
+        if online:
+            if self.state != ONLINE:
+                self.log("✅ Internet is working")
+                self.failures = 0
+            self._set_state(ONLINE)
+            self.stable_count += 1
+            self.scheduler.on_online()
+            if self.stable_count == self.stable_after:
+                self.log(f"😴 Internet stable for {self.stable_count} checks, reducing check frequency")
+            return
+
+        self.stable_count = 0
+        self._set_state(CAPTIVE)
+        if time.time() < self._login_hold_until:
+            self._set_state(DEGRADED)
+            return  # The portal already told us retrying is pointless for now
+
+        self.log("🔐 No internet access, attempting login...")
+        await self._attempt_login()
+
+    async def _attempt_login(self):
+        reachable = self.portal_reachable is None or await self._call("portal", self.portal_reachable)
+        if self.portal_reachable is not None:
+            self._record("portal", "up" if reachable else "down")
+        if not reachable:
+            self._fail()
+            self._set_state(DEGRADED)
+            self.log(f"❌ Portal not accessible ({self.failures} failures)")
+            return
+
+        await self._wait_for_login_slot()
+        self._set_state(LOGGING_IN)
+        result = await self._call("login", self.login)
+        self._logged_in(result)
+        if result:
+            self.log("🎉 Successfully logged in!")
+            await asyncio.sleep(self.verify_delay)  # Give the portal a moment to open up
+            verify_started = time.perf_counter()
+            online = await self._call("probe", self.check_online)
+            self._probed(online)
+            wifi_metrics.observe("wifi_phase_duration_seconds", time.perf_counter() - verify_started + self.verify_delay,
+                                 phase="verify")
+            if self.confirm_login is not None:
+                await self._loop.run_in_executor(None, self.confirm_login, result, online)
+            if online:
+                self.log("✅ Internet confirmed working!")
+                self.failures = 0
+                self._set_state(ONLINE)
+                return
+            self.log("⚠️ Login appeared successful but internet still not working")
+        else:
+            self.log(f"❌ Login failed ({getattr(result, 'outcome', 'unknown')})")
+            self._hold_login(result)
+        self._fail()
+        self._set_state(DEGRADED)
+
+    def _hold_login(self, result):
+        """Apply the retry policy of a typed login result (see wifi_portal.RETRY_AFTER)"""
+        retry_after = getattr(result, "retry_after", 0)
+        if retry_after is None:
+            self._login_hold_until = float("inf")
+            self.log(f"⛔ Portal rejected the credentials ({result.message}); "
+                     "not retrying until the WiFi or config changes")
+        elif retry_after:
+            self._login_hold_until = time.time() + retry_after
+            self.log(f"⏳ Portal refused the login ({result.message}); retrying in {retry_after}s")
+
+    async def _wait_for_login_slot(self):
+        if self.throttle is None:
+            return
+        delay = await self._call("throttle", self.throttle.delay, self._after_drop)
+        self._after_drop = False
+        if delay > 0:
+            self.log(f"🚦 Waiting {delay:.1f}s for a login slot")
+            await asyncio.sleep(delay)
+
+    async def _login_once(self):
+        await self._wait_for_login_slot()
+        self._set_state(LOGGING_IN)
+        self.log("🔄 Triggering auto-login process...")
+        result = await self._call("auto_login", self.login)
+        self._logged_in(result)
+        self._login_pending = False
+        if result:
+            self.log("✅ Auto-login process completed successfully!")
+            self._set_state(ONLINE)
+        else:
+            self.log("❌ Auto-login process failed!")
+            self._fail()
+            self._set_state(DEGRADED)
+
+    # ---- keepalive ----
+
+    async def _keepalive_loop(self):
+        while not self._stopping:
+            delay = self.keepalive.next_delay()
+            await asyncio.sleep(self.check_interval if delay is None else max(delay, 1))
+            if self.state != ONLINE or self.keepalive.next_delay() != 0:
+                continue
+            alive = await self._call("keepalive", self.keepalive.ping)
+            if alive is not None:
+                self._record("keepalive", "ack" if alive else "expired")
+            if alive is False:
+                if self.watch_connectivity:
+                    # A probe confirms the drop (and only then is it learned from) before logging in again
+                    self.log("🔐 Portal says the session expired, probing...")
+                else:
+                    # No probes here; the login worker checks connectivity before it logs in
+                    self.log("🔐 Portal says the session expired, logging in again...")
+                    self._login_pending = True
+                self.wake("keepalive")
+
+    # ---- main loop ----
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake_event = asyncio.Event()
+        pump = None
+        if self.events is not None:
+            pump = threading.Thread(target=self._pump_link_events, name="engine-link-events", daemon=True)
+            pump.start()
+        keepalive_task = None
+        if self.keepalive is not None:
+            keepalive_task = asyncio.ensure_future(self._keepalive_loop())
+        try:
+            while not self._stopping:
+                self.next_cycle_at = None
+                self._cycle_task = asyncio.ensure_future(self._cycle())
+                await asyncio.wait({self._cycle_task})
+                self.cycles += 1
+                if self._cycle_task.cancelled():
+                    self.log("📶 Link changed mid-cycle, starting over")
+                    continue
+                error = self._cycle_task.exception()
+                if error is not None:
+                    self.log(f"❌ Monitor error: {error}")
+                    self._fail()
+                    self.next_cycle_at = time.time() + self.check_interval
+                    await self._sleep(self.check_interval)
+                    continue
+                delay = self.next_delay()
+                self.next_cycle_at = time.time() + delay
+                await self._sleep(delay)
+        finally:
+            self._stopping = True
+            if self._cycle_task is not None:
+                self._cycle_task.cancel()
+            if keepalive_task is not None:
+                keepalive_task.cancel()
+                self.log(f"📊 {self.keepalive.summary()}")
+
+    def stop(self):
+        """Thread-safe: finish the current wait and leave run()"""
+        self._stopping = True
+        self.wake("stop")
+
+    def run_forever(self):
+        """Blocking entry point for the front-ends"""
+        asyncio.run(self.run())
@@ -0,0 +1,240 @@
+import os
+import queue
+import shutil
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# ---- LINK-CHANGE EVENTS ----
+# Event sources wake the monitors as soon as the WiFi association changes,
+# so polling is only needed as a slow safety net.
+SAFETY_POLL_INTERVAL = 60  # Seconds between polls when no event arrives
+SETTLE_TIME = 0.2          # Coalesce bursts of events arriving within this window
+# ----------------------------
+
+class LinkEvent:
+    """One link-change notification; `timestamp` is when the change was seen"""
+    __slots__ = ("source", "detail", "timestamp")
+
+    def __init__(self, source, detail, timestamp=None):
+        self.source = source
+        self.detail = detail
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def __repr__(self):
+        return f"LinkEvent({self.source!r}, {self.detail!r})"
+
+class LinkEventSource:
+    """Base class: backends push events, monitors block in wait()"""
+    name = "polling"
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"link-events-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        pass  # Plain polling: nothing to listen to, wait() just times out
+
+    def notify(self, detail, timestamp=None):
+        """Queue an event; also lets other threads wake a waiting monitor"""
+        self._queue.put(LinkEvent(self.name, detail, timestamp))
+
+    def wait(self, timeout):
+        """Sleep up to `timeout` seconds; return the first event or None.
+
+        Events arriving within SETTLE_TIME of the first one are folded into
+        it so a burst of kernel messages triggers a single check.
+        """
+        try:
+            event = self._queue.get(timeout=max(0, timeout))
+        except queue.Empty:
+            return None
+        deadline = time.time() + SETTLE_TIME
+        while True:
+            try:
+                self._queue.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                return event
+
+class NetlinkEventSource(LinkEventSource):
+    """Linux rtnetlink listener: link up/down and address changes on wireless interfaces"""
+    name = "netlink"
+
+    RTMGRP_LINK = 0x1
+    RTMGRP_IPV4_IFADDR = 0x10
+    RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR = 16, 17, 20, 21
+    IFF_RUNNING = 0x40
+
+    def __init__(self):
+        super().__init__()
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self._sock.bind((0, self.RTMGRP_LINK | self.RTMGRP_IPV4_IFADDR))
+        self._sock.settimeout(1.0)
+        self._running = {}
+
+    @staticmethod
+    def _is_wireless(ifname):
+        return os.path.isdir(f"/sys/class/net/{ifname}/wireless")
+
+    def _ifname(self, index):
+        try:
+            return socket.if_indextoname(index)
+        except OSError:
+            return f"if{index}"
+
+    def _handle(self, msg_type, payload):
+        now = time.time()
+        if msg_type in (self.RTM_NEWLINK, self.RTM_DELLINK) and len(payload) >= 16:
+            _, _, _, index, flags, _ = struct.unpack("=BBHiII", payload[:16])
+            ifname = self._ifname(index)
+            if not self._is_wireless(ifname):
+                return
+            running = msg_type == self.RTM_NEWLINK and bool(flags & self.IFF_RUNNING)
+            # Wireless drivers resend NEWLINK for scans and signal changes; only
+            # a change in the running flag is an association change.
+            if self._running.get(index) != running:
+                self._running[index] = running
+                self.notify(f"{ifname} link {'up' if running else 'down'}", now)
+        elif msg_type in (self.RTM_NEWADDR, self.RTM_DELADDR) and len(payload) >= 8:
+            _, _, _, _, index = struct.unpack("=BBBBI", payload[:8])
+            ifname = self._ifname(index)
+            if self._is_wireless(ifname):
+                action = "address added" if msg_type == self.RTM_NEWADDR else "address removed"
+                self.notify(f"{ifname} {action}", now)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            offset = 0
+            while offset + 16 <= len(data):
+                length, msg_type, _, _, _ = struct.unpack("=IHHII", data[offset:offset + 16])
+                if length < 16:
+                    break
+                self._handle(msg_type, data[offset + 16:offset + length])
+                offset += (length + 3) & ~3
+        self._sock.close()
+
+class NmcliEventSource(LinkEventSource):
+    """Reads `nmcli monitor` output from one long-lived child process"""
+    name = "nmcli"
+
+    KEYWORDS = ("connected", "disconnected", "using connection", "Connectivity")
+
+    def __init__(self):
+        super().__init__()
+        self._process = None
+
+    def _run(self):
+        self._process = subprocess.Popen(["nmcli", "monitor"], stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL, text=True)
+        for line in self._process.stdout:
+            if self._stopped.is_set():
+                break
+            line = line.strip()
+            if any(keyword in line for keyword in self.KEYWORDS):
+                self.notify(line)
+
+    def stop(self):
+        super().stop()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+class FileEventSource(LinkEventSource):
+    """Stand-in backend: one event per line written to a file or named pipe.
+
+    A line may start with a Unix timestamp (e.g. `1718000000.25 joined`) so
+    the writer can measure end-to-end detection latency.
+    """
+    name = "file"
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def _emit(self, line):
+        line = line.strip()
+        if not line:
+            return
+        first, _, rest = line.partition(" ")
+        try:
+            self.notify(rest or first, float(first))
+        except ValueError:
+            self.notify(line)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                is_fifo = stat.S_ISFIFO(os.stat(self.path).st_mode)
+                with open(self.path, "r", encoding="utf-8") as f:
+                    if not is_fifo:
+                        f.seek(0, os.SEEK_END)  # Tail: only lines written from now on
+                    while not self._stopped.is_set():
+                        line = f.readline()
+                        if line:
+                            self._emit(line)
+                        elif is_fifo:
+                            break  # Writer closed the pipe; reopen and wait for the next one
+                        else:
+                            time.sleep(0.05)
+            except OSError:
+                time.sleep(1)
+
+class DetectionStats:
+    """Running link-change detection latency figures"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def record(self, event, observed_at=None):
+        observed_at = time.time() if observed_at is None else observed_at
+        latency = max(0.0, observed_at - event.timestamp)
+        self.count += 1
+        self.total += latency
+        self.worst = max(self.worst, latency)
+        return latency
+
+    def summary(self):
+        if not self.count:
+            return "no link-change events yet"
+        return (f"{self.count} link changes, mean detection {self.total / self.count * 1000:.0f} ms, "
+                f"worst {self.worst * 1000:.0f} ms")
+
+def create_event_source(kind="auto", path=None):
+    """Build a link-change event source.
+
+    `kind` is one of auto, netlink, nmcli, file or polling. Auto picks
+    netlink on Linux, then nmcli, and falls back to plain polling, as does
+    "file" without a `path` (wifi_config reports that setting).
+    """
+    if kind == "file":
+        return FileEventSource(path) if path else LinkEventSource()
+    if kind in ("auto", "netlink") and sys.platform.startswith("linux") and hasattr(socket, "AF_NETLINK"):
+        try:
+            return NetlinkEventSource()
+        except OSError:
+            if kind == "netlink":
+                raise
+    if kind in ("auto", "nmcli") and shutil.which("nmcli"):
+        return NmcliEventSource()
+    return LinkEventSource()
@@ -0,0 +1,168 @@
+import hashlib
+import socket
+import sys
+import threading
+import time
+
+# ---- FLEET THROTTLING ----
+JITTER_WINDOW = 60        # Re-logins after a session drop are spread over this many seconds
+LOGIN_BURST = 3           # Logins a host may send back to back...
+LOGIN_REFILL = 20         # ...then one more every this many seconds
+COORDINATOR_PORT = 8391   # UDP port of the optional fleet coordinator
+COORDINATOR_TIMEOUT = 0.5 # Give up on the coordinator and use local jitter after this long
+FLEET_RATE = 5            # Logins per second the coordinator lets through fleet-wide
+MAX_GRANT = 300           # Never ask a host to wait longer than this
+# --------------------------
+
+def host_id():
+    """Stable identity of this machine: hostname plus MAC address"""
+    import uuid
+
+    return f"{socket.gethostname()}-{uuid.getnode():012x}"
+
+def host_fraction(identity):
+    """Deterministic position of a host in [0, 1), uniform across a fleet"""
+    digest = hashlib.sha256(identity.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+class TokenBucket:
+    """Login budget: `burst` tokens, one more every `refill` seconds"""
+
+    def __init__(self, burst=LOGIN_BURST, refill=LOGIN_REFILL, clock=time.monotonic):
+        self.burst = burst
+        self.refill = refill
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token; return how many seconds to wait until it is really ours"""
+        with self._lock:
+            now = self.clock()
+            if self.refill > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.refill)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0 or self.refill <= 0:
+                return 0.0
+            return -self.tokens * self.refill
+
+class LoginThrottle:
+    """Decides how long a host waits before its next login attempt.
+
+    Every attempt spends a token from the local bucket. The first attempt
+    after a session drop (a portal restart drops the whole fleet at once)
+    additionally waits for this host's fixed slot in the jitter window, or
+    for the slot the coordinator grants if one is configured and answers.
+    """
+
+    def __init__(self, jitter_window=JITTER_WINDOW, burst=LOGIN_BURST, refill=LOGIN_REFILL,
+                 coordinator=None, identity=None, clock=time.monotonic):
+        self.jitter_window = jitter_window
+        self.identity = identity or host_id()
+        self.offset = jitter_window * host_fraction(self.identity)
+        self.bucket = TokenBucket(burst, refill, clock)
+        self.coordinator = parse_coordinator(coordinator) if isinstance(coordinator, str) else coordinator
+
+    def delay(self, after_drop=False):
+        wait = self.bucket.reserve()
+        if after_drop:
+            granted = self.ask_coordinator() if self.coordinator else None
+            wait = max(wait, self.offset if granted is None else granted)
+        return wait
+
+    def ask_coordinator(self):
+        """Seconds the coordinator wants us to wait, or None if it did not answer"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.settimeout(COORDINATOR_TIMEOUT)
+            sock.sendto(f"LOGIN {self.identity}".encode("utf-8"), self.coordinator)
+            reply, _ = sock.recvfrom(256)
+            kind, _, value = reply.decode("utf-8", "replace").partition(" ")
+            return min(float(value), MAX_GRANT) if kind == "WAIT" else None
+        except (OSError, ValueError):
+            return None
+        finally:
+            sock.close()
+
+def parse_coordinator(address):
+    host, _, port = address.strip().rpartition(":")
+    if not host:
+        host, port = port, COORDINATOR_PORT
+    return host, int(port)
+
+class Coordinator:
+    """UDP slot server: hands out login slots FLEET_RATE per second.
+
+    A host sends "LOGIN <id>" and gets "WAIT <seconds>" back. Asking again
+    before the slot has passed returns the same slot, so retries and lost
+    replies do not push the queue further out.
+    """
+
+    def __init__(self, host="0.0.0.0", port=COORDINATOR_PORT, rate=FLEET_RATE, clock=time.monotonic):
+        self.rate = rate
+        self.clock = clock
+        self.next_slot = 0.0
+        self.slots = {}  # host id -> granted slot
+        self.granted = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, port))
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._sock.getsockname()
+
+    def grant(self, identity):
+        now = self.clock()
+        slot = self.slots.get(identity)
+        if slot is None or slot < now:
+            slot = self.next_slot = max(now, self.next_slot) + 1.0 / self.rate
+            self.slots[identity] = slot
+            self.granted += 1
+            if len(self.slots) > 10000:
+                self.slots = {k: v for k, v in self.slots.items() if v >= now}
+        return slot - now
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fleet-coordinator", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._sock.settimeout(1.0)
+        while not self._stopping:
+            try:
+                data, peer = self._sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            kind, _, identity = data.decode("utf-8", "replace").partition(" ")
+            if kind == "LOGIN" and identity:
+                self._sock.sendto(f"WAIT {self.grant(identity):.3f}".encode("utf-8"), peer)
+
+    def stop(self):
+        self._stopping = True
+        self._sock.close()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Fleet login coordinator (staggers re-logins after a portal restart)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=COORDINATOR_PORT)
+    parser.add_argument("--rate", type=float, default=FLEET_RATE, help="logins per second across the fleet")
+    args = parser.parse_args()
+    coordinator = Coordinator(args.host, args.port, args.rate)
+    print(f"🚦 Fleet coordinator on {args.host}:{args.port}, {args.rate:g} logins/s")
+    try:
+        coordinator.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 Coordinator stopped after {coordinator.granted} grants")
+        coordinator.stop()
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
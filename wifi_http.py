@@ -0,0 +1,200 @@
+import threading
+import zlib
+from urllib.parse import urlencode, urljoin, urlsplit
+
+import wifi_iface
+import wifi_util
+
+# ---- CONNECTION POOL ----
+# One long-lived keep-alive session shared by every portal and probe request
+# (one per adapter when the multi-interface daemon binds to interfaces).
+POOL_CONNECTIONS = 4  # Number of distinct hosts kept pooled (portal + probe hosts)
+POOL_MAXSIZE = 4      # Keep-alive sockets kept per host
+MAX_REDIRECTS = 5     # Fast path only; requests has its own limit
+# -------------------------
+
+_adapter_class = None
+
+def _source_adapter_class():
+    """HTTPAdapter whose sockets are bound to one local address (one WLAN adapter).
+
+    Built on first use so `import requests` is only paid by processes that
+    actually open a pooled session.
+    """
+    global _adapter_class
+    if _adapter_class is None:
+        from requests.adapters import HTTPAdapter
+
+        class _SourceAdapter(HTTPAdapter):
+            def __init__(self, source_address=None, **kwargs):
+                self.source_address = source_address
+                super().__init__(**kwargs)
+
+            def init_poolmanager(self, *args, **kwargs):
+                if self.source_address:
+                    kwargs["source_address"] = (self.source_address, 0)
+                super().init_poolmanager(*args, **kwargs)
+
+        _adapter_class = _SourceAdapter
+    return _adapter_class
+
+_sessions = {}      # interface name (None = default route) -> (session, bound address)
+_session_ssid = {}  # interface name -> last SSID seen on it
+_lock = threading.Lock()
+_fast_path = False
+
+def _build_session(source_address=None):
+    if _fast_path:
+        return LiteSession(source_address)
+    import requests
+
+    session = requests.Session()
+    adapter = _source_adapter_class()(source_address,
+                                      pool_connections=POOL_CONNECTIONS,
+                                      pool_maxsize=POOL_MAXSIZE,
+                                      max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def use_fast_path(enabled=True):
+    """Serve get_session() from the stdlib LiteSession instead of requests.
+
+    Meant for the one-shot login: a process that sends a handful of
+    requests and exits gains nothing from pooling but pays ~100 ms to
+    import requests. Only plain http:// URLs are supported.
+    """
+    global _fast_path
+    _fast_path = enabled
+    with _lock:
+        stale = [entry[0] for entry in _sessions.values()]
+        _sessions.clear()
+    for session in stale:
+        session.close()
+
+def get_session(interface=None):
+    """Return the shared keep-alive session, creating it on first use.
+
+    With `interface`, sockets are bound to that adapter's IPv4 address so
+    the traffic leaves through it; the session is rebuilt if the address
+    changes. Without a known address the default route is used.
+    """
+    address = wifi_iface.ipv4_address(interface) if interface else None
+    stale = None
+    with _lock:
+        entry = _sessions.get(interface)
+        if entry is not None and entry[1] != address:
+            stale, entry = entry[0], None
+        if entry is None:
+            entry = _sessions[interface] = (_build_session(address), address)
+    if stale is not None:
+        stale.close()
+    return entry[0]
+
+def reset_session(interface=None):
+    """Close every pooled socket; the next request opens a fresh pool"""
+    with _lock:
+        entry = _sessions.pop(interface, None)
+    if entry is not None:
+        try:
+            entry[0].close()
+        except Exception:
+            pass
+
+def note_ssid(ssid, interface=None):
+    """Reset the pool when the connected SSID changes so no stale sockets are reused"""
+    with _lock:
+        changed = ssid != _session_ssid.get(interface)
+        _session_ssid[interface] = ssid
+    if changed:
+        reset_session(interface)
+    return changed
+
+def _after_fork():
+    # A forked child (the login worker) must not share the parent's pooled sockets
+    global _sessions, _lock
+    _sessions = {}
+    _lock = threading.Lock()
+
+wifi_util.reset_after_fork(_after_fork)
+
+# ---- Fast path (stdlib http.client) ----
+
+class LiteResponse:
+    """The slice of requests.Response that wifi_probe/wifi_portal/wifi_keepalive read"""
+
+    def __init__(self, url, status_code, headers, body):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers  # http.client.HTTPMessage: case-insensitive get()
+        self.content = body
+        content_type = headers.get("Content-Type", "")
+        self.encoding = content_type.split("charset=", 1)[1].split(";")[0].strip() if "charset=" in content_type else None
+        self.raw = self
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def read(self, amount=None, decode_content=True):
+        return self.content if amount is None else self.content[:amount]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class LiteSession:
+    """Minimal requests.Session stand-in on http.client: one connection per request, http:// only"""
+
+    def __init__(self, source_address=None):
+        self.source_address = source_address
+
+    def get(self, url, params=None, headers=None, timeout=10, allow_redirects=True, stream=False):
+        if params:
+            url += ("&" if urlsplit(url).query else "?") + urlencode(params)
+        return self._request("GET", url, None, headers, timeout, allow_redirects)
+
+    def post(self, url, data=None, headers=None, timeout=10, allow_redirects=True):
+        body = urlencode(data).encode("utf-8") if isinstance(data, dict) else data
+        headers = dict(headers or {})
+        headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+        return self._request("POST", url, body, headers, timeout, allow_redirects)
+
+    def _request(self, method, url, body, headers, timeout, allow_redirects):
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, body, headers, timeout)
+            location = response.headers.get("Location")
+            if not allow_redirects or response.status_code not in (301, 302, 303, 307, 308) or not location:
+                return response
+            url = urljoin(url, location)
+            if response.status_code in (301, 302, 303):
+                method, body = "GET", None
+        return response
+
+    def _send(self, method, url, body, headers, timeout):
+        import http.client
+
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise ValueError(f"fast path only speaks http://, not {url}")
+        source = (self.source_address, 0) if self.source_address else None
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout, source_address=source)
+        try:
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+            encoding = response.headers.get("Content-Encoding", "")
+            if encoding in ("gzip", "deflate"):
+                data = zlib.decompress(data, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+            return LiteResponse(url, response.status, response.headers, data)
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
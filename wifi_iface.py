@@ -0,0 +1,200 @@
+import array
+import glob
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ---- INTERFACE STATE ----
+CACHE_TTL = 2.0  # Seconds a query result is reused, so one cycle costs one query
+# -------------------------
+
+class InterfaceState:
+    """Snapshot of one wireless interface; `signal` is a 0-100 percentage"""
+    __slots__ = ("name", "ssid", "bssid", "signal", "state")
+
+    def __init__(self, name, ssid=None, bssid=None, signal=None, state="disconnected"):
+        self.name = name
+        self.ssid = ssid
+        self.bssid = bssid
+        self.signal = signal
+        self.state = state
+
+    @property
+    def connected(self):
+        return self.state == "connected" and bool(self.ssid)
+
+    def __repr__(self):
+        return (f"InterfaceState({self.name!r}, ssid={self.ssid!r}, bssid={self.bssid!r}, "
+                f"signal={self.signal!r}, state={self.state!r})")
+
+# ---- netsh backend (Windows) ----
+
+def parse_netsh(output):
+    """Parse `netsh wlan show interfaces` output into InterfaceState records"""
+    states = []
+    current = None
+    for line in output.splitlines():
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        # Split on the first colon only: SSIDs and BSSIDs may contain colons
+        key, value = key.strip(), value.strip()
+        if key == "Name":
+            current = InterfaceState(value)
+            states.append(current)
+        elif current is None:
+            continue
+        elif key == "State":
+            current.state = value.lower()
+        elif key == "SSID":
+            current.ssid = value or None
+        elif key in ("BSSID", "AP BSSID"):
+            current.bssid = value.lower() or None
+        elif key == "Signal":
+            try:
+                current.signal = int(value.rstrip("%"))
+            except ValueError:
+                pass
+    return states
+
+def query_netsh():
+    output = subprocess.run(["netsh", "wlan", "show", "interfaces"], capture_output=True,
+                            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)).stdout
+    return parse_netsh(output.decode(errors="replace"))
+
+# ---- sysfs/ioctl backend (Linux, no fork) ----
+
+SIOCGIFADDR = 0x8915
+SIOCGIWAP = 0x8B15
+SIOCGIWESSID = 0x8B1B
+IW_ESSID_MAX_SIZE = 32
+IWREQ_SIZE = 32  # sizeof(struct iwreq) on 64-bit kernels
+
+def _read_text(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _read_signal_levels():
+    """Link quality per interface from /proc/net/wireless, scaled to 0-100"""
+    levels = {}
+    text = _read_text("/proc/net/wireless") or ""
+    for line in text.splitlines()[2:]:
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if len(fields) >= 2:
+            try:
+                levels[name.strip()] = min(100, int(float(fields[1]) * 100 / 70))
+            except ValueError:
+                pass
+    return levels
+
+def _ioctl_essid(sock, ifname):
+    buf = array.array("B", bytes(IW_ESSID_MAX_SIZE + 1))
+    address, _ = buf.buffer_info()
+    request = struct.pack("16sPHH", ifname.encode()[:15], address, len(buf), 0).ljust(IWREQ_SIZE, b"\0")
+    result = fcntl.ioctl(sock.fileno(), SIOCGIWESSID, request)
+    offset = 16 + struct.calcsize("P")  # iw_point.length follows the pointer
+    length = struct.unpack("H", result[offset:offset + 2])[0]
+    return buf.tobytes()[:length].decode("utf-8", errors="replace") or None
+
+def _ioctl_bssid(sock, ifname):
+    request = struct.pack("16s", ifname.encode()[:15]).ljust(IWREQ_SIZE, b"\0")
+    result = fcntl.ioctl(sock.fileno(), SIOCGIWAP, request)
+    mac = result[18:24]  # sockaddr.sa_data after the 2-byte family
+    if mac == b"\0" * 6:
+        return None
+    return ":".join(f"{b:02x}" for b in mac)
+
+def query_sysfs():
+    states = []
+    levels = _read_signal_levels()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for path in sorted(glob.glob("/sys/class/net/*/wireless")):
+            name = os.path.basename(os.path.dirname(path))
+            state = InterfaceState(name, signal=levels.get(name))
+            operstate = _read_text(f"/sys/class/net/{name}/operstate")
+            try:
+                if fcntl is None:
+                    raise OSError("ioctl not available")
+                state.ssid = _ioctl_essid(sock, name)
+                state.bssid = _ioctl_bssid(sock, name)
+            except OSError:
+                pass
+            state.state = "connected" if operstate == "up" and state.ssid else "disconnected"
+            states.append(state)
+    finally:
+        sock.close()
+    return states
+
+# ---- Provider with TTL cache ----
+
+BACKENDS = {"netsh": query_netsh, "sysfs": query_sysfs}
+
+def default_backend():
+    return "netsh" if sys.platform == "win32" else "sysfs"
+
+_cache = {"at": 0.0, "states": [], "backend": None}
+_cache_lock = threading.Lock()
+
+def get_interface_states(max_age=CACHE_TTL, backend=None):
+    """All wireless interfaces, served from cache if younger than `max_age`"""
+    backend = backend or default_backend()
+    with _cache_lock:
+        now = time.monotonic()
+        if _cache["backend"] == backend and now - _cache["at"] < max_age:
+            return _cache["states"]
+        try:
+            states = BACKENDS[backend]()
+        except (OSError, subprocess.SubprocessError):
+            states = []
+        _cache.update(at=now, states=states, backend=backend)
+        return states
+
+def get_wifi_state(max_age=CACHE_TTL):
+    """First connected wireless interface, or None"""
+    for state in get_interface_states(max_age):
+        if state.connected:
+            return state
+    return None
+
+def get_interface_state(name, max_age=CACHE_TTL):
+    """The named wireless interface, or None if it is gone"""
+    for state in get_interface_states(max_age):
+        if state.name == name:
+            return state
+    return None
+
+def ipv4_address(name):
+    """IPv4 address of an interface (Linux ioctl), or None if unknown/unassigned"""
+    if fcntl is None:
+        return None
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        result = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack("256s", name.encode()[:15]))
+        return socket.inet_ntoa(result[20:24])
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+def get_connected_ssid(max_age=CACHE_TTL):
+    state = get_wifi_state(max_age)
+    return state.ssid if state else None
+
+def invalidate():
+    """Force the next caller to query again (e.g. right after a link event)"""
+    with _cache_lock:
+        _cache["at"] = 0.0
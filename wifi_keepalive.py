@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, urlunparse
+
+import wifi_http
+import wifi_util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(SCRIPT_DIR, ".keepalive.json")
+
+# ---- KEEPALIVE ----
+DEFAULT_LIFETIME = 600  # Assumed portal session lifetime (seconds) until a drop teaches us better
+SAFETY_FACTOR = 0.5     # Refresh after this fraction of the learned lifetime
+MIN_INTERVAL = 15       # Never ping more often than this
+MAX_SAMPLES = 10        # Observed session lifetimes kept for learning
+# -------------------
+
+def default_keepalive_url(login_url):
+    """The portal's live endpoint on the same host as LOGIN_URL"""
+    parts = urlparse(login_url)
+    return urlunparse((parts.scheme, parts.netloc, "/live", "", "", ""))
+
+class KeepaliveScheduler:
+    """Refreshes the portal session before it expires and learns how long sessions last.
+
+    Call on_login() after every successful login and on_drop() whenever a
+    probe finds the connection captive again; ping() sends the live request
+    and next_delay() says when the next one is due.
+    """
+
+    def __init__(self, username, login_url, url=None, lifetime=DEFAULT_LIFETIME,
+                 state_file=STATE_FILE, log=None, interface=None):
+        self.username = username
+        self.interface = interface  # Adapter the session lives on (multi-interface daemon)
+        self.url = url or default_keepalive_url(login_url)
+        self.state_file = state_file
+        self.log = log or (lambda message: None)
+        self.samples = []
+        self.default_lifetime = lifetime
+        self.prevented = 0
+        self.pings = 0
+        self.session_started = None  # Time of the last login
+        self.last_refresh = None     # Time of the last login or successful ping
+        self.retry_at = None         # No ping before this time after an unconfirmed one
+        self._problem = None         # Last unrecognised answer, logged once until it changes
+        self._credited = 0           # Prevented outages already counted this session
+        self._lock = threading.Lock()
+        self._load()
+
+    def configure(self, username, login_url, url=None):
+        """Follow changed credentials or portal URLs without losing what was learned"""
+        self.username = username
+        self.url = url or default_keepalive_url(login_url)
+
+    # ---- persistence ----
+
+    def _load(self):
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.samples = [float(s) for s in state.get("samples", [])][-MAX_SAMPLES:]
+            self.prevented = int(state.get("prevented", 0))
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def _save(self):
+        if not self.state_file:
+            return
+        wifi_util.write_atomic(self.state_file, json.dumps({"samples": self.samples, "prevented": self.prevented}))
+
+    # ---- learning ----
+
+    @property
+    def lifetime(self):
+        """Shortest recently observed session lifetime, or the default guess"""
+        return min(self.samples) if self.samples else self.default_lifetime
+
+    @property
+    def interval(self):
+        return max(MIN_INTERVAL, self.lifetime * SAFETY_FACTOR)
+
+    def on_login(self):
+        with self._lock:
+            now = time.time()
+            self.session_started = now
+            self.last_refresh = now
+            self.retry_at = None
+            self._credited = 0
+
+    def reset(self):
+        """Forget the current session without learning from it (e.g. after leaving the SSID)"""
+        with self._lock:
+            self.session_started = None
+            self.last_refresh = None
+            self.retry_at = None
+
+    def on_drop(self):
+        """The portal dropped us: the time since the last refresh is one lifetime sample"""
+        with self._lock:
+            if self.last_refresh is None:
+                return
+            sample = time.time() - self.last_refresh
+            self.samples = (self.samples + [sample])[-MAX_SAMPLES:]
+            self.session_started = None
+            self.last_refresh = None
+            self.retry_at = None
+            self._save()
+        self.log(f"📉 Portal session dropped after {sample:.0f}s; keepalive every {self.interval:.0f}s now")
+
+    # ---- scheduling ----
+
+    @property
+    def active(self):
+        return self.last_refresh is not None
+
+    def next_delay(self):
+        """Seconds until the next ping is due (None when no session is active)"""
+        if not self.active:
+            return None
+        due = self.last_refresh + self.interval
+        if self.retry_at is not None:
+            due = max(due, self.retry_at)
+        return max(0.0, due - time.time())
+
+    def _unconfirmed(self, problem):
+        # Not a verdict on the session: wait a full interval instead of pinging again at once
+        with self._lock:
+            self.retry_at = time.time() + self.interval
+        if problem is not None and problem != self._problem:
+            self.log(f"⚠️ Keepalive: {problem}")
+        self._problem = problem
+
+    def ping(self, timeout=5):
+        """Send the live request.
+
+        Returns True if the portal confirmed the session, False if it said
+        the session is gone (login_again), and None for anything else: the
+        portal unreachable, an error status (e.g. a portal without /live
+        answering 404) or a body it doesn't recognise. Only a probe can tell
+        whether we were really dropped.
+        """
+        params = {"mode": "192", "username": self.username, "a": int(time.time() * 1000), "producttype": "0"}
+        try:
+            with wifi_http.get_session(self.interface).get(self.url, params=params, timeout=timeout) as response:
+                text, status = response.text.lower(), response.status_code
+        except Exception as e:
+            self._unconfirmed(f"failed: {e}")
+            return None
+        self.pings += 1
+        # Cyberoam answers <ack>ack</ack> while the session lives and login_again once it is gone
+        if status == 200 and "login_again" in text:
+            self._unconfirmed(None)
+            return False
+        if status != 200 or ("ack" not in text and "live" not in text):
+            self._unconfirmed(f"unexpected answer from {self.url} (HTTP {status})")
+            return None
+        self._problem = None
+        with self._lock:
+            now = time.time()
+            self.last_refresh = now
+            self.retry_at = None
+            # Each time the session outlives another observed lifetime, the
+            # keepalive has saved us one logout.
+            if self.session_started is not None and self.samples:
+                earned = int((now - self.session_started) // self.lifetime)
+                if earned > self._credited:
+                    self.prevented += earned - self._credited
+                    self._credited = earned
+                    self._save()
+        return True
+
+    def summary(self):
+        return (f"keepalive: {self.pings} pings, {self.prevented} outages prevented, "
+                f"session lifetime ~{self.lifetime:.0f}s")
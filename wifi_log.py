@@ -0,0 +1,237 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+import wifi_util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_FILE = os.path.join(SCRIPT_DIR, "wifi_monitor.log")
+
+# ---- LOG WRITER ----
+MAX_BYTES = 5 * 1024 * 1024  # Rotate once the log would grow past this
+BACKUP_COUNT = 3             # Rotated generations kept (wifi_monitor.log.1 ... .3)
+FLUSH_INTERVAL = 0.5         # Seconds a line may wait to be batched with others
+MAX_BATCH = 256              # Flush immediately once this many lines are queued
+# --------------------
+
+class _FileLock:
+    """Cross-process lock on a side file (the log itself gets renamed away)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        except OSError:
+            pass  # Unlocked O_APPEND writes are still whole; only rotation may race
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        except (OSError, TypeError):
+            pass
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+class LogWriter:
+    """Batched, rotation-aware appender shared by every entry point.
+
+    Lines are queued and written by a background thread in one O_APPEND
+    write per batch, under a lock file, so several processes can share the
+    log. The log rolls over to numbered generations when the day changes or
+    it would exceed `max_bytes`; a rotation done by another process is
+    noticed from the inode and simply reopened.
+    """
+
+    def __init__(self, path=LOG_FILE, max_bytes=MAX_BYTES, backups=BACKUP_COUNT,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._lock = _FileLock(path + ".lock")
+        self._thread = None
+        self._closed = False
+        self._fd = None
+        self._ino = None
+        self._day = None  # Day the open file belongs to, tracked in memory
+
+    # ---- queueing ----
+
+    def write(self, line):
+        """Queue one line (without the trailing newline)"""
+        with self._cond:
+            if self._closed:
+                self._write_batch([line])
+                return
+            self._pending.append(line)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="wifi-log-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) == 1 or len(self._pending) >= MAX_BATCH:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._closed and len(self._pending) < MAX_BATCH:
+                    self._cond.wait(self.flush_interval)  # Let a burst collect
+                lines, self._pending = self._pending, []
+                closed = self._closed
+            if lines:
+                self._write_batch(lines)
+            if closed:
+                return
+
+    def flush(self):
+        """Write everything queued so far from the calling thread"""
+        with self._cond:
+            lines, self._pending = self._pending, []
+        if lines:
+            self._write_batch(lines)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(5)
+        self.flush()
+        with self._io_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._lock.close()
+
+    # ---- file handling ----
+
+    def _write_batch(self, lines):
+        data = ("\n".join(lines) + "\n").encode("utf-8", "replace")
+        try:
+            with self._io_lock, self._lock:
+                self._prepare(len(data))
+                os.write(self._fd, data)
+        except OSError:
+            pass  # Logging must never take the monitor down
+
+    def _prepare(self, incoming):
+        """Rotate if due and make sure our descriptor points at the current log"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            st = None
+        reason = None
+        if st is not None and st.st_size:
+            if self._day != today:
+                # Only roll over if nobody (no other process) has written today yet
+                if datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d") != today:
+                    reason = "Daily"
+            if reason is None and st.st_size + incoming > self.max_bytes:
+                reason = "Size Limit"
+        self._day = today
+        if reason:
+            self._rotate()
+        if reason or self._fd is None or st is None or st.st_ino != self._ino:
+            self._open()
+            if reason:
+                os.write(self._fd, f"=== WiFi Monitor Log Started: {today} ({reason} Rotation) ===\n".encode())
+
+    def _open(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._ino = os.fstat(self._fd).st_ino
+
+    def _rotate(self):
+        """wifi_monitor.log -> .1 -> .2 ... keeping `backups` generations"""
+        if self._fd is not None:
+            os.close(self._fd)  # Windows won't rename a file we hold open
+            self._fd = None
+        try:
+            if self.backups <= 0:
+                os.remove(self.path)
+                return
+            for i in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{i + 1}")
+            os.replace(self.path, self.path + ".1")
+        except OSError:
+            pass  # Another process still has it open (Windows); keep appending
+
+# ---- Shared writer ----
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = LogWriter()
+        return _writer
+
+def write(line):
+    """Append one line to wifi_monitor.log (batched in the background)"""
+    get_writer().write(line)
+
+def flush():
+    if _writer is not None:
+        _writer.flush()
+
+def close():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+def _after_fork():
+    # The writer thread does not survive fork; a child starts its own writer
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+atexit.register(close)
+wifi_util.reset_after_fork(_after_fork)
+
+class LogHandler(logging.Handler):
+    """logging handler that feeds the shared writer"""
+
+    def emit(self, record):
+        try:
+            write(self.format(record))
+        except Exception:
+            self.handleError(record)
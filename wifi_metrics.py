@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import wifi_util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TEXTFILE = os.path.join(SCRIPT_DIR, "wifi_metrics.prom")
+
+# ---- METRICS ----
+EXPORT_INTERVAL = 15  # Seconds between text file rewrites
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RECOVERY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+# -----------------
+
+# name -> (type, help, buckets)
+METRICS = {
+    "wifi_phase_duration_seconds": ("histogram", "Time spent in each monitoring phase", LATENCY_BUCKETS),
+    "wifi_login_attempts_total": ("counter", "Portal login attempts by outcome", None),
+    "wifi_time_to_internet_seconds": ("histogram", "Time from joining the SSID to working internet", RECOVERY_BUCKETS),
+    "wifi_offline_seconds_total": ("counter", "Seconds spent on the college SSID without internet", None),
+    "wifi_online": ("gauge", "1 while the internet works, 0 otherwise", None),
+    "wifi_probe_requests_total": ("counter", "Round trips spent classifying connectivity, by verdict", None),
+    "wifi_login_latency_seconds": ("histogram", "Time for a login endpoint to answer", LATENCY_BUCKETS),
+    "wifi_login_hedges_total": ("counter", "Hedged logins by which endpoint's answer won", None),
+    "wifi_cycle_deadline_total": ("counter", "Login cycles stopped by their time budget, by step", None),
+}
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+class Registry:
+    """In-process metric store with Prometheus text rendering.
+
+    Values are kept as plain dicts keyed by (name, labels) so a child
+    process can ship a snapshot() back to the monitor, which merge()s it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # (name, labels) -> float, or [bucket counts..., sum, count]
+
+    def inc(self, name, amount=1.0, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, _label_key(labels))] = float(value)
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def phase(self, phase):
+        """Time a block into wifi_phase_duration_seconds{phase=...}"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("wifi_phase_duration_seconds", time.perf_counter() - started, phase=phase)
+
+    # ---- cross-process ----
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(value) if isinstance(value, list) else value
+                    for key, value in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def merge(self, snapshot):
+        """Add a child's counters and histograms into ours (gauges are skipped)"""
+        with self._lock:
+            for key, value in (snapshot or {}).items():
+                kind = METRICS.get(key[0], ("gauge",))[0]
+                if kind == "gauge":
+                    continue
+                if isinstance(value, list):
+                    mine = self._values.get(key, [0] * len(value))
+                    self._values[key] = [a + b for a, b in zip(mine, value)]
+                else:
+                    self._values[key] = self._values.get(key, 0.0) + value
+
+    # ---- export ----
+
+    def render(self):
+        """Prometheus text exposition format"""
+        values = self.snapshot()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = sorted((key[1], value) for key, value in values.items() if key[0] == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                    continue
+                for bound, count in zip(buckets, value):
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {value[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=TEXTFILE):
+        """Atomically rewrite the text file (for node_exporter's textfile collector)"""
+        wifi_util.write_atomic(path, self.render())
+
+REGISTRY = Registry()
+
+# Module-level shortcuts on the shared registry
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+phase = REGISTRY.phase
+
+class Exporter:
+    """Rewrites the text file every EXPORT_INTERVAL seconds and optionally serves /metrics"""
+
+    def __init__(self, registry=REGISTRY, textfile=TEXTFILE, port=0, host="127.0.0.1",
+                 interval=EXPORT_INTERVAL):
+        self.registry = registry
+        self.textfile = os.path.join(SCRIPT_DIR, textfile) if textfile else None  # Relative to the scripts
+        self.port = port
+        self.host = host
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.textfile:
+            self._thread = threading.Thread(target=self._run, name="wifi-metrics", daemon=True)
+            self._thread.start()
+        if self.port:
+            self._serve()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.registry.write_textfile(self.textfile)
+
+    def _serve(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Scrapes don't belong in wifi_monitor.log
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="wifi-metrics-http", daemon=True).start()
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server is not None else None
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.textfile:
+            self.registry.write_textfile(self.textfile)  # Final values on the way out
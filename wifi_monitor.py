@@ -1,142 +1,103 @@
-import subprocess
-import time
-import os
-import sys
 from datetime import datetime
 
-# Get script directory
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-AUTO_LOGIN_SCRIPT = os.path.join(SCRIPT_DIR, "wifi_auto_login.py")
-LOG_FILE = os.path.join(SCRIPT_DIR, "wifi_monitor.log")
-LOG_DATE_FILE = os.path.join(SCRIPT_DIR, ".last_log_date")
+import wifi_config
+import wifi_control
+import wifi_engine
+import wifi_events
+import wifi_iface
+import wifi_keepalive
+import wifi_log
+import wifi_metrics
+from wifi_worker import DEADLINE_GRACE, LoginWorker
 
-def check_and_rotate_log():
-    """Check if we need to rotate/reset the log file daily or if it's too large"""
-    try:
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # Check if we have a stored date
-        last_date = ""
-        if os.path.exists(LOG_DATE_FILE):
-            with open(LOG_DATE_FILE, "r") as f:
-                last_date = f.read().strip()
-        
-        # Check log file size (if > 5MB, force rotation)
-        log_too_large = False
-        if os.path.exists(LOG_FILE):
-            file_size = os.path.getsize(LOG_FILE)
-            if file_size > 5 * 1024 * 1024:  # 5MB
-                log_too_large = True
-        
-        # If date changed or log too large, clear the log
-        if last_date != today or log_too_large:
-            # Clear old log
-            with open(LOG_FILE, "w", encoding="utf-8") as f:
-                rotation_reason = "Daily" if last_date != today else "Size Limit"
-                f.write(f"=== WiFi Monitor Log Started: {today} ({rotation_reason} Rotation) ===\n")
-            
-            # Update date file
-            with open(LOG_DATE_FILE, "w") as f:
-                f.write(today)
-                
-            return True  # Log was rotated
-        return False  # No rotation needed
-        
-    except Exception as e:
-        # If anything fails, just continue
-        return False
+POLL_INTERVAL = 10  # Link-change polling when no event backend is available
 
 def log_message(message):
-    """Log message to file and console with daily rotation"""
+    """Log message to console and the shared log (batched, rotated by wifi_log)"""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] {message}"
     print(log_entry)
-    
-    try:
-        # Check if we need to rotate log first
-        check_and_rotate_log()
-        
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(log_entry + "\n")
-    except:
-        pass
+    wifi_log.write(log_entry)
 
 def get_connected_wifi():
-    """Get currently connected WiFi name"""
-    try:
-        result = subprocess.check_output("netsh wlan show interfaces", shell=True).decode()
-        for line in result.split('\n'):
-            if "SSID" in line and "BSSID" not in line:
-                return line.split(":")[1].strip()
-    except:
-        return None
+    """Get currently connected WiFi name (cached, see wifi_iface)"""
+    return wifi_iface.get_connected_ssid()
+
+# Persistent login worker, started on first use and reused for every WiFi join
+login_worker = LoginWorker(timeout=60)
 
 def run_auto_login():
-    """Run the auto-login script"""
+    """Run the auto-login handler in the persistent worker and return its outcome"""
     try:
-        log_message("🔐 Running auto-login script...")
-        result = subprocess.run([sys.executable, AUTO_LOGIN_SCRIPT, "--service"], 
-                              capture_output=True, text=True, timeout=60)
+        log_message("🔐 Running auto-login...")
+        # The cycle keeps to CYCLE_BUDGET itself; the kill is only for a hung worker
+        outcome = login_worker.run_login(timeout=wifi_config.get().cycle_budget + DEADLINE_GRACE)
         
-        if result.returncode == 0:
-            log_message("✅ Auto-login script completed successfully")
+        if outcome["error"] == "timeout":
+            log_message("⏰ Auto-login timed out")
+        elif outcome["error"]:
+            log_message(f"⚠️ Auto-login error: {outcome['error']}")
         else:
-            log_message(f"⚠️ Auto-login script returned code {result.returncode}")
+            log_message(f"✅ Auto-login finished in {outcome['elapsed']:.1f}s (result: {outcome['result']})")
             
-        return result.returncode == 0
+        return outcome
         
-    except subprocess.TimeoutExpired:
-        log_message("⏰ Auto-login script timed out")
-        return False
     except Exception as e:
-        log_message(f"❌ Error running auto-login script: {e}")
-        return False
+        log_message(f"❌ Error running auto-login: {e}")
+        return {"ok": False, "result": None, "error": str(e), "elapsed": 0.0}
+
+def create_engine(college_wifi_name, events=None, keepalive=None, poll_interval=POLL_INTERVAL):
+    """The monitor's engine (also used by benchmarks/bench_time_to_internet.py)"""
+    # Only log in once per join; the login itself runs in the persistent worker
+    engine = wifi_engine.MonitorEngine(
+        target_ssid=college_wifi_name,
+        get_ssid=get_connected_wifi,
+        login=lambda: run_auto_login()["ok"],
+        events=events,
+        keepalive=keepalive,
+        poll_interval=poll_interval,
+        watch_connectivity=False,
+        log=log_message
+    )
+    wifi_config.follow(engine, keepalive)  # A renamed SSID in config.ini applies from the next cycle
+    return engine
 
 def wifi_connection_monitor():
     """Monitor WiFi connection changes and trigger login when needed"""
     log_message("🚀 Starting WiFi Connection Monitor...")
     log_message("📡 Monitoring for college WiFi connections...")
     
-    last_wifi = None
-    college_wifi_name = "PCU_Student"
+    cfg = wifi_config.get()
     
-    while True:
-        try:
-            current_wifi = get_connected_wifi()
-            
-            # Check if WiFi changed
-            if current_wifi != last_wifi:
-                log_message(f"📶 WiFi changed: '{last_wifi}' → '{current_wifi}'")
-                last_wifi = current_wifi
-                
-                # If connected to college WiFi, trigger auto-login
-                if current_wifi == college_wifi_name:
-                    log_message(f"🎓 Connected to college WiFi: {college_wifi_name}")
-                    log_message("🔄 Triggering auto-login process...")
-                    
-                    success = run_auto_login()
-                    
-                    if success:
-                        log_message("✅ Auto-login process completed successfully!")
-                    else:
-                        log_message("❌ Auto-login process failed!")
-                
-                elif current_wifi:
-                    log_message(f"📱 Connected to: {current_wifi} (not college WiFi)")
-                else:
-                    log_message("📵 No WiFi connection detected")
-            
-            # Sleep for a while before next check
-            time.sleep(10)  # Check every 10 seconds for WiFi changes
-            
-        except KeyboardInterrupt:
-            log_message("🛑 Monitor stopped by user")
-            break
-        except Exception as e:
-            log_message(f"❌ Monitor error: {e}")
-            time.sleep(30)  # Wait longer on error
+    events = wifi_events.create_event_source(cfg.event_source, cfg.event_file).start()
+    # With a real event backend, polling is only a slow safety net
+    poll_interval = POLL_INTERVAL if events.name == "polling" else wifi_events.SAFETY_POLL_INTERVAL
+    log_message(f"👂 Link-change events: {events.name} (safety poll every {poll_interval}s)")
+    keepalive = None
+    if cfg.keepalive_enabled:
+        keepalive = wifi_keepalive.KeepaliveScheduler(cfg.username, cfg.login_url, url=cfg.keepalive_url,
+                                                      lifetime=cfg.session_lifetime, log=log_message)
+    metrics = wifi_metrics.Exporter(textfile=cfg.metrics_textfile, port=cfg.metrics_port).start()
+    if cfg.metrics_port:
+        log_message(f"📈 Metrics: http://127.0.0.1:{cfg.metrics_port}/metrics")
+    
+    engine = create_engine(cfg.college_wifi_name, events, keepalive, poll_interval)
+    control = wifi_control.ControlServer(lambda: [engine], port=cfg.control_port, log=log_message).start()
+    if cfg.control_port:
+        log_message(f"🎛️ Control: http://127.0.0.1:{cfg.control_port}/status")
+    
+    try:
+        engine.run_forever()
+    except KeyboardInterrupt:
+        log_message("🛑 Monitor stopped by user")
+    finally:
+        events.stop()
+        metrics.stop()
+        control.stop()
+        log_message(f"📊 {engine.detection.summary()}")
 
 def main():
+    wifi_config.log = log_message
     log_message("="*60)
     log_message("College WiFi Connection Monitor")
     log_message("="*60)
@@ -149,6 +110,8 @@ def main():
         wifi_connection_monitor()
     except KeyboardInterrupt:
         log_message("Monitor stopped by user")
+    finally:
+        login_worker.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,589 @@
+import json
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urljoin
+
+import wifi_http
+import wifi_metrics
+import wifi_util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+METHOD_CACHE_FILE = os.path.join(SCRIPT_DIR, ".login_method.json")
+FORM_CACHE_FILE = os.path.join(SCRIPT_DIR, ".portal_form.json")
+LATENCY_FILE = os.path.join(SCRIPT_DIR, ".login_latency.json")
+INVALIDATE_AFTER = 3  # Forget the learned method after this many failures in a row
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Content-Type': 'application/x-www-form-urlencoded'
+}
+
+# ---- LOGIN SCHEMES ----
+# Each scheme builds the form payload for one portal flavour. "mode191" is
+# the Cyberoam/Sophos login.xml form; the others are common generic forms.
+
+def _mode191(username, password):
+    return {"mode": "191", "username": username, "password": password, "a": int(time.time() * 1000)}
+
+def _username_login(username, password):
+    return {"username": username, "password": password, "login": "Login"}
+
+def _user_pass(username, password):
+    return {"user": username, "pass": password, "action": "login"}
+
+def _userid_pwd(username, password):
+    return {"userid": username, "pwd": password, "submit": "Login"}
+
+SCHEMES = {
+    "mode191": _mode191,
+    "username-login": _username_login,
+    "user-pass": _user_pass,
+    "userid-pwd": _userid_pwd,
+}
+DEFAULT_SCHEME = "mode191"
+FORM_SCHEME = "form"  # The form discovered on the portal page (see discover_form)
+# -----------------------
+
+# ---- HEDGING ----
+# With ALTERNATIVE_URLS, a login the first endpoint has not answered within
+# the hedge delay is sent to the next endpoint too (see hedged_login).
+LATENCY_SAMPLES = 50       # Answer times kept per endpoint
+HEDGE_PERCENTILE = 95      # The automatic hedge delay is this percentile of the endpoint's answer times
+HEDGE_MIN_SAMPLES = 5      # Fewer samples than this: DEFAULT_HEDGE_DELAY
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_HEDGE_DELAY = 0.2      # Never hedge sooner than this, however fast the endpoint usually is
+MAX_FALLBACK_LOGINS = 4    # Alternative logins raced when an answer is not understood (see login)
+# -----------------
+
+# ---- LOGIN RESULTS ----
+SUCCESS = "success"
+BAD_CREDENTIALS = "bad-credentials"
+MAX_SESSIONS = "max-sessions"
+UNKNOWN = "unknown"
+
+# Seconds to wait before logging in again after each outcome. None means
+# retrying is hopeless until the SSID or the configuration changes.
+RETRY_AFTER = {
+    SUCCESS: 0,
+    BAD_CREDENTIALS: None,
+    MAX_SESSIONS: 300,  # Another device has to time out first
+    UNKNOWN: 0,         # Transient: the caller's normal backoff applies
+}
+
+class LoginResult:
+    """Typed outcome of one login attempt; truthy only on SUCCESS.
+
+    `status` is the HTTP status of the answer (None if none came).
+    """
+    __slots__ = ("outcome", "message", "scheme", "endpoint", "status")
+
+    def __init__(self, outcome, message="", scheme=None, endpoint=None, status=None):
+        self.outcome = outcome
+        self.message = message
+        self.scheme = scheme
+        self.endpoint = endpoint
+        self.status = status
+
+    def __bool__(self):
+        return self.outcome == SUCCESS
+
+    @property
+    def retry_after(self):
+        return RETRY_AFTER[self.outcome]
+
+    @property
+    def retryable(self):
+        return self.outcome != SUCCESS and self.retry_after is not None
+
+    @property
+    def misunderstood(self):
+        """The portal answered, but not in a way we understand (a changed form, not an outage)"""
+        return self.outcome == UNKNOWN and self.status in (200, 404, 405)
+
+    def __repr__(self):
+        return f"LoginResult({self.outcome!r}, {self.message!r}, scheme={self.scheme!r})"
+
+# Phrases of a portal's <message>; a bare word like "password" is on every login page
+BAD_CREDENTIAL_HINTS = ("invalid", "incorrect", "wrong", "make sure your password is correct", "not found",
+                        "disabled")
+MAX_SESSION_HINTS = ("maximum", "max login", "login limit", "limit reached", "already logged")
+# What a generic portal's page says, in its visible text, once we are in; "success" alone is in every script
+SUCCESS_PHRASES = ("you have successfully logged in", "you are signed in", "you are now logged in",
+                   "login successful")
+
+def _classify_message(message):
+    lowered = message.lower()
+    if any(hint in lowered for hint in MAX_SESSION_HINTS):
+        return MAX_SESSIONS
+    if any(hint in lowered for hint in BAD_CREDENTIAL_HINTS):
+        return BAD_CREDENTIALS
+    return UNKNOWN
+
+def _visible_text(html):
+    """The text a browser would show (no tags, scripts or styles), lowercased, whitespace collapsed"""
+    from html.parser import HTMLParser  # Only paid for non-Cyberoam answers
+
+    class TextParser(HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.parts = []
+            self.hidden = 0
+
+        def handle_starttag(self, tag, attrs):
+            if tag in ("script", "style"):
+                self.hidden += 1
+
+        def handle_endtag(self, tag):
+            if tag in ("script", "style") and self.hidden:
+                self.hidden -= 1
+
+        def handle_data(self, data):
+            if not self.hidden:
+                self.parts.append(data)
+
+    parser = TextParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        return ""
+    return " ".join(" ".join(parser.parts).lower().split())
+
+def parse_login_response(text, status_code=200):
+    """Classify a portal login answer.
+
+    login.xml answers 200 whatever happens, so its XML decides:
+    <status>LIVE</status> is a login; otherwise <message> says why not.
+    Any other page (HTML or XHTML from a generic portal) is a login only if
+    its visible text carries one of SUCCESS_PHRASES, and a rejection only
+    on 401/403; anything else, a "success" in a script included, is UNKNOWN.
+    """
+    if status_code >= 500 or status_code in (404, 405):
+        return LoginResult(UNKNOWN, f"HTTP {status_code}")  # Down, or the form moved
+    try:
+        root = ET.fromstring(text.strip())
+    except ET.ParseError:
+        root = None
+    if root is not None and (root.find("status") is not None or root.find("message") is not None):
+        status = (root.findtext("status") or "").strip()
+        message = (root.findtext("message") or "").strip()
+        if status.upper() == "LIVE":
+            return LoginResult(SUCCESS, message)
+        return LoginResult(_classify_message(message), message or status)
+    if status_code == 200 and any(phrase in _visible_text(text) for phrase in SUCCESS_PHRASES):
+        return LoginResult(SUCCESS, text[:100])
+    if status_code in (401, 403):
+        return LoginResult(BAD_CREDENTIALS, f"HTTP {status_code}")
+    return LoginResult(UNKNOWN, text[:100])
+
+# ---- Learned-method cache ----
+
+_cache_lock = threading.Lock()
+
+def load_method():
+    """Return the remembered {scheme, endpoint, failures} record, or None"""
+    try:
+        with open(METHOD_CACHE_FILE, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        if (record.get("scheme") in SCHEMES or record.get("scheme") == FORM_SCHEME) and record.get("endpoint"):
+            return record
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _save_method(record):
+    wifi_util.write_atomic(METHOD_CACHE_FILE, json.dumps(record))
+
+def forget_method():
+    try:
+        os.remove(METHOD_CACHE_FILE)
+    except OSError:
+        pass
+
+def remember_success(scheme, endpoint):
+    with _cache_lock:
+        _save_method({"scheme": scheme, "endpoint": endpoint, "failures": 0, "learned_at": time.time()})
+
+def record_failure(record):
+    """Count a failure of the learned method; drop it after INVALIDATE_AFTER in a row"""
+    with _cache_lock:
+        record["failures"] = record.get("failures", 0) + 1
+        if record["failures"] >= INVALIDATE_AFTER:
+            forget_method()
+        else:
+            _save_method(record)
+
+def report_verification(result, working):
+    """Tell the method cache whether the internet worked after the successful login `result`.
+
+    login() remembers nothing by itself: a portal (or a wrong endpoint)
+    can answer "success" without letting us out. A verified login is
+    remembered; one the caller's probe disproves counts as a failure of
+    the learned method if it was the learned method.
+    """
+    if not result or result.scheme is None:
+        return
+    record = load_method()
+    learned = record is not None and (record["scheme"], record["endpoint"]) == (result.scheme, result.endpoint)
+    if working:
+        if not learned or record.get("failures"):
+            remember_success(result.scheme, result.endpoint)
+    elif learned:
+        record_failure(record)
+
+# ---- Discovered login form ----
+
+class LoginForm:
+    """The portal page's login form: where it posts and what it sends.
+
+    `fields` holds the hidden inputs (sent as they are); the credentials
+    go into `user_field` and `pass_field`. `etag`/`last_modified` make the
+    next fetch of `page_url` conditional.
+    """
+    __slots__ = ("page_url", "action", "fields", "user_field", "pass_field", "etag", "last_modified")
+
+    def __init__(self, page_url, action, fields, user_field, pass_field, etag=None, last_modified=None):
+        self.page_url = page_url
+        self.action = action
+        self.fields = fields
+        self.user_field = user_field
+        self.pass_field = pass_field
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def payload(self, username, password):
+        data = dict(self.fields)
+        data[self.user_field] = username
+        data[self.pass_field] = password
+        return data
+
+    def same_form(self, other):
+        return other is not None and all(getattr(self, name) == getattr(other, name)
+                                         for name in ("action", "fields", "user_field", "pass_field"))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"LoginForm({self.action!r}, user={self.user_field!r}, password={self.pass_field!r})"
+
+def parse_login_form(html, page_url):
+    """The first <form> with a password input, as a LoginForm, or None.
+
+    A form that posts back to the page itself (no action: the page's script
+    submits it elsewhere) tells us nothing about where to log in and is skipped.
+    """
+    from html.parser import HTMLParser  # Only paid when the page is actually (re)read
+
+    class FormParser(HTMLParser):
+        def __init__(self):
+            super().__init__()
+            self.forms = []  # [action, [(type, name, value), ...]]
+
+        def handle_starttag(self, tag, attrs):
+            attrs = dict(attrs)
+            if tag == "form":
+                self.forms.append([attrs.get("action") or "", []])
+            elif tag == "input" and self.forms and attrs.get("name"):
+                self.forms[-1][1].append(((attrs.get("type") or "text").lower(), attrs["name"],
+                                          attrs.get("value") or ""))
+
+    parser = FormParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        return None
+    for action, inputs in parser.forms:
+        passwords = [name for kind, name, _ in inputs if kind == "password"]
+        users = [name for kind, name, _ in inputs if kind in ("text", "email")]
+        target = urljoin(page_url, action).split("#")[0]
+        if passwords and users and target != page_url.split("#")[0]:
+            fields = {name: value for kind, name, value in inputs if kind == "hidden"}
+            return LoginForm(page_url, target, fields, users[0], passwords[0])
+    return None
+
+def load_form(page_url=None):
+    """The cached LoginForm (for `page_url`, if given), or None"""
+    try:
+        with open(FORM_CACHE_FILE, "r", encoding="utf-8") as f:
+            form = LoginForm(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+    if page_url is not None and form.page_url != page_url:
+        return None  # Read from a different portal
+    if form.action == form.page_url:
+        return None  # Cached before such forms were skipped (see parse_login_form)
+    return form
+
+def _save_form(form):
+    wifi_util.write_atomic(FORM_CACHE_FILE, json.dumps(form.to_dict()))
+
+def discover_form(page_url, timeout=10, interface=None, refresh=False):
+    """The portal's login form, reading the page only when needed.
+
+    The cached form is returned without any request unless `refresh`;
+    then the page is fetched conditionally (If-None-Match /
+    If-Modified-Since), so an unchanged page costs a 304 and no parsing.
+    """
+    cached = load_form(page_url)
+    if cached is not None and not refresh:
+        return cached
+    headers = dict(HEADERS)
+    headers.pop('Content-Type')
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+    try:
+        with wifi_http.get_session(interface).get(page_url, headers=headers, timeout=timeout) as response:
+            status, text = response.status_code, response.text
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+    except Exception:
+        return cached
+    if status == 304:
+        return cached
+    form = parse_login_form(text, page_url) if status == 200 else None
+    if form is not None:
+        form.etag, form.last_modified = etag, last_modified
+        with _cache_lock:
+            _save_form(form)
+    return form
+
+def _payload(scheme, username, password):
+    if scheme == FORM_SCHEME:
+        form = load_form()
+        return form.payload(username, password) if form is not None else None
+    return SCHEMES[scheme](username, password)
+
+# ---- Endpoint latency ----
+
+_latencies = None  # endpoint -> recent answer times in seconds, newest last; loaded on first use
+_latency_lock = threading.Lock()
+
+def _after_fork():
+    # A lock held by another thread at fork time would never be released in the child
+    global _cache_lock, _latency_lock
+    _cache_lock = threading.Lock()
+    _latency_lock = threading.Lock()
+
+wifi_util.reset_after_fork(_after_fork)
+
+def _load_latencies():
+    global _latencies
+    if _latencies is None:
+        try:
+            with open(LATENCY_FILE, "r", encoding="utf-8") as f:
+                _latencies = {endpoint: [float(t) for t in times][-LATENCY_SAMPLES:]
+                              for endpoint, times in json.load(f).items() if isinstance(times, list)}
+        except (OSError, ValueError, TypeError, AttributeError):
+            _latencies = {}
+    return _latencies
+
+def record_latency(endpoint, seconds):
+    """Note how long `endpoint` took to answer a login"""
+    with _latency_lock:
+        times = _load_latencies().setdefault(endpoint, [])
+        times.append(round(seconds, 4))
+        del times[:-LATENCY_SAMPLES]
+    wifi_metrics.observe("wifi_login_latency_seconds", seconds, endpoint=endpoint)
+
+def save_latencies():
+    with _latency_lock:
+        if _latencies is None:
+            return
+        wifi_util.write_atomic(LATENCY_FILE, json.dumps(_latencies))
+
+def latency_percentile(endpoint, percentile=HEDGE_PERCENTILE):
+    """The `percentile`th answer time of `endpoint` (nearest rank), or None without enough samples"""
+    with _latency_lock:
+        times = sorted(_load_latencies().get(endpoint, ()))
+    if len(times) < HEDGE_MIN_SAMPLES:
+        return None
+    return times[max(0, math.ceil(percentile / 100 * len(times)) - 1)]
+
+def hedge_delay(endpoint, timeout=10, configured=None):
+    """Seconds to wait for `endpoint` before hedging: `configured`, else its observed p95"""
+    if configured is not None:
+        return min(configured, timeout)
+    observed = latency_percentile(endpoint)
+    if observed is None:
+        return min(DEFAULT_HEDGE_DELAY, timeout)
+    return min(max(observed, MIN_HEDGE_DELAY), timeout)
+
+# ---- Login ----
+
+def try_scheme(scheme, endpoint, username, password, referer=None, timeout=10, interface=None):
+    """POST one scheme to one endpoint and return its LoginResult"""
+    headers = dict(HEADERS)
+    if referer:
+        headers['Referer'] = referer
+    payload = _payload(scheme, username, password)
+    if payload is None:
+        return LoginResult(UNKNOWN, "no login form known", scheme, endpoint)
+    started = time.monotonic()
+    try:
+        with wifi_http.get_session(interface).post(endpoint, data=payload, headers=headers,
+                                                   timeout=timeout) as response:
+            text, status = response.text, response.status_code
+    except Exception as e:
+        return LoginResult(UNKNOWN, str(e), scheme, endpoint)
+    record_latency(endpoint, time.monotonic() - started)
+    result = parse_login_response(text, status)
+    result.scheme, result.endpoint, result.status = scheme, endpoint, status
+    return result
+
+def hedged_login(scheme, endpoints, username, password, referer=None, timeout=10, interface=None,
+                 delay=None, sent=None):
+    """POST one scheme to `endpoints[0]`, hedging to the next endpoint while no answer comes.
+
+    The next endpoint gets the same login once those in flight have not
+    answered within the hedge delay (`delay`, else the last one's observed
+    p95, see hedge_delay) or as soon as one fails without a definite
+    answer. Only a success ends the hedge early: a rejection waits for the
+    logins still in flight, which may have got us in. Without a success
+    `endpoints[0]`'s own definite answer is returned, else a hedge's, else
+    the first UNKNOWN, preferring one the portal actually answered (see
+    LoginResult.misunderstood). `sent` collects the endpoints actually tried.
+    """
+    sent = sent if sent is not None else []
+    if len(endpoints) == 1:
+        sent.append(endpoints[0])
+        return try_scheme(scheme, endpoints[0], username, password, referer, timeout, interface)
+    executor = ThreadPoolExecutor(max_workers=len(endpoints), thread_name_prefix="login")
+    queue = list(endpoints)
+    pending = set()
+    answers = []
+
+    def launch():
+        endpoint = queue.pop(0)
+        sent.append(endpoint)
+        pending.add(executor.submit(try_scheme, scheme, endpoint, username, password, referer, timeout, interface))
+        return hedge_delay(endpoint, timeout, delay)
+
+    try:
+        wait_for = launch()
+        while pending:
+            done, _ = wait(pending, timeout=wait_for if queue else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                if result:
+                    if len(sent) > 1:
+                        wifi_metrics.inc("wifi_login_hedges_total", won="primary" if result.endpoint == endpoints[0] else "hedge")
+                    return result
+                answers.append(result)
+                if result.endpoint == endpoints[0] and result.outcome != UNKNOWN:
+                    queue.clear()  # LOGIN_URL itself answered: no more hedges, only those in flight
+            if queue:
+                wait_for = launch()  # Timed out waiting, or everything answered so far failed
+        definite = [result for result in answers if result.outcome != UNKNOWN]
+        definite.sort(key=lambda result: result.endpoint != endpoints[0])
+        answers.sort(key=lambda result: not result.misunderstood)
+        return (definite or answers)[0]
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def race_schemes(candidates, username, password, referer=None, timeout=10, interface=None):
+    """Try (scheme, endpoint) pairs concurrently.
+
+    Returns the first successful LoginResult; failing that, the most
+    informative failure (a definite portal answer beats UNKNOWN).
+    """
+    if not candidates:
+        return LoginResult(UNKNOWN, "no login methods to try")
+    executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="login")
+    futures = {executor.submit(try_scheme, scheme, endpoint, username, password, referer, timeout, interface):
+               (scheme, endpoint) for scheme, endpoint in candidates}
+    best = LoginResult(UNKNOWN, "all login methods failed")
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            if result:
+                return result
+            if best.outcome == UNKNOWN:
+                best = result
+        return best
+    finally:
+        # Don't wait for the losers; their answers no longer matter
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def login(username, password, login_url, referer=None, timeout=10, log=None, interface=None,
+          alternative_urls=(), hedge_delay=None, deadline=None):
+    """Log in, trying the remembered method first, and return a LoginResult.
+
+    The learned method (else mode 191 to LOGIN_URL) is hedged across
+    LOGIN_URL and `alternative_urls`; see hedged_login, and `hedge_delay`
+    None means each endpoint's observed p95. A definite rejection, an
+    outage or a 5xx is returned as is. Only an answer the portal gave but
+    we did not understand re-reads the page's login form (`referer`, see
+    discover_form) and races it with up to MAX_FALLBACK_LOGINS other
+    schemes and endpoints. Nothing is remembered here: the caller reports
+    its verify probe to report_verification, so the form goes first only
+    once it has worked.
+
+    With a `deadline` (wifi_scheduler.Deadline) every request gets only
+    what is left of it, and steps that no longer fit are skipped.
+    """
+    result = _login(username, password, login_url, referer, timeout, log or (lambda message: None), interface,
+                    alternative_urls, hedge_delay, deadline)
+    save_latencies()
+    wifi_metrics.inc("wifi_login_attempts_total", outcome=result.outcome)
+    return result
+
+def _login(username, password, login_url, referer, timeout, log, interface, alternative_urls=(), hedge_delay=None,
+           deadline=None):
+    step_timeout = (lambda: deadline.timeout(timeout)) if deadline is not None else (lambda: timeout)
+    out_of_time = lambda: deadline is not None and deadline.expired
+    endpoints = [login_url] + [url for url in alternative_urls if url != login_url]
+    form = load_form(referer) if referer else None
+    record = load_method()
+    if record and record["endpoint"] not in endpoints and not (form and record["endpoint"] == form.action):
+        record = None  # Learned for a different portal
+
+    # An unproven form never displaces the known-good default; it is a fallback until it works
+    first = (record["scheme"], record["endpoint"]) if record else (DEFAULT_SCHEME, login_url)
+    if out_of_time():
+        return LoginResult(UNKNOWN, "no time left in this cycle", *first)
+    sent = []
+    result = hedged_login(first[0], [first[1]] + [url for url in endpoints if url != first[1]], username, password,
+                          referer, step_timeout(), interface, hedge_delay, sent)
+    if result:
+        if result.endpoint != first[1]:
+            log(f"⚡ Hedged login: {result.endpoint} answered before {first[1]}")
+        return result
+    log(f"⚠️ Login method '{first[0]}' got {result.outcome}: {result.message}")
+    if result.outcome != UNKNOWN:
+        return result
+    if not result.misunderstood:
+        # Down, erroring or unreachable: other payloads would only add to the load of a restarting portal
+        return result
+    if record:
+        record_failure(record)
+
+    # The endpoint that gave the answer we did not understand first, then the rest
+    ordered = [result.endpoint] + [endpoint for endpoint in endpoints if endpoint != result.endpoint]
+    remaining = [(scheme, endpoint) for endpoint in ordered for scheme in SCHEMES
+                 if not (scheme == first[0] and endpoint in sent)]
+    if referer and not out_of_time():
+        # Read the portal's form (conditionally if cached): it may have moved or changed
+        fresh = discover_form(referer, step_timeout(), interface, refresh=True)
+        if fresh is not None:
+            changed = not fresh.same_form(form)
+            if changed and form is not None:
+                log(f"📝 Portal login form changed: posting to {fresh.action}")
+            if changed or first != (FORM_SCHEME, fresh.action):
+                remaining.insert(0, (FORM_SCHEME, fresh.action))
+    if out_of_time():
+        log("⏱️ No time left in this cycle for the alternative login methods")
+        return result
+    remaining = remaining[:MAX_FALLBACK_LOGINS]
+    log(f"🔄 Trying {len(remaining)} alternative login methods concurrently...")
+    return race_schemes(remaining, username, password, referer, step_timeout(), interface)
@@ -0,0 +1,311 @@
+import socket
+import threading
+from urllib.parse import urlparse, urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import wifi_dns
+import wifi_http
+import wifi_iface
+import wifi_metrics
+import wifi_util
+
+# Probe verdicts
+ONLINE = "online"
+CAPTIVE = "captive"
+OFFLINE = "offline"
+PORTAL_UNREACHABLE = "portal-unreachable"  # The network answers, the portal does not
+
+DEFAULT_PROBE_URLS = [
+    "http://www.google.com",
+    "http://httpbin.org/ip",
+    "http://www.msftconnecttest.com/connecttest.txt"
+]
+DEFAULT_TCP_TARGET = "8.8.8.8:53"  # Plain TCP reachability check used by wifi_service/wifi_login
+MAX_BODY_BYTES = 4096  # Enough to spot a portal page without downloading it all
+PROBE_STAGGER = 0.3    # classify() starts the next probe only if no answer came within this long
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _after_fork():
+    # Executor threads don't survive fork; a child (the login worker) starts its own pool
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+wifi_util.reset_after_fork(_after_fork)
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="probe")
+        return _executor
+
+def parse_address(target, default_port):
+    """'host:port' (or just 'host') -> (host, port)"""
+    host, sep, port = target.strip().rpartition(":")
+    if not sep or not port.isdigit():
+        return target.strip(), default_port
+    return host.strip("[]"), int(port)
+
+def portal_address(portal_url):
+    """(host, port) of the portal, for the TCP reachability check"""
+    parts = urlparse(portal_url)
+    return parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+def portal_markers(portal_url):
+    """Anything pointing at the portal host or its login page means we are captive"""
+    parts = urlparse(portal_url)
+    page = parts.path.rsplit("/", 1)[-1] or "httpclient.html"
+    return (parts.netloc or "10.11.200.1", page)
+
+def classify_response(response, markers):
+    """Turn one probe response into ONLINE, CAPTIVE or None (not decisive)"""
+    if response.status_code in (301, 302, 303, 307, 308):
+        location = response.headers.get('Location', '')
+        if any(marker in location for marker in markers):
+            return CAPTIVE
+        return None
+    if response.status_code == 204:
+        return ONLINE  # generate_204-style check; portals never answer with an empty 204
+    if response.status_code == 200:
+        body = response.raw.read(MAX_BODY_BYTES, decode_content=True) or b""
+        text = body.decode(response.encoding or "utf-8", errors="replace")
+        if any(marker in text for marker in markers):
+            return CAPTIVE
+        return ONLINE
+    return None
+
+def _resolve(url, markers, sent):
+    """Address to probe `url` at without asking DNS: (address, fresh), or a CAPTIVE signal.
+
+    Probe hosts are looked up in wifi_dns first; only unknown hosts hit
+    the resolver, and an answer pointing at the portal or a private range
+    is a hijack, i.e. captive. IP literals and https URLs are left alone.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme != "http" or not host or wifi_dns.is_address(host):
+        return None, False, None
+    address = wifi_dns.cached(host)
+    if address is not None:
+        return address, False, None
+    if sent is not None:
+        sent.append(f"dns:{host}")
+    address = wifi_dns.lookup(host, parts.port or 80)
+    if address is not None and wifi_dns.is_hijacked(address, urlsplit("//" + markers[0]).hostname):
+        return None, True, address
+    return address, True, None
+
+def _probe(url, markers, timeout, cancelled, interface=None, sent=None):
+    """One probe -> (verdict or None, captive redirect target, whether anything answered)"""
+    if cancelled.is_set():
+        return None, None, False
+    address, fresh, hijacked = _resolve(url, markers, sent)
+    if hijacked is not None:
+        return CAPTIVE, hijacked, True  # DNS answered for the portal
+    if fresh and address is None:
+        return None, None, False  # The resolver gave up; nothing to probe
+    target_url, headers = wifi_dns.direct_url(url, address) if address else (url, None)
+    if sent is not None:
+        sent.append(url)
+    try:
+        response = wifi_http.get_session(interface).get(target_url, headers=headers, timeout=timeout,
+                                                        allow_redirects=False, stream=True)
+    except Exception:  # requests errors, or OSError/HTTPException on the fast path
+        return None, None, False
+    with response:
+        try:
+            if cancelled.is_set():
+                return None, None, True
+            verdict = classify_response(response, markers)
+            target = (response.headers.get('Location') or response.url) if verdict == CAPTIVE else None
+        except Exception:
+            return None, None, True
+    if verdict == ONLINE and address:
+        host = urlsplit(url).hostname
+        if fresh:
+            wifi_dns.remember(host, address)  # A clean answer from this address: it is genuine
+        elif wifi_dns.stale(host):
+            # Online, so DNS can be trusted again; refresh off the probe's critical path
+            _get_executor().submit(wifi_dns.refresh, host, urlsplit(url).port or 80,
+                                   urlsplit("//" + markers[0]).hostname)
+    return verdict, target, True
+
+def _race(urls, markers, timeout, quorum, interface, sent, stagger=None):
+    """Race the probes: (verdict, captive target, whether any probe got an answer).
+
+    Any redirect to (or page from) the portal means CAPTIVE straight away;
+    ONLINE needs `quorum` clean answers, and whatever is still in flight
+    once a verdict is reached is cancelled. With `stagger`, only `quorum` probes start at once; each further one
+    starts when an earlier one ends undecided or `stagger` seconds pass
+    without a verdict, so a quick network is classified from one request.
+    """
+    if not urls:
+        return OFFLINE, None, False
+    quorum = max(1, min(quorum, len(urls)))
+    cancelled = threading.Event()
+    executor = _get_executor()
+    waiting = list(urls)
+    launch = lambda: executor.submit(_probe, waiting.pop(0), markers, timeout, cancelled, interface, sent)
+    pending = {launch() for _ in range(quorum if stagger is not None else len(urls))}
+    online_votes = 0
+    answered = False
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=stagger if waiting else timeout + 1, return_when=FIRST_COMPLETED)
+            if not done:
+                if not waiting:
+                    break
+                pending.add(launch())
+                continue
+            for future in done:
+                result, target, replied = future.result()
+                answered = answered or replied
+                if result == CAPTIVE:
+                    return CAPTIVE, target, True
+                if result == ONLINE:
+                    online_votes += 1
+                    if online_votes >= quorum:
+                        return ONLINE, None, True
+            if waiting:
+                pending.add(launch())
+        return OFFLINE, None, answered
+    finally:
+        cancelled.set()
+        for future in pending:
+            future.cancel()
+
+def tcp_reachable(address, timeout=5, interface=None):
+    """Plain TCP connect to (host, port), closed straight away (from `interface`'s address if given)"""
+    source = wifi_iface.ipv4_address(interface) if interface else None
+    try:
+        with socket.create_connection(address, timeout=timeout, source_address=(source, 0) if source else None):
+            return True
+    except OSError:
+        return False
+
+def portal_reachable(portal_url, timeout=5, interface=None):
+    """TCP connect to the portal host and port"""
+    return tcp_reachable(portal_address(portal_url), timeout, interface)
+
+# ---- Connectivity classifier ----
+
+class Classification:
+    """Where a connection stands after one classify() call.
+
+    `verdict` is ONLINE, CAPTIVE, PORTAL_UNREACHABLE or OFFLINE; `target`
+    is where the portal redirected us (CAPTIVE only) and `requests` the
+    round trips it took.
+    """
+    __slots__ = ("verdict", "target", "requests")
+
+    def __init__(self, verdict, target=None, requests=0):
+        self.verdict = verdict
+        self.target = target
+        self.requests = requests
+
+    @property
+    def online(self):
+        return self.verdict == ONLINE
+
+    @property
+    def captive(self):
+        return self.verdict == CAPTIVE
+
+    @property
+    def portal_reachable(self):
+        return self.verdict in (ONLINE, CAPTIVE)
+
+    def __repr__(self):
+        return f"Classification({self.verdict!r}, target={self.target!r}, requests={self.requests})"
+
+def classify(urls, portal_url, timeout=5, quorum=1, interface=None, deadline=None):
+    """Classify the connection from as few round trips as possible.
+
+    The probes race (see _race) but start staggered (see
+    PROBE_STAGGER), and a redirect to the portal answers
+    "captive, and the portal is up" on its own, so the portal itself is
+    only contacted (one TCP connect) when no probe was decisive. Then a
+    reachable portal means CAPTIVE, and an unreachable one means
+    PORTAL_UNREACHABLE if any probe got an answer, OFFLINE if none did.
+    With a `deadline` (wifi_scheduler.Deadline) each step gets only what is
+    left of it, and the portal check is skipped once it has run out.
+    """
+    step_timeout = (lambda: deadline.timeout(timeout)) if deadline is not None else (lambda: timeout)
+    sent = []
+    verdict, target, answered = _race(urls, portal_markers(portal_url), step_timeout(), quorum, interface, sent,
+                                      stagger=PROBE_STAGGER)
+    requests = len(sent)
+    if verdict == OFFLINE and not (deadline is not None and deadline.expired):
+        requests += 1
+        if portal_reachable(portal_url, step_timeout(), interface):
+            verdict, target = CAPTIVE, portal_url
+        elif answered:
+            verdict = PORTAL_UNREACHABLE
+    wifi_metrics.inc("wifi_probe_requests_total", requests, verdict=verdict)
+    return Classification(verdict, target, requests)
+
+class Classifier:
+    """classify() memoized for the rest of a monitoring cycle.
+
+    check_online() starts a cycle with fresh probes; the decision points
+    after it (captive? portal reachable?) read that answer instead of
+    probing again. `settings` returns (urls, portal_url, quorum) and is
+    called every cycle, so config reloads apply.
+    """
+
+    def __init__(self, settings, timeout=5, interface=None):
+        self.settings = settings
+        self.timeout = timeout
+        self.interface = interface
+        self.last = None
+
+    def refresh(self, deadline=None):
+        urls, portal_url, quorum = self.settings()
+        self.last = classify(urls, portal_url, self.timeout, quorum, self.interface, deadline)
+        return self.last
+
+    def result(self):
+        """This cycle's Classification, probing only if the cycle has none yet"""
+        return self.last if self.last is not None else self.refresh()
+
+    def check_online(self, deadline=None):
+        return self.refresh(deadline).online
+
+    def portal_reachable(self):
+        return self.result().portal_reachable
+
+class ConfigClassifier(Classifier):
+    """A Classifier on config.ini's [PROBES] URLS, QUORUM and PORTAL_URL, re-read every cycle.
+
+    With `tcp_checks` and a TCP_TARGET set, check_online() is one TCP
+    connect to it and portal_reachable() one to the portal; without a TCP
+    target the portal check reads the connectivity check's answer.
+    """
+
+    def __init__(self, tcp_checks=False, timeout=5):
+        super().__init__(self._config_settings, timeout)
+        self.tcp_checks = tcp_checks
+
+    @staticmethod
+    def _config():
+        import wifi_config  # Not at import: the daemon and the benchmarks build their own classifiers
+        return wifi_config.get()
+
+    def _config_settings(self):
+        cfg = self._config()
+        return cfg.probe_urls, cfg.portal_url, cfg.probe_quorum
+
+    def check_online(self, deadline=None):
+        cfg = self._config()
+        if self.tcp_checks and cfg.tcp_target:
+            return tcp_reachable(parse_address(cfg.tcp_target, 53), timeout=3)
+        return super().check_online(deadline)
+
+    def portal_reachable(self):
+        cfg = self._config()
+        if self.tcp_checks and cfg.tcp_target:
+            return portal_reachable(cfg.portal_url)
+        return super().portal_reachable()
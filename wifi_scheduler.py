@@ -0,0 +1,161 @@
+import random
+import time
+
+# ---- POLL SCHEDULER ----
+FAST_INTERVAL = 5      # Re-probe this often right after a roam or resume
+FAST_WINDOW = 30       # ...for this many seconds
+MAX_BACKOFF = 600      # Cap for failure backoff
+MAX_STABLE = 180       # Longest gap between probes while the link is stable
+JITTER = 0.2           # +/- fraction applied to every delay
+RESUME_GAP = 30        # A wait overshooting by this much means the machine slept
+MAX_DROP_SAMPLES = 10  # Observed portal session lifetimes kept for learning
+MIN_STEP = 0.5         # A step with less than this left in its cycle's budget is skipped, not started
+# ------------------------
+
+def backoff_delay(failures, base, cap=MAX_BACKOFF, jitter=JITTER, rng=random):
+    """Jittered exponential backoff: base * 2^(failures-1), capped"""
+    delay = min(cap, base * (2 ** max(0, failures - 1)))
+    return delay * rng.uniform(1 - jitter, 1 + jitter)
+
+class Deadline:
+    """One time budget for a whole login cycle, shared by every step in it.
+
+    timeout(cap) is what a step may spend: its own timeout, cut to what is
+    left. Once less than MIN_STEP remains the deadline is `expired` and
+    steps are skipped rather than started; stop() records why the cycle
+    ended. `clock` is injectable like PollScheduler's.
+    """
+
+    def __init__(self, budget, clock=time.monotonic):
+        self.budget = budget
+        self.clock = clock
+        self.started = clock()
+        self.reason = None
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def remaining(self):
+        return max(0.0, self.budget - self.elapsed())
+
+    @property
+    def expired(self):
+        return self.remaining() < MIN_STEP
+
+    def timeout(self, cap):
+        """`cap` or the time left, whichever is less (never below MIN_STEP)"""
+        return max(MIN_STEP, min(cap, self.remaining()))
+
+    def allows(self, seconds):
+        """Whether `seconds` can be spent (a sleep) and still leave MIN_STEP for what follows"""
+        return self.remaining() - seconds >= MIN_STEP
+
+    def stop(self, reason):
+        self.reason = reason
+        return reason
+
+class PollScheduler:
+    """Decides when the next connectivity probe should run.
+
+    - failures back off exponentially with jitter, up to MAX_BACKOFF;
+    - a roam, resume or link event switches to FAST_INTERVAL probes for
+      FAST_WINDOW seconds;
+    - every stable probe after `stable_after` stretches the interval by 50%,
+      up to MAX_STABLE;
+    - once portal session drops have been observed, a probe is also
+      scheduled right after the next expected drop, followed by FAST_INTERVAL
+      probes for FAST_WINDOW seconds.
+
+    `clock` is injectable so the simulation harness can run it on virtual time.
+    """
+
+    def __init__(self, base_interval=30, stable_after=5, off_network_interval=None,
+                 clock=time.time, rng=None):
+        self.base_interval = base_interval
+        self.stable_after = stable_after
+        self.off_network_interval = off_network_interval or base_interval * 2
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.failures = 0
+        self.stable_count = 0
+        self.fast_until = 0.0
+        self.session_started = None
+        self.last_online = None
+        self.drop_ages = []
+
+    # ---- observations ----
+
+    def on_risky_event(self, kind="link"):
+        """A roam, resume or link change: connectivity is suspect for a while"""
+        self.fast_until = self.clock() + FAST_WINDOW
+        self.stable_count = 0
+
+    def on_online(self):
+        self.failures = 0
+        self.stable_count += 1
+        self.last_online = self.clock()
+
+    def on_failure(self):
+        self.failures += 1
+        self.stable_count = 0
+
+    def on_login(self):
+        self.failures = 0
+        self.stable_count = 0
+        self.session_started = self.last_online = self.clock()
+
+    def on_session_drop(self):
+        """The portal dropped an established session; remember how long it lived.
+
+        The last probe that still saw us online is the sample: it errs short,
+        so the next drop probe lands just before the drop rather than drifting
+        ever later.
+        """
+        # Drops right after a roam or resume say nothing about the portal's timeout
+        if self.session_started is not None and self.clock() >= self.fast_until:
+            age = self.last_online - self.session_started
+            self.drop_ages = (self.drop_ages + [age])[-MAX_DROP_SAMPLES:]
+        self.session_started = None
+        self.stable_count = 0
+
+    def reset(self):
+        self.failures = 0
+        self.stable_count = 0
+        self.session_started = None
+
+    # ---- decision ----
+
+    @property
+    def expected_session_lifetime(self):
+        """Median observed session lifetime (robust to the odd unrelated drop)"""
+        if not self.drop_ages:
+            return None
+        ages = sorted(self.drop_ages)
+        return ages[len(ages) // 2]
+
+    def _jitter(self, delay):
+        return delay * self.rng.uniform(1 - JITTER, 1 + JITTER)
+
+    def next_delay(self, online, on_network=True):
+        """Seconds to wait before the next probe"""
+        now = self.clock()
+        if not on_network:
+            return self._jitter(self.off_network_interval)
+        if self.failures:
+            return backoff_delay(self.failures, self.base_interval, rng=self.rng)
+        if now < self.fast_until:
+            return min(FAST_INTERVAL, self.fast_until - now + 1)
+        lifetime = self.expected_session_lifetime
+        until_drop = None
+        if online and lifetime is not None and self.session_started is not None:
+            until_drop = self.session_started + lifetime - now
+            if -FAST_WINDOW < until_drop <= 0:
+                return FAST_INTERVAL  # The portal is due to drop us any moment
+        delay = self.base_interval
+        overdue = until_drop is not None and until_drop <= 0
+        if online and self.stable_count >= self.stable_after and not overdue:
+            delay = min(MAX_STABLE, self.base_interval * 1.5 ** (self.stable_count - self.stable_after + 1))
+        delay = self._jitter(delay)
+        if until_drop is not None and 0 < until_drop < delay:
+            delay = until_drop + 1  # Probe just after the expected drop, not a whole interval later
+        return max(1.0, delay)
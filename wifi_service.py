@@ -1,196 +1,134 @@
-import subprocess
-import socket
-import time
-import requests
-from datetime import datetime
-import configparser
-import os
 import sys
 import logging
 
-# Set up logging
-log_path = None
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_path),
-        logging.StreamHandler()
-    ]
-)
+import wifi_config
+import wifi_control
+import wifi_engine
+import wifi_events
+import wifi_fleet
+import wifi_iface
+import wifi_keepalive
+import wifi_log
+import wifi_metrics
+import wifi_portal
+import wifi_probe
+import wifi_trace
 
 logger = logging.getLogger(__name__)
+log_path = wifi_log.LOG_FILE
 
-# Load configuration
-config = configparser.ConfigParser()
-config_path = os.path.join(os.path.dirname(__file__), 'config.ini')
-
-# Default configuration
-COLLEGE_WIFI_NAME = "PCU_Student"
-PORTAL_URL = "http://10.11.200.1:8090/httpclient.html"
-LOGIN_URL = "http://10.11.200.1:8090/login.xml"
-USERNAME = "comp1"
-PASSWORD = "Pcu@123456"
-CHECK_INTERVAL = 30
-
-# Load from config file
-try:
-    if os.path.exists(config_path):
-        config.read(config_path)
-        COLLEGE_WIFI_NAME = config.get('WIFI_SETTINGS', 'COLLEGE_WIFI_NAME', fallback=COLLEGE_WIFI_NAME)
-        PORTAL_URL = config.get('WIFI_SETTINGS', 'PORTAL_URL', fallback=PORTAL_URL)
-        LOGIN_URL = config.get('WIFI_SETTINGS', 'LOGIN_URL', fallback=LOGIN_URL)
-        USERNAME = config.get('CREDENTIALS', 'USERNAME', fallback=USERNAME)
-        PASSWORD = config.get('CREDENTIALS', 'PASSWORD', fallback=PASSWORD)
-        CHECK_INTERVAL = config.getint('MONITORING', 'CHECK_INTERVAL', fallback=CHECK_INTERVAL)
-        logger.info("Configuration loaded from config.ini")
-except Exception as e:
-    logger.warning(f"Error loading config: {e}, using defaults")
+def setup_logging():
+    """Console plus the shared wifi_log writer (done by main_loop, not at import)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            wifi_log.LogHandler(),
+            logging.StreamHandler()
+        ]
+    )
 
 def get_connected_wifi_name():
-    try:
-        result = subprocess.check_output("netsh wlan show interfaces", shell=True).decode()
-        for line in result.split('\n'):
-            if "SSID" in line and "BSSID" not in line:
-                return line.split(":")[1].strip()
-    except Exception as e:
-        logger.error(f"Error getting WiFi name: {e}")
-        return None
+    """Get currently connected WiFi name (cached, see wifi_iface)"""
+    return wifi_iface.get_connected_ssid()
+
+classifier = wifi_probe.ConfigClassifier(tcp_checks=True)
 
 def check_internet_connectivity():
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return True
-    except:
-        return False
+    return classifier.check_online()
 
 def is_portal_accessible():
-    try:
-        socket.create_connection(("10.11.200.1", 8090), timeout=5)
-        return True
-    except:
-        return False
+    return classifier.portal_reachable()
 
 def login_to_wifi():
     logger.info("Attempting WiFi login...")
     
-    payload = {
-        "mode": "191",
-        "username": USERNAME,
-        "password": PASSWORD,
-        "a": int(time.time() * 1000)
-    }
-    
+    cfg = wifi_config.get()
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Referer': PORTAL_URL,
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        
-        response = requests.post(LOGIN_URL, data=payload, headers=headers, timeout=10)
-        
-        if "LIVE" in response.text or response.status_code == 200:
-            logger.info("Login successful!")
-            return True
+        result = wifi_portal.login(cfg.username, cfg.password, cfg.login_url, referer=cfg.portal_url,
+                                   timeout=cfg.timeout, log=logger.info, alternative_urls=cfg.alternative_urls,
+                                   hedge_delay=cfg.hedge_delay)
+        if result:
+            logger.info(f"Login successful! (method: {result.scheme})")
         else:
-            logger.warning(f"Login failed. Response: {response.text[:100]}...")
-            return False
+            logger.warning(f"Login failed ({result.outcome}): {result.message}")
+        return result
             
     except Exception as e:
         logger.error(f"Login error: {e}")
-        return False
+        return wifi_portal.LoginResult(wifi_portal.UNKNOWN, str(e))
+
+def create_throttle():
+    cfg = wifi_config.get()
+    if not cfg.fleet_enabled:
+        return None
+    return wifi_fleet.LoginThrottle(cfg.fleet_jitter_window, cfg.fleet_login_burst, cfg.fleet_login_refill,
+                                    coordinator=cfg.fleet_coordinator)
+
+def create_engine(events=None, keepalive=None, throttle=None, trace=None):
+    """The service's monitoring engine (also used by benchmarks/bench_time_to_internet.py)"""
+    cfg = wifi_config.get()
+    engine = wifi_engine.MonitorEngine(
+        target_ssid=cfg.college_wifi_name,
+        get_ssid=get_connected_wifi_name,
+        check_online=check_internet_connectivity,
+        portal_reachable=is_portal_accessible,
+        login=login_to_wifi,
+        events=events,
+        keepalive=keepalive,
+        throttle=throttle,
+        check_interval=cfg.check_interval,
+        stable_after=10,  # After 10 successful checks, reduce frequency
+        verify_delay=5,   # Give some time for internet to stabilize
+        trace=trace,
+        confirm_login=wifi_portal.report_verification,
+        log=logger.info
+    )
+    wifi_config.follow(engine, keepalive)  # config.ini edits apply from the next cycle
+    return engine
 
 def main_loop():
+    setup_logging()
+    wifi_config.log = logger.info
+    cfg = wifi_config.get()
     logger.info("Starting WiFi auto-login service...")
-    logger.info(f"Monitoring WiFi: {COLLEGE_WIFI_NAME}")
-    logger.info(f"Check interval: {CHECK_INTERVAL} seconds")
+    logger.info(f"Monitoring WiFi: {cfg.college_wifi_name}")
+    logger.info(f"Check interval: {cfg.check_interval} seconds")
     
-    consecutive_failures = 0
-    max_failures = 5
-    last_wifi = None
-    internet_was_working = False
-    idle_count = 0
-    max_idle_checks = 10  # After 10 successful checks, reduce frequency
+    # Every wait ends early when the WiFi association changes
+    events = wifi_events.create_event_source(cfg.event_source, cfg.event_file).start()
+    logger.info(f"Link-change events: {events.name}")
+    keepalive = None
+    if cfg.keepalive_enabled:
+        keepalive = wifi_keepalive.KeepaliveScheduler(cfg.username, cfg.login_url, url=cfg.keepalive_url,
+                                                      lifetime=cfg.session_lifetime, log=logger.info)
+    metrics = wifi_metrics.Exporter(textfile=cfg.metrics_textfile, port=cfg.metrics_port).start()
+    if cfg.metrics_port:
+        logger.info(f"Metrics: http://127.0.0.1:{cfg.metrics_port}/metrics")
     
-    while True:
-        try:
-            wifi_name = get_connected_wifi_name()
-            
-            # Check if WiFi changed
-            if wifi_name != last_wifi:
-                logger.info(f"WiFi changed from '{last_wifi}' to '{wifi_name}'")
-                last_wifi = wifi_name
-                internet_was_working = False
-                idle_count = 0
-            
-            if wifi_name == COLLEGE_WIFI_NAME:
-                internet_working = check_internet_connectivity()
-                
-                if not internet_working:
-                    logger.info("No internet access detected, attempting login...")
-                    internet_was_working = False
-                    idle_count = 0
-                    
-                    if is_portal_accessible():
-                        if login_to_wifi():
-                            logger.info("Successfully logged in!")
-                            consecutive_failures = 0
-                            # Give some time for internet to stabilize
-                            time.sleep(5)
-                            if check_internet_connectivity():
-                                logger.info("Internet connectivity confirmed!")
-                                internet_was_working = True
-                        else:
-                            consecutive_failures += 1
-                            logger.warning(f"Login attempt failed ({consecutive_failures}/{max_failures})")
-                    else:
-                        logger.warning("Portal not accessible")
-                        consecutive_failures += 1
-                        
-                else:
-                    # Internet is working
-                    if not internet_was_working:
-                        logger.info("Internet connectivity restored/confirmed")
-                        internet_was_working = True
-                        consecutive_failures = 0
-                        idle_count = 0
-                    else:
-                        idle_count += 1
-                        
-                    # If internet has been working for a while, check less frequently
-                    if idle_count >= max_idle_checks:
-                        logger.info(f"Internet stable for {idle_count} checks, reducing monitoring frequency")
-                        time.sleep(CHECK_INTERVAL * 3)  # Check every 90 seconds instead of 30
-                        idle_count = max_idle_checks  # Keep it at max to continue slow checking
-                        continue
-            else:
-                # Not connected to college WiFi
-                if last_wifi != wifi_name and wifi_name:
-                    logger.info(f"Connected to different WiFi: {wifi_name}")
-                internet_was_working = False
-                idle_count = 0
-                
-                # If not on college WiFi, check less frequently
-                time.sleep(CHECK_INTERVAL * 2)
-                continue
-            
-            # Calculate sleep time based on failures
-            if consecutive_failures > 0:
-                sleep_time = CHECK_INTERVAL * (2 ** min(consecutive_failures, 3))
-                logger.info(f"Sleeping for {sleep_time}s due to {consecutive_failures} failures")
-            else:
-                sleep_time = CHECK_INTERVAL
-                
-            time.sleep(sleep_time)
-            
-        except KeyboardInterrupt:
-            logger.info("Service stopped by user")
-            break
-        except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            consecutive_failures += 1
-            time.sleep(CHECK_INTERVAL)
+    throttle = create_throttle()
+    if throttle is not None:
+        logger.info(f"Fleet throttling: {throttle.offset:.0f}s slot in a {cfg.fleet_jitter_window:g}s window"
+                    + (f", coordinator {cfg.fleet_coordinator}" if cfg.fleet_coordinator else ""))
+    
+    trace = wifi_trace.open_recorder(cfg.trace_file)
+    if trace is not None:
+        logger.info(f"Recording a trace to {trace.path}")
+    engine = create_engine(events, keepalive, throttle, trace)
+    control = wifi_control.ControlServer(lambda: [engine], port=cfg.control_port, log=logger.info).start()
+    if cfg.control_port:
+        logger.info(f"Control: http://127.0.0.1:{cfg.control_port}/status")
+    
+    try:
+        engine.run_forever()
+    except KeyboardInterrupt:
+        logger.info("Service stopped by user")
+    finally:
+        events.stop()
+        metrics.stop()
+        control.stop()
+        if trace is not None:
+            trace.close()
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--service":
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ---- TRACE ----
+# A trace is a text file of header lines and events. An event is one line,
+# tab separated: seconds since the last header's epoch, source (the
+# adapter, or "-"), kind and value. Kinds and their values:
+#   ssid       the SSID now connected ("" for none)
+#   probe      online | captive
+#   portal     up | down
+#   login      a wifi_portal outcome (success, bad-credentials, max-sessions, unknown)
+#   keepalive  ack | expired
+#   link       a link event that woke the monitor early: roam (SSID changed
+#              or new AP), event (address or carrier change)
+VERSION = 1
+HEADER = "# wifi-trace"
+KINDS = ("ssid", "probe", "portal", "login", "keepalive", "link")
+# ---------------
+
+class TraceRecorder:
+    """Appends events to a trace file; one recorder can be shared by every engine.
+
+    Each recorder starts with a header carrying its epoch, so a restarted
+    daemon appends to the same file. `clock` is injectable so simulations
+    can write traces on virtual time. A file that cannot be written turns
+    the recorder off rather than failing the monitor.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.epoch = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        self.epoch = self.clock()
+        started = datetime.fromtimestamp(self.epoch).isoformat(timespec="seconds")
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._file.write(f"{HEADER} {VERSION} epoch={self.epoch:.3f} started={started}\n")
+
+    def record(self, kind, value, source=None):
+        if self.path is None:
+            return
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open()
+                self._file.write(f"{self.clock() - self.epoch:.3f}\t{source or '-'}\t{kind}\t{value or ''}\n")
+            except OSError:
+                self.path = None  # Unwritable: stop trying
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read(path):
+    """Yield (time, source, kind, value) for every event in a trace, with absolute times.
+
+    Malformed lines and unknown kinds are skipped, so a trace cut off
+    mid-line (a killed daemon) still reads.
+    """
+    epoch = 0.0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith(HEADER):
+                for field in line.split()[2:]:
+                    if field.startswith("epoch="):
+                        try:
+                            epoch = float(field[len("epoch="):])
+                        except ValueError:
+                            pass
+                continue
+            parts = line.split("\t", 3)
+            if len(parts) != 4 or parts[2] not in KINDS:
+                continue
+            try:
+                offset = float(parts[0])
+            except ValueError:
+                continue
+            yield epoch + offset, parts[1], parts[2], parts[3]
+
+def open_recorder(path):
+    """A TraceRecorder for `path` (relative paths are next to the scripts), or None if unset"""
+    return TraceRecorder(os.path.join(SCRIPT_DIR, path)) if path else None
@@ -0,0 +1,20 @@
+import os
+
+def write_atomic(path, text):
+    """Replace `path` with `text` in one step, so readers never see a half-written file.
+
+    Write errors are swallowed: every caller writes a cache or export that
+    can be rebuilt, and a full disk must not take the monitor down.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def reset_after_fork(reset):
+    """Run `reset` in forked children (where the parent's locks and threads are no good)"""
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=reset)
@@ -0,0 +1,111 @@
+import multiprocessing
+import threading
+import time
+
+import wifi_log
+import wifi_metrics
+
+# ---- LOGIN WORKER ----
+# A long-lived child process that imports wifi_auto_login once and then runs
+# smart_wifi_handler on request. The monitor talks to it over a Pipe, so a
+# login that crashes or hangs only takes the child down, never the monitor.
+DEFAULT_TIMEOUT = 60  # Same limit the old subprocess.run call used
+DEADLINE_GRACE = 10   # With a cycle budget, the worker is only killed this long after it
+# ----------------------
+
+def _worker_main(conn):
+    """Child process loop: wait for a request, run the handler, send back the result"""
+    import wifi_auto_login  # Paid once per worker, not once per WiFi join
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request == "stop":
+            break
+        started = time.time()
+        wifi_metrics.REGISTRY.reset()  # Ship only this login's metrics to the parent
+        outcome = {"ok": False, "result": None, "error": None, "elapsed": 0.0}
+        try:
+            outcome["result"] = wifi_auto_login.smart_wifi_handler()
+            outcome["ok"] = bool(outcome["result"])
+        except Exception as e:
+            outcome["error"] = f"{type(e).__name__}: {e}"
+        outcome["elapsed"] = time.time() - started
+        outcome["metrics"] = wifi_metrics.REGISTRY.snapshot()
+        wifi_log.flush()  # The parent may kill us before the batch timer fires
+        try:
+            conn.send(outcome)
+        except (EOFError, OSError):
+            break
+    wifi_log.close()  # multiprocessing children skip atexit
+
+class LoginWorker:
+    """Parent-side handle for the persistent login child process"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the child if it is not already running"""
+        if self._process is not None and self._process.is_alive():
+            return
+        self._discard()
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_worker_main, args=(child_conn,),
+                                                name="wifi-login-worker", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def _discard(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(5)
+        self._conn = None
+        self._process = None
+
+    def run_login(self, timeout=None):
+        """Run smart_wifi_handler in the worker and return its outcome dict.
+
+        The dict carries `ok`, the handler's own `result`, any `error` and
+        the `elapsed` seconds. A hung or crashed worker is killed and
+        restarted on the next call.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            started = time.time()
+            try:
+                self.start()
+                self._conn.send("login")
+                if not self._conn.poll(timeout):
+                    self._discard()
+                    return {"ok": False, "result": None, "error": "timeout", "elapsed": time.time() - started}
+                outcome = self._conn.recv()
+                wifi_metrics.REGISTRY.merge(outcome.pop("metrics", None))
+                return outcome
+            except (EOFError, OSError) as e:
+                self._discard()
+                return {"ok": False, "result": None, "error": f"worker crashed: {e}",
+                        "elapsed": time.time() - started}
+
+    def stop(self):
+        """Ask the worker to exit and wait briefly for it"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send("stop")
+                except Exception:
+                    pass
+            if self._process is not None:
+                self._process.join(5)
+            self._discard()